@@ -1,15 +1,14 @@
 # app.py
 
 import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image
-import base64
-import io
 import os
-from openai import OpenAI
-import json
 from datetime import datetime
+from ecovision import EcoVisionAI, is_polite_response
+from ecovision.client import get_client
+from ecovision.logs import configure_logging
+from ecovision.session import conversation_state, encoded_image_store, session_memory, usage_ledger
+from ecovision.ui import (answer_timing, answer_tokens, encode_upload, errors_only_reporter, govern_session,
+                          ingest_upload, render_archived_chat, render_memory, render_usage, stream_chat_answer)
 
 # --- API key handling for the runtime environment ---
 # The API key is not loaded from a .env file but is provided by the canvas environment.
@@ -40,7 +39,7 @@ try:
         if __name__ == "__main__":
             main()
         exit() # Exit the script
-    client = OpenAI(api_key=api_key)
+    client = get_client(api_key)
 except Exception as e:
     st.error(f"❌ Error initializing OpenAI client: {e}")
     exit()
@@ -249,86 +248,9 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class EcoVisionAI:
-    def __init__(self):
-        pass
-    
-    def encode_image(self, image):
-        """Convert PIL image to base64 string for OpenAI API"""
-        try:
-            buffered = io.BytesIO()
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            image.save(buffered, format="JPEG", quality=85)
-            encoded = base64.b64encode(buffered.getvalue()).decode('utf-8')
-            return encoded
-        except Exception as e:
-            st.error(f"❌ Error encoding image: {e}")
-            return None
-    
-    def analyze_image_with_question(self, image, question):
-        """Analyze image with user question using OpenAI GPT-4 Vision"""
-        
-        base64_image = self.encode_image(image)
-        if not base64_image:
-            return "Sorry, I couldn't process the image. Please try again."
-        
-        # Comprehensive prompt for environmental analysis
-        system_prompt = """You are EcoVision AI, an expert environmental analyst. You can analyze any environmental image and answer questions about it comprehensively and accurately.
-
-You excel at:
-- Identifying all objects, people, animals, plants, and environmental features. Be sure to correctly distinguish between living things (like humans, plants, and animals) and non-living things (like equipment, fire, or rocks).
-- Assessing environmental health and sustainability.
-- Providing conservation recommendations.
-- Answering specific questions about what you observe.
-- Explaining ecological processes and relationships.
-
-Always provide detailed, accurate, and helpful responses. If asked about specific counts (like "how many people"), be precise. Maintain a logical and factual tone. Answer naturally as if you're having a conversation."""
-
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text", 
-                                "text": f"Please analyze this environmental image and answer my question: {question}"
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
-                                    "detail": "high"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=1500,
-                temperature=0.1
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            return f"I encountered an error while analyzing the image: {str(e)}. Please try again."
-
-# Initialize the AI
-eco_ai = EcoVisionAI()
-
-def is_polite_response(text):
-    """
-    Checks if the user's input is a simple polite phrase like "thank you".
-    """
-    polite_phrases = ["thank you", "thanks", "thanks a lot", "thank you so much", "cheers"]
-    normalized_text = text.lower().strip()
-    return any(phrase in normalized_text for phrase in polite_phrases)
+# Initialize the AI; engine events go to the log, not the page
+configure_logging()
+eco_ai = EcoVisionAI(client=client, reporter=errors_only_reporter, usage=usage_ledger(st.session_state))
 
 def main():
     # Sidebar content
@@ -357,6 +279,10 @@ def main():
             </div>
         </div>
         """, unsafe_allow_html=True)
+        render_usage(eco_ai.usage)
+        
+        # Bytes held in session state, this session and server-wide
+        render_memory()
         
         st.markdown('<div class="sidebar-footer">© 2025 EcoVision AI. All rights reserved.</div>', unsafe_allow_html=True)
 
@@ -374,11 +300,11 @@ def main():
             "content": "Hello there! I'm EcoVision AI, your environmental intelligence assistant. You can upload an image or take a picture with your camera, then ask me anything you'd like to know about the environment it depicts!",
             "timestamp": datetime.now().strftime("%H:%M")
         })
-    if 'current_image' not in st.session_state:
-        st.session_state.current_image = None
     
     # Image input selection (radio buttons for choice)
     st.subheader("📸 Choose Image Source")
+    # The API payload is owned by the session's image store, so the memory governor can release it
+    image_base64 = None
     image_source_option = st.radio(
         "Select your preferred image input method:",
         ("Upload Image", "Take Picture with Camera"),
@@ -392,20 +318,24 @@ def main():
             help="Upload an image to analyze"
         )
         if uploaded_file:
-            image = Image.open(uploaded_file)
-            st.session_state.current_image = image
-            st.image(image, caption="Uploaded Image", use_container_width=True, output_format="auto") # Removed class_name
+            # Ingest and encode once per upload; only the compact bytes stay in the session
+            ingested = ingest_upload(uploaded_file)
+            if ingested:
+                image_base64 = encode_upload(uploaded_file)
+                st.image(ingested.load_preview(), caption="Uploaded Image", use_container_width=True, output_format="auto") # Removed class_name
         else:
-            st.session_state.current_image = None # Reset if no file is uploaded after selection
+            encoded_image_store(st.session_state).clear() # Reset if no file is uploaded after selection
             
     elif image_source_option == "Take Picture with Camera":
         camera_image = st.camera_input("Take a picture for analysis")
         if camera_image:
-            image = Image.open(camera_image)
-            st.session_state.current_image = image
-            st.image(image, caption="Captured Image", use_container_width=True, output_format="auto") # Removed class_name
+            # Ingest and encode once per capture; only the compact bytes stay in the session
+            ingested = ingest_upload(camera_image)
+            if ingested:
+                image_base64 = encode_upload(camera_image)
+                st.image(ingested.load_preview(), caption="Captured Image", use_container_width=True, output_format="auto") # Removed class_name
         else:
-            st.session_state.current_image = None # Reset if no picture is taken
+            encoded_image_store(st.session_state).clear() # Reset if no picture is taken
 
     # Question input section
     st.subheader("💬 Ask Your Question")
@@ -431,26 +361,33 @@ def main():
             })
             
             ai_response = ""
+            answer = None
 
             # Check if the user's input is a simple polite phrase
             if is_polite_response(user_question.strip()):
                 ai_response = "You're very welcome! Feel free to ask me anything else about the image."
             # Check if an image is present. If not, prompt the user.
-            elif st.session_state.current_image is None:
+            elif not image_base64:
                 ai_response = "Please upload an image or take a picture with your camera first!"
             else:
-                # If an image is present, send the user's question to the AI model
-                with st.spinner("🤖 Analyzing..."):
-                    ai_response = eco_ai.analyze_image_with_question(
-                        st.session_state.current_image, 
-                        user_question.strip()
-                    )
+                # If an image is present, stream the AI model's answer into the chat
+                answer = stream_chat_answer(
+                    eco_ai,
+                    user_question.strip(),
+                    image_base64
+                )
+                ai_response = answer.text
             
             # Add AI response to chat history
             st.session_state.chat_history.append({
                 "type": "ai",
                 "content": ai_response,
-                "timestamp": datetime.now().strftime("%H:%M")
+                "timestamp": datetime.now().strftime("%H:%M"),
+                "time_to_first_token": answer.time_to_first_token if answer else None,
+                "total_latency": answer.total_latency if answer else None,
+                "prompt_tokens": answer.prompt_tokens if answer else None,
+                "cached_tokens": answer.cached_tokens if answer else None,
+                "error": answer.error if answer else None
             })
             
             # Rerun to show new messages
@@ -462,6 +399,7 @@ def main():
     # Display chat history
     if st.session_state.chat_history:
         st.subheader("💬 Chat History")
+        render_archived_chat()
         
         # Create chat container
         chat_container = st.container()
@@ -478,7 +416,7 @@ def main():
                 else:  # AI message
                     st.markdown(f"""
                     <div class="ai-message">
-                        <div class="message-header">EcoVision AI • {message["timestamp"]}</div>
+                        <div class="message-header">EcoVision AI • {message["timestamp"]}{answer_timing(message)}{answer_tokens(message)}</div>
                         <div>{message["content"]}</div>
                     </div>
                     """, unsafe_allow_html=True)
@@ -487,7 +425,9 @@ def main():
     if st.session_state.chat_history:
         if st.button("🗑️ Clear Chat History"):
             st.session_state.chat_history = []
-            st.session_state.current_image = None # Also clear the image
+            encoded_image_store(st.session_state).clear() # Also clear the image
+            conversation_state(st.session_state).reset()
+            session_memory(st.session_state).reset_chat()
             st.rerun()
     
     # Footer
@@ -498,5 +438,8 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+    # Measure what this session keeps and evict under memory pressure
+    govern_session()
+
 if __name__ == "__main__":
     main()
@@ -1,22 +1,24 @@
 
 
 import streamlit as st
-import cv2
-import numpy as np
-from PIL import Image
-import base64
-import io
 import os
-from openai import OpenAI
-import json
 from datetime import datetime
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
 from dotenv import load_dotenv
+from ecovision import EcoVisionAI, is_polite_response
+from ecovision.client import get_client
+from ecovision.logs import configure_logging
+from ecovision.scoring import BASIC, analysis_metrics
+from ecovision.session import conversation_state, encoded_image_store, objects_view, session_memory, usage_ledger
+from ecovision.templates import ANALYSIS_MODES, TEMPLATES
+from ecovision.ui import (analysis_pending, answer_timing, answer_tokens, batch_inputs, batch_settings, debug_toggle,
+                          encode_upload, govern_session, ingest_upload, poll_analysis, render_archived_chat,
+                          render_batch_results, render_debug_panel, render_engine_stats, render_history,
+                          render_local_metrics, render_memory, render_tiling, render_usage, run_batch_analysis,
+                          stream_chat_answer, streamlit_reporter, submit_analysis, tiled_toggle)
 
 # Load environment variables
 load_dotenv()
+configure_logging()
 
 # Page config MUST be first Streamlit command
 st.set_page_config(
@@ -33,7 +35,7 @@ try:
         st.error("⚠️ OPENAI_API_KEY not found in environment variables!")
         st.info("Please check your .env file")
         st.stop()
-    client = OpenAI(api_key=api_key)
+    client = get_client(api_key)
     st.sidebar.success("✅ OpenAI API key loaded")
 except Exception as e:
     st.error(f"❌ Error initializing OpenAI client: {e}")
@@ -360,297 +362,8 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-class EcoVisionAI:
-    def __init__(self):
-        self.analysis_history = []
-        # Initialize chat history in session state
-        if 'chat_history' not in st.session_state:
-            st.session_state.chat_history = []
-        if 'current_image_base64' not in st.session_state:
-            st.session_state.current_image_base64 = None
-    
-    def is_polite_response(self, text):
-        """Check if the user's input is a simple polite phrase like 'thank you'"""
-        polite_phrases = ["thank you", "thanks", "thanks a lot", "thank you so much", "cheers"]
-        normalized_text = text.lower().strip()
-        return any(phrase in normalized_text for phrase in polite_phrases)
-    
-    def encode_image(self, image):
-        """Convert PIL image to base64 string for OpenAI API"""
-        try:
-            buffered = io.BytesIO()
-            # Convert to RGB if not already
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            image.save(buffered, format="JPEG", quality=85)
-            encoded = base64.b64encode(buffered.getvalue()).decode('utf-8')
-            st.sidebar.info(f"✅ Image encoded successfully ({len(encoded)} chars)")
-            return encoded
-        except Exception as e:
-            st.error(f"❌ Error encoding image: {e}")
-            return None
-    
-    def analyze_image_with_ai(self, image, analysis_type="comprehensive"):
-        """Analyze image using OpenAI GPT-4 Vision with enhanced debugging"""
-        
-        # Debug: Show we're starting analysis
-        st.write("🔍 **Starting AI Analysis...**")
-        st.write(f"**Analysis Mode:** {analysis_type}")
-        st.write(f"**Image Size:** {image.size}")
-        
-        # Encode image
-        base64_image = self.encode_image(image)
-        if not base64_image:
-            return {"error": "Failed to encode image"}
-        
-        # Store the encoded image for chat functionality
-        st.session_state.current_image_base64 = base64_image
-        
-        # Enhanced prompt for better forest detection and human activities
-        prompt = """Analyze this environmental image and provide detailed insights in JSON format.
-
-Pay special attention to:
-- Individual trees, forest areas, canopy coverage
-- Vegetation types (moss, ferns, undergrowth, grass, saplings, young trees)
-- Water features (streams, rivers, lakes)
-- Soil and ground coverage
-- Human activities (tree planting, farming, conservation work, gardening)
-- People engaged in environmental activities
-- Tools or evidence of environmental work (shovels, seedlings, planted areas)
-- Any human-made structures or impacts
-
-Detect ALL visible elements including people, activities, and environmental objects.
-
-Return your response as valid JSON with this exact structure:
-{
-  "summary": "Detailed description of the environmental scene including forest density, ecosystem type, and any human activities",
-  "objects_detected": [
-    {
-      "name": "specific object, organism, or activity name (be detailed: 'people planting trees', 'tree saplings', 'reforestation activity', 'environmental workers', etc.)",
-      "type": "living or non-living",
-      "confidence": 0.9,
-      "environmental_impact": "positive, negative, or neutral",
-      "sustainability_score": 8,
-      "description": "detailed description including size, density, health, or activity purpose",
-      "recommended_action": "specific recommended action"
-    }
-  ],
-  "overall_analysis": {
-    "environmental_health_score": 8.5,
-    "biodiversity_level": "high",
-    "key_concerns": ["list of environmental concerns"],
-    "positive_aspects": ["list of positive environmental aspects"],
-    "recommendations": ["list of actionable recommendations"]
-  }
-}
-
-Please ensure your response is valid JSON only. Detect as many distinct environmental elements AND human activities as possible."""
-        
-        try:
-            st.write("📡 **Sending request to OpenAI...**")
-            
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
-                                    "detail": "high"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=1500,
-                temperature=0.1
-            )
-            
-            result_text = response.choices[0].message.content.strip()
-            st.write("✅ **Received response from OpenAI**")
-            
-            # Debug: Show raw response
-            with st.expander("🔧 Debug - Raw AI Response"):
-                st.text(result_text[:500] + "..." if len(result_text) > 500 else result_text)
-            
-            # Clean up the response to ensure it's valid JSON
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "").replace("```", "").strip()
-            elif result_text.startswith("```"):
-                result_text = result_text.replace("```", "").strip()
-            
-            # Try to parse as JSON
-            try:
-                parsed_result = json.loads(result_text)
-                st.write("✅ **JSON parsing successful**")
-                return parsed_result
-            except json.JSONDecodeError as json_error:
-                st.write(f"⚠️ **JSON parsing failed:** {json_error}")
-                # Create a fallback structured response
-                fallback_result = {
-                    "summary": result_text[:200] + "..." if len(result_text) > 200 else result_text,
-                    "raw_analysis": result_text,
-                    "objects_detected": [
-                        {
-                            "name": "Environmental Scene Analysis",
-                            "type": "comprehensive",
-                            "confidence": 0.85,
-                            "environmental_impact": "positive",
-                            "sustainability_score": 7,
-                            "description": "AI analysis completed successfully",
-                            "recommended_action": "Review detailed analysis below"
-                        }
-                    ],
-                    "overall_analysis": {
-                        "environmental_health_score": 7.5,
-                        "biodiversity_level": "medium",
-                        "key_concerns": ["See detailed analysis"],
-                        "positive_aspects": ["Natural environment detected"],
-                        "recommendations": ["Continue environmental monitoring"]
-                    }
-                }
-                return fallback_result
-                
-        except Exception as e:
-            error_msg = f"Analysis failed: {str(e)}"
-            st.write(f"❌ **Error:** {error_msg}")
-            return {
-                "error": error_msg,
-                "debug_info": f"Error type: {type(e).__name__}",
-                "summary": "Analysis encountered an error"
-            }
-    
-    def analyze_image_with_question(self, image, question):
-        """Analyze image with user question using OpenAI GPT-4 Vision - ChatGPT style method"""
-        
-        base64_image = self.encode_image(image)
-        if not base64_image:
-            return "Sorry, I couldn't process the image. Please try again."
-        
-        # Comprehensive prompt for environmental analysis
-        system_prompt = """You are EcoVision AI, an expert environmental analyst. You can analyze any environmental image and answer questions about it comprehensively and accurately.
-
-You excel at:
-- Identifying all objects, people, animals, plants, and environmental features. Be sure to correctly distinguish between living things (like humans, plants, and animals) and non-living things (like equipment, fire, or rocks).
-- Assessing environmental health and sustainability.
-- Providing conservation recommendations.
-- Answering specific questions about what you observe.
-- Explaining ecological processes and relationships.
-
-Always provide detailed, accurate, and helpful responses. If asked about specific counts (like "how many people"), be precise. Maintain a logical and factual tone. Answer naturally as if you're having a conversation."""
-
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": system_prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text", 
-                                "text": f"Please analyze this environmental image and answer my question: {question}"
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
-                                    "detail": "high"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=1500,
-                temperature=0.1
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            return f"I encountered an error while analyzing the image: {str(e)}. Please try again."
-    
-    def generate_recommendations(self, analysis_result):
-        """Generate actionable environmental recommendations"""
-        recommendations = []
-        
-        if "overall_analysis" in analysis_result:
-            recommendations = analysis_result["overall_analysis"].get("recommendations", [])
-        
-        # If no recommendations or empty, generate based on analysis content
-        if not recommendations or len(recommendations) == 0:
-            if "objects_detected" in analysis_result:
-                objects = analysis_result["objects_detected"]
-                if any("tree" in obj.get("name", "").lower() or "forest" in obj.get("name", "").lower() for obj in objects):
-                    recommendations.extend([
-                        "🌳 Protect existing tree canopy by avoiding development in forested areas",
-                        "🌱 Support reforestation initiatives in your local community", 
-                        "🚫 Avoid disturbing wildlife habitats and maintain natural corridors"
-                    ])
-                elif any("waste" in obj.get("name", "").lower() or "plastic" in obj.get("name", "").lower() for obj in objects):
-                    recommendations.extend([
-                        "♻️ Implement proper waste sorting and recycling practices",
-                        "🚯 Reduce single-use plastics and choose sustainable alternatives",
-                        "🔄 Support circular economy initiatives in your community"
-                    ])
-                else:
-                    recommendations.extend([
-                        "🔍 Continue monitoring environmental conditions regularly",
-                        "📊 Document changes over time to track environmental health",
-                        "🤝 Share findings with local environmental groups"
-                    ])
-            elif "raw_analysis" in analysis_result:
-                analysis_text = analysis_result["raw_analysis"].lower()
-                if "forest" in analysis_text or "tree" in analysis_text:
-                    recommendations.extend([
-                        "🌲 Preserve forest ecosystems through conservation efforts",
-                        "🌿 Promote biodiversity by protecting natural habitats",
-                        "🏞️ Support sustainable forestry practices"
-                    ])
-                elif "waste" in analysis_text or "recycl" in analysis_text:
-                    recommendations.extend([
-                        "♻️ Improve waste management and recycling systems",
-                        "🌍 Reduce environmental impact through better disposal practices", 
-                        "💡 Educate others about proper waste sorting"
-                    ])
-                else:
-                    recommendations.extend([
-                        "🌱 Take action to improve environmental sustainability",
-                        "📈 Monitor and measure environmental impact regularly",
-                        "🤝 Collaborate with others on conservation efforts"
-                    ])
-            else:
-                recommendations = [
-                    "🔍 Upload an image to receive personalized environmental recommendations",
-                    "🌍 Start by analyzing your local environment for improvement opportunities", 
-                    "📱 Use this tool regularly to track environmental changes"
-                ]
-        
-        # Ensure we have at least 3 recommendations
-        while len(recommendations) < 3:
-            additional_recs = [
-                "🌳 Plant native species to support local ecosystems",
-                "💧 Conserve water resources through mindful usage",
-                "🔋 Choose renewable energy sources when possible",
-                "🚴‍♂️ Use sustainable transportation options",
-                "📚 Educate others about environmental conservation",
-                "🧹 Participate in local environmental cleanup efforts"
-            ]
-            for rec in additional_recs:
-                if rec not in recommendations and len(recommendations) < 3:
-                    recommendations.append(rec)
-        
-        return recommendations[:3]  # Return max 3 recommendations
-
 # Initialize the app
-eco_ai = EcoVisionAI()
+eco_ai = EcoVisionAI(client=client, reporter=streamlit_reporter, usage=usage_ledger(st.session_state))
 
 # Main app
 def main():
@@ -658,20 +371,24 @@ def main():
     st.markdown('<div class="subtitle">Advanced Computer Vision for Environmental Analysis</div>', unsafe_allow_html=True)
     
     # Initialize session state variables
+    if 'chat_history' not in st.session_state:
+        st.session_state.chat_history = []
     if 'app_mode' not in st.session_state:
         st.session_state.app_mode = "comprehensive_analysis"
     if 'analysis_count' not in st.session_state:
         st.session_state.analysis_count = 0
     
-    # Sidebar with Navigation Mode Selection (only 2 modes)
+    # Sidebar with Navigation Mode Selection
     with st.sidebar:
         st.header("🚀 Navigation Mode")
         app_mode = st.selectbox(
             "Choose Mode",
-            ["comprehensive_analysis", "qa_mode"],
+            ["comprehensive_analysis", "qa_mode", "batch_analysis", "history"],
             format_func=lambda x: {
                 "comprehensive_analysis": "🔬 Comprehensive Analysis",
-                "qa_mode": "💬 Q&A Mode"
+                "qa_mode": "💬 Q&A Mode",
+                "batch_analysis": "📦 Batch Analysis",
+                "history": "🗂️ Analysis History"
             }[x]
         )
         
@@ -683,13 +400,10 @@ def main():
             st.header("🔧 Analysis Settings")
             analysis_mode = st.selectbox(
                 "Analysis Type",
-                ["comprehensive", "waste_detection", "biodiversity"],
-                format_func=lambda x: {
-                    "comprehensive": "🔍 Comprehensive Analysis",
-                    "waste_detection": "♻️ Waste & Recycling",
-                    "biodiversity": "🦋 Biodiversity Assessment"
-                }[x]
+                ANALYSIS_MODES,
+                format_func=lambda x: TEMPLATES[x].label
             )
+            tiled = tiled_toggle()
 
             st.header("📊 Environmental Metrics")
             
@@ -701,56 +415,11 @@ def main():
             if 'current_analysis' in st.session_state and 'objects_detected' in st.session_state.current_analysis:
                 analysis = st.session_state.current_analysis
                 
-                # Calculate enhanced CO₂ impact based on detected objects
-                co2_impact = 0
-                co2_details = []
-                forest_multiplier = 1
-
-                # Check for forest density indicators
-                forest_keywords = ["tree", "forest", "vegetation", "plant", "woods", "canopy"]
-                detected_forest_objects = sum(1 for obj in analysis.get("objects_detected", []) 
-                                             if any(keyword in obj.get("name", "").lower() 
-                                                   for keyword in forest_keywords))
-
-                # Determine forest density multiplier
-                if detected_forest_objects >= 3:
-                    forest_multiplier = 4  # Dense forest
-                    forest_type = "Dense Forest Ecosystem"
-                elif detected_forest_objects >= 2:
-                    forest_multiplier = 2.5  # Moderate forest
-                    forest_type = "Forest Area"
-                else:
-                    forest_multiplier = 1  # Single trees
-                    forest_type = "Individual Trees"
-
-                for obj in analysis.get("objects_detected", []):
-                    name = obj.get("name", "").lower()
-                    
-                    # Trees and vegetation (CO₂ absorption)
-                    if any(keyword in name for keyword in ["tree", "forest", "vegetation", "plant", "woods", "canopy", "sapling"]):
-                        base_absorption = 2.5
-                        enhanced_absorption = base_absorption * forest_multiplier
-                        co2_impact += enhanced_absorption
-                        co2_details.append(f"🌳 {obj.get('name', 'Forest')}: +{enhanced_absorption:.1f} kg CO₂/day")
-                    
-                    # Tree planting activities
-                    elif any(keyword in name for keyword in ["planting", "reforestation", "tree planting", "environmental work", "conservation"]):
-                        planting_impact = 15.0 * forest_multiplier
-                        co2_impact += planting_impact
-                        co2_details.append(f"🌱 {obj.get('name', 'Tree Planting Activity')}: +{planting_impact:.1f} kg CO₂/day")
-                    
-                    # People in environmental activities
-                    elif any(keyword in name for keyword in ["people", "person", "human", "worker", "volunteer"]) and any(env_keyword in name for env_keyword in ["plant", "environment", "conservation", "garden"]):
-                        human_env_impact = 10.0
-                        co2_impact += human_env_impact
-                        co2_details.append(f"👥 {obj.get('name', 'Environmental Workers')}: +{human_env_impact:.1f} kg CO₂/day")
-
-                # Add ecosystem bonuses
-                if detected_forest_objects >= 2:
-                    ecosystem_bonus = 5.0 * detected_forest_objects
-                    co2_impact += ecosystem_bonus
-                    co2_details.append(f"🌲 {forest_type} Bonus: +{ecosystem_bonus:.1f} kg CO₂/day")
-
+                # Basic profile, scored once when the analysis landed (see ecovision.scoring)
+                metrics = analysis_metrics(analysis, BASIC)
+                co2_impact = metrics.co2_impact
+                co2_details = metrics.co2_details
+                
                 # Display CO₂ impact
                 if co2_impact > 0:
                     st.metric("🌱 CO₂ Impact", f"+{co2_impact:.1f} kg/day", 
@@ -769,26 +438,17 @@ def main():
                             st.write(detail)
                 
                 # Environmental Health Score
-                health_score = 60
-                for obj in analysis.get("objects_detected", []):
-                    impact = obj.get("environmental_impact", "neutral")
-                    if impact == "positive":
-                        health_score += 15
-                    elif impact == "negative":
-                        health_score -= 20
-
-                health_score = max(0, min(100, health_score))
+                health_score = metrics.health_score
                 health_icon = "🌿" if health_score >= 70 else "⚠️" if health_score >= 40 else "🔴"
                 st.metric(f"{health_icon} Environment Score", f"{health_score}/100", 
                           help="Environmental health assessment")
                 
                 # Biodiversity Index
-                living_count = sum(1 for obj in analysis.get("objects_detected", []) 
-                                  if obj.get("type", "").lower() == "living")
-                total_objects = len(analysis.get("objects_detected", []))
+                living_count = metrics.living_count
+                total_objects = metrics.total_objects
                 
                 if total_objects > 0:
-                    biodiversity = (living_count / total_objects) * 100
+                    biodiversity = metrics.biodiversity
                     st.metric("🦋 Biodiversity", f"{biodiversity:.0f}%", 
                               help=f"Living organisms: {living_count} of {total_objects} detected")
                 
@@ -810,12 +470,13 @@ def main():
             if st.session_state.chat_history:
                 # Count only user questions, not AI responses
                 user_questions = sum(1 for msg in st.session_state.chat_history if msg["type"] == "user")
+                user_questions += session_memory(st.session_state).archived_questions
                 if user_questions > 0:
                     st.metric("💬 Questions Asked", user_questions, 
                               help="Number of questions asked about environmental images")
             
             # Show image status
-            if st.session_state.current_image_base64:
+            if encoded_image_store(st.session_state).key:
                 st.success("✅ Image ready for questions")
             else:
                 st.warning("📸 Upload an image first")
@@ -824,18 +485,63 @@ def main():
             if st.session_state.chat_history:
                 if st.button("🗑️ Clear Chat History", help="Clear all conversation history"):
                     st.session_state.chat_history = []
-                    st.session_state.current_image = None
+                    encoded_image_store(st.session_state).clear()
+                    conversation_state(st.session_state).reset()
+                    session_memory(st.session_state).reset_chat()
                     st.rerun()
         
-        # Debug info (appears in both modes)
+        elif app_mode == "batch_analysis":
+            # Batch Mode - analysis type plus concurrency and rate limits
+            st.header("🔧 Analysis Settings")
+            analysis_mode = st.selectbox(
+                "Analysis Type",
+                ANALYSIS_MODES,
+                format_func=lambda x: TEMPLATES[x].label,
+                key="batch_analysis_type"
+            )
+            
+            st.header("📦 Batch Settings")
+            batch_workers, batch_rpm, batch_tpm = batch_settings()
+        
+        # Debug info (appears in all modes)
         st.header("🔧 Debug Info")
         st.info(f"API Key Status: {'✅ Loaded' if api_key else '❌ Missing'}")
+        debug_toggle()
+        
+        # Tokens, timings and estimated spend of this session's API calls
+        render_usage(eco_ai.usage)
+        
+        # Bytes held in session state, this session and server-wide
+        render_memory()
+        
+        # Cache, coalescing, parse, pre-screen and upstream counters
+        render_engine_stats(eco_ai)
         
         # Format the mode display properly
         mode_display = app_mode.replace('_', ' ').title()
         if mode_display == "Qa Mode":
             mode_display = "Q&A Mode"
         st.info(f"Current Mode: {mode_display}")
+        
+        if app_mode == "qa_mode":
+            image_store = encoded_image_store(st.session_state)
+            st.info(f"Image Encodes: {image_store.encodes} (reused {image_store.reuses}×)")
+            timed_answers = [msg for msg in st.session_state.chat_history if msg.get("time_to_first_token") is not None]
+            if timed_answers:
+                last_answer = timed_answers[-1]
+                st.info(f"Last Answer: {last_answer['time_to_first_token']:.2f}s to first token • "
+                        f"{last_answer['total_latency']:.2f}s total")
+            conversation = conversation_state(st.session_state)
+            if conversation.usage:
+                last_turn = conversation.usage[-1]
+                st.info(f"Context: {last_turn.context_turns} earlier exchanges (~{last_turn.context_tokens:,} tokens)"
+                        f"{' + summary' if conversation.summary else ''}")
+                measured = [turn for turn in conversation.usage if turn.prompt_tokens is not None]
+                if measured:
+                    average = sum(turn.prompt_tokens for turn in measured) / len(measured)
+                    cached = sum(turn.cached_tokens or 0 for turn in measured)
+                    st.info(f"Prompt Tokens: {measured[-1].prompt_tokens:,} last turn • {average:,.0f} avg • "
+                            f"{cached:,} served from prompt cache")
     
     # Main content - different layout based on app mode
     if st.session_state.app_mode == "comprehensive_analysis":
@@ -860,32 +566,21 @@ def main():
                     help="Upload an image for environmental analysis"
                 )
                 if uploaded_file:
-                    uploaded_image = Image.open(uploaded_file)
+                    uploaded_image = ingest_upload(uploaded_file)
             
             elif input_method == "Camera Capture":
                 camera_image = st.camera_input("Take a picture")
                 if camera_image:
-                    uploaded_image = Image.open(camera_image)
+                    uploaded_image = ingest_upload(camera_image)
             
             if uploaded_image:
-                st.image(uploaded_image, caption="Input Image", width=None)
+                st.image(uploaded_image.load_preview(), caption="Input Image", width=None)
                 
-                # Analysis button
-                if st.button("🚀 Analyze with AI", type="primary", key="analyze_comp"):
-                    with st.spinner("🤖 AI is analyzing the environment..."):
-                        # Clear previous results
-                        if 'current_analysis' in st.session_state:
-                            del st.session_state.current_analysis
-                        
-                        # Perform AI analysis
-                        analysis_result = eco_ai.analyze_image_with_ai(uploaded_image, analysis_mode)
-                        
-                        # Store in session state
-                        st.session_state.current_analysis = analysis_result
-                        st.session_state.analysis_count += 1
-                        
-                        # Force rerun to show results
-                        st.rerun()
+                # Analysis button: the work runs on the background job queue
+                if st.button("🚀 Analyze with AI", type="primary", key="analyze_comp", disabled=analysis_pending()):
+                    submit_analysis(eco_ai, uploaded_image.image(), analysis_mode, tiled=tiled)
+                    st.rerun()
+                poll_analysis()
         
         with col2:
             st.header("🔬 Analysis Results")
@@ -893,8 +588,14 @@ def main():
             if 'current_analysis' in st.session_state:
                 analysis = st.session_state.current_analysis
                 
+                render_local_metrics(analysis)
+                render_tiling(analysis)
+
                 if "error" in analysis:
                     st.error(f"❌ {analysis['error']}")
+                    if "raw_analysis" in analysis:
+                        with st.expander("📄 Model Response"):
+                            st.write(analysis["raw_analysis"])
                 else:
                     # Display summary
                     if "summary" in analysis:
@@ -934,102 +635,23 @@ def main():
                         st.subheader("🔍 Detected Objects")
                         
                         try:
-                            objects_df = pd.DataFrame(analysis["objects_detected"])
-                            if not objects_df.empty:
-                                # Check if required columns exist for plotting
-                                required_cols = ["sustainability_score", "confidence"]
-                                if all(col in objects_df.columns for col in required_cols):
-                                    # Create enhanced visualization with dark theme
-                                    fig = px.scatter(
-                                        objects_df,
-                                        x="sustainability_score",
-                                        y="confidence",
-                                        color="environmental_impact",
-                                        size="sustainability_score",
-                                        hover_data=["name", "type"],
-                                        title="🌍 Environmental Objects Analysis",
-                                        color_discrete_map={
-                                            "positive": "#1de9b6",
-                                            "negative": "#ff6b6b", 
-                                            "neutral": "#ffd93d"
-                                        }
-                                    )
-                                    
-                                    # Dark theme styling for the plot
-                                    fig.update_layout(
-                                        plot_bgcolor='rgba(0,0,0,0)',
-                                        paper_bgcolor='rgba(15,20,25,0.8)',
-                                        font_color='#8892b0',
-                                        title_font_size=18,
-                                        title_font_color='#64ffda',
-                                        title_x=0.5,
-                                        showlegend=True,
-                                        legend=dict(
-                                            bgcolor="rgba(20,25,40,0.8)",
-                                            bordercolor="rgba(100,255,218,0.3)",
-                                            borderwidth=1,
-                                            font_color='#8892b0'
-                                        ),
-                                        margin=dict(l=10, r=10, t=50, b=10)
-                                    )
-                                    
-                                    fig.update_xaxes(
-                                        gridcolor='rgba(100,255,218,0.1)',
-                                        title_font_color='#8892b0',
-                                        tickfont_color='#8892b0',
-                                        showgrid=True,
-                                        zeroline=False
-                                    )
-                                    
-                                    fig.update_yaxes(
-                                        gridcolor='rgba(100,255,218,0.1)', 
-                                        title_font_color='#8892b0',
-                                        tickfont_color='#8892b0',
-                                        showgrid=True,
-                                        zeroline=False
-                                    )
-                                    
-                                    # Style the traces (data points)
-                                    fig.update_traces(
-                                        marker=dict(
-                                            line=dict(width=1, color='rgba(255,255,255,0.3)'),
-                                            opacity=0.8
-                                        ),
-                                        hoverlabel=dict(
-                                            bgcolor="rgba(20,25,40,0.9)",
-                                            font_color="#e1e5e9",
-                                            bordercolor="rgba(100,255,218,0.3)"
-                                        )
-                                    )
-                                    
-                                    st.plotly_chart(fig, use_container_width=True)
+                            # Built once per analysis and reused on every rerun
+                            view = objects_view(st.session_state, analysis["objects_detected"])
+                            if not view.frame.empty:
+                                # Scatter with the shared dark template, if the scores are present
+                                if view.figure is not None:
+                                    st.plotly_chart(view.figure, use_container_width=True)
                                 
                                 # Display full table with all columns
                                 st.subheader("📊 Detailed Analysis Table")
                                 
-                                # Clean the dataframe to remove any empty or invalid rows
-                                clean_df = objects_df.dropna(subset=['name']).copy()  # Remove rows with empty names
-                                clean_df = clean_df[clean_df['name'].str.strip() != '']  # Remove rows with blank names
+                                # Named objects only, most important columns first
+                                clean_df = view.table
                                 
                                 if not clean_df.empty:
-                                    # Show all available columns, prioritizing the most important ones
-                                    preferred_cols = ["name", "type", "environmental_impact", "sustainability_score", "confidence", "description", "recommended_action"]
-                                    available_cols = list(clean_df.columns)
-                                    
-                                    # Order columns by preference, then add any remaining columns
-                                    display_cols = []
-                                    for col in preferred_cols:
-                                        if col in available_cols:
-                                            display_cols.append(col)
-                                    
-                                    # Add any remaining columns not in preferred list
-                                    for col in available_cols:
-                                        if col not in display_cols:
-                                            display_cols.append(col)
-                                    
                                     # Display the complete dataframe with proper sizing
                                     st.dataframe(
-                                        clean_df[display_cols], 
+                                        clean_df, 
                                         use_container_width=True,
                                         height=min(400, len(clean_df) * 35 + 50)  # Dynamic height based on number of rows
                                     )
@@ -1037,10 +659,9 @@ def main():
                                     st.info(f"📋 Analysis complete: {len(clean_df)} objects detected and analyzed")
                                     
                                     # Add download option for the data
-                                    csv = clean_df.to_csv(index=False)
                                     st.download_button(
                                         label="📥 Download Analysis Data as CSV",
-                                        data=csv,
+                                        data=view.csv(),
                                         file_name=f"ecovision_analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                                         mime="text/csv"
                                     )
@@ -1065,6 +686,9 @@ def main():
                                 st.write("---")
             else:
                 st.info("👆 Upload an image and click 'Analyze with AI' to see results here!")
+            
+            # Engine events and the raw result, only when the debug panel is switched on
+            render_debug_panel(st.session_state.get("current_analysis"))
         
         # Recommendations section for comprehensive analysis
         st.header("💡 AI Environmental Recommendations")
@@ -1117,6 +741,8 @@ def main():
         with col_center:
             # Image input section - centered and compact
             st.subheader("📸 Choose Image Source")
+            # The API payload is owned by the session's image store, so the memory governor can release it
+            image_base64 = None
             image_source_option = st.radio(
                 "Select your preferred image input method:",
                 ("Upload Image", "Take Picture with Camera"),
@@ -1131,32 +757,26 @@ def main():
                     key="qa_file_uploader"
                 )
                 if uploaded_file:
-                    image = Image.open(uploaded_file)
-                    # Store the image and encode it
-                    st.session_state.current_image = image
-                    base64_image = eco_ai.encode_image(image)
-                    if base64_image:
-                        st.session_state.current_image_base64 = base64_image
-                    # Display image with max width for ChatGPT-style layout
-                    st.image(image, caption="Uploaded Image", width=500)
+                    # Ingest and encode once per upload; only the compact bytes stay in the session
+                    ingested = ingest_upload(uploaded_file)
+                    if ingested:
+                        image_base64 = encode_upload(uploaded_file)
+                        # Display image with max width for ChatGPT-style layout
+                        st.image(ingested.load_preview(), caption="Uploaded Image", width=500)
                 else:
-                    st.session_state.current_image = None
-                    st.session_state.current_image_base64 = None
+                    encoded_image_store(st.session_state).clear()
                     
             elif image_source_option == "Take Picture with Camera":
                 camera_image = st.camera_input("Take a picture for analysis", key="qa_camera")
                 if camera_image:
-                    image = Image.open(camera_image)
-                    # Store the image and encode it
-                    st.session_state.current_image = image
-                    base64_image = eco_ai.encode_image(image)
-                    if base64_image:
-                        st.session_state.current_image_base64 = base64_image
-                    # Display image with max width for ChatGPT-style layout
-                    st.image(image, caption="Captured Image", width=500)
+                    # Ingest and encode once per capture; only the compact bytes stay in the session
+                    ingested = ingest_upload(camera_image)
+                    if ingested:
+                        image_base64 = encode_upload(camera_image)
+                        # Display image with max width for ChatGPT-style layout
+                        st.image(ingested.load_preview(), caption="Captured Image", width=500)
                 else:
-                    st.session_state.current_image = None
-                    st.session_state.current_image_base64 = None
+                    encoded_image_store(st.session_state).clear()
 
             # Question input section - ChatGPT style
             st.subheader("💬 Ask Your Question")
@@ -1182,26 +802,33 @@ def main():
                     })
                     
                     ai_response = ""
+                    answer = None
 
                     # Check if the user's input is a simple polite phrase
-                    if eco_ai.is_polite_response(user_question.strip()):
+                    if is_polite_response(user_question.strip()):
                         ai_response = "You're very welcome! Feel free to ask me anything else about the image."
                     # Check if an image is present
-                    elif st.session_state.current_image is None:
+                    elif not image_base64:
                         ai_response = "Please upload an image or take a picture with your camera first!"
                     else:
-                        # Get AI response using the ChatGPT-style method
-                        with st.spinner("🤖 Analyzing..."):
-                            ai_response = eco_ai.analyze_image_with_question(
-                                st.session_state.current_image,
-                                user_question.strip()
-                            )
+                        # Stream the AI response into the chat as it is generated
+                        answer = stream_chat_answer(
+                            eco_ai,
+                            user_question.strip(),
+                            image_base64
+                        )
+                        ai_response = answer.text
                     
                     # Add AI response to chat history
                     st.session_state.chat_history.append({
                         "type": "ai",
                         "content": ai_response,
-                        "timestamp": datetime.now().strftime("%H:%M")
+                        "timestamp": datetime.now().strftime("%H:%M"),
+                        "time_to_first_token": answer.time_to_first_token if answer else None,
+                        "total_latency": answer.total_latency if answer else None,
+                        "prompt_tokens": answer.prompt_tokens if answer else None,
+                        "cached_tokens": answer.cached_tokens if answer else None,
+                        "error": answer.error if answer else None
                     })
                     
                     # Rerun to show new messages
@@ -1213,6 +840,7 @@ def main():
             # Display chat history - ChatGPT style with limited width
             if st.session_state.chat_history:
                 st.subheader("💬 Chat History")
+                render_archived_chat()
                 
                 # Create chat container with custom styling
                 for i, message in enumerate(st.session_state.chat_history):
@@ -1226,7 +854,7 @@ def main():
                     else:  # AI message
                         st.markdown(f"""
                         <div class="ai-message">
-                            <div class="message-header">🤖 EcoVision AI • {message["timestamp"]}</div>
+                            <div class="message-header">🤖 EcoVision AI • {message["timestamp"]}{answer_timing(message)}{answer_tokens(message)}</div>
                             <div>{message["content"]}</div>
                         </div>
                         """, unsafe_allow_html=True)
@@ -1235,10 +863,32 @@ def main():
             if len(st.session_state.chat_history) > 1:  # More than just the greeting
                 if st.button("🗑️ Clear Chat History"):
                     st.session_state.chat_history = []
-                    st.session_state.current_image = None
-                    st.session_state.current_image_base64 = None
+                    encoded_image_store(st.session_state).clear()
+                    conversation_state(st.session_state).reset()
+                    session_memory(st.session_state).reset_chat()
                     st.rerun()
     
+    elif st.session_state.app_mode == "batch_analysis":
+        # Batch Mode - many images analyzed concurrently, results stream into one table
+        st.header("📦 Batch Analysis")
+        batch_sources = batch_inputs("batch")
+        
+        if batch_sources and st.button("🚀 Analyze Batch with AI", type="primary", key="analyze_batch"):
+            run_batch_analysis(eco_ai, batch_sources, analysis_mode, batch_workers, batch_rpm, batch_tpm)
+        elif st.session_state.get("batch_results"):
+            render_batch_results(st.session_state.batch_results)
+        else:
+            st.info("👆 Upload images or enter a folder, then click 'Analyze Batch with AI'")
+    
+    elif st.session_state.app_mode == "history":
+        # History Mode - every stored analysis, filterable and paged
+        st.header("🗂️ Analysis History")
+        record = render_history(eco_ai.history, "gpt")
+        if record:
+            st.subheader("💡 Recommendations")
+            for rec in eco_ai.generate_recommendations(record["result"]):
+                st.write(f"• {rec}")
+    
     st.markdown("---")
     st.markdown("""
     <div style="text-align: center; color: #666;">
@@ -1247,6 +897,9 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
+    # Measure what this session keeps and evict under memory pressure
+    govern_session()
+
 if __name__ == "__main__":
     main()
 
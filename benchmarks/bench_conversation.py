@@ -0,0 +1,133 @@
+"""Per-turn prompt tokens of a multi-turn Q&A thread against the local stub.
+
+    python benchmarks/bench_conversation.py --turns 12 --budget 600
+    python benchmarks/bench_conversation.py --base-url http://127.0.0.1:8765/v1 --json conversation.json
+
+Asks the same sequence of follow-up questions about one image three ways and
+prints the prompt tokens the endpoint reported for every turn:
+
+    stateless   each question alone with the image (the behaviour before threads)
+    full        every earlier exchange re-sent verbatim
+    budgeted    the newest exchanges within --budget, older ones summarized
+
+The summary calls of the budgeted thread are small text-only requests to the
+summary model and are not included in its totals. The stub counts text at
+four characters per token and each image as 765 tokens; point --base-url at a
+real endpoint to see cached-token figures too.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecovision.batch import list_images  # noqa: E402
+from ecovision.cache import AnalysisCache  # noqa: E402
+from ecovision.client import build_client  # noqa: E402
+from ecovision.conversation import ConversationState, build_context  # noqa: E402
+from ecovision.engine import EcoVisionAI, StreamedAnswer  # noqa: E402
+from ecovision.history import HistoryStore  # noqa: E402
+from ecovision.imaging import prepare_image  # noqa: E402
+from ecovision.neardup import NearDuplicateIndex  # noqa: E402
+from ecovision.stub_server import CANNED_ANSWER, StubServer  # noqa: E402
+
+DEFAULT_IMAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "sample_images", "Forest-ocean-waste-Image")
+QUESTIONS = [
+    "What environmental issues do you see in this image?",
+    "How severe is the plastic pollution compared to the rest of the scene?",
+    "Which species could be affected by it?",
+    "What would a local clean-up need to focus on first?",
+    "Is the forest canopy healthy?",
+    "How could the shoreline be protected long term?",
+    "Summarize the biggest risk in one sentence.",
+    "What should a volunteer bring to help?",
+]
+
+
+def run_thread(eco_ai, image, base64_image, turns, budget):
+    """Ask `turns` questions in one thread; returns per-turn dicts (budget None = stateless)"""
+    chat_history, conversation, rows = [], ConversationState(), []
+    for turn in range(turns):
+        question = QUESTIONS[turn % len(QUESTIONS)]
+        chat_history.append({"type": "user", "content": question})
+        context, usage = [], None
+        if budget is not None:
+            conversation.follow("bench", chat_history[:-1])
+            context, usage = build_context(eco_ai, conversation, chat_history[:-1], budget=budget)
+        answer = StreamedAnswer()
+        for _ in eco_ai.stream_answer(image, question, base64_image=base64_image, answer=answer, context=context):
+            pass
+        chat_history.append({"type": "ai", "content": answer.text, "time_to_first_token": answer.time_to_first_token,
+                             "error": answer.error})
+        rows.append({"turn": turn + 1, "prompt_tokens": answer.prompt_tokens, "cached_tokens": answer.cached_tokens,
+                     "context_turns": usage.context_turns if usage else 0,
+                     "summarized": usage.summarized if usage else False, "error": answer.error})
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Image folder (the first image is used)")
+    parser.add_argument("--turns", type=int, default=12, help="Questions per thread")
+    parser.add_argument("--budget", type=int, default=600, help="Context token budget for the budgeted thread")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub base latency in seconds")
+    parser.add_argument("--base-url", help="Use this endpoint instead of the in-process stub")
+    parser.add_argument("--json", help="Write the per-turn results to this JSON file")
+    args = parser.parse_args(argv)
+
+    paths = list_images(args.images)
+    if not paths:
+        print(f"No images found under {args.images}", file=sys.stderr)
+        return 1
+    image = Image.open(paths[0])
+    image.load()
+    base64_image = prepare_image(image).base64
+
+    stub = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        # Long canned answers make the growth of re-sent history visible
+        stub = StubServer(latency=args.latency, jitter=0.0, chunk_interval=0.0, seed=0,
+                          answer=" ".join([CANNED_ANSWER] * 3)).start()
+        base_url = stub.url
+
+    client = build_client(os.getenv("OPENAI_API_KEY", "stub"), base_url)
+    eco_ai = EcoVisionAI(client=client, cache=AnalysisCache(":memory:", max_entries=0),
+                         history=HistoryStore(":memory:"), near_duplicates=NearDuplicateIndex(":memory:"))
+    try:
+        threads = {
+            "stateless": run_thread(eco_ai, image, base64_image, args.turns, None),
+            "full": run_thread(eco_ai, image, base64_image, args.turns, 10 ** 9),
+            "budgeted": run_thread(eco_ai, image, base64_image, args.turns, args.budget),
+        }
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    print(f"{args.turns} turns about {os.path.basename(paths[0])}, budget {args.budget} tokens, endpoint {base_url}")
+    print(f"{'turn':>6}" + "".join(f"{name:>12}" for name in threads) + f"{'context':>10}{'cached':>10}")
+    for turn in range(args.turns):
+        budgeted = threads["budgeted"][turn]
+        cells = "".join(f"{(rows[turn]['prompt_tokens'] or 0):>12,}" for rows in threads.values())
+        marker = " +summary" if budgeted["summarized"] else ""
+        print(f"{turn + 1:>6}{cells}{budgeted['context_turns']:>10}{(budgeted['cached_tokens'] or 0):>10,}{marker}")
+    totals = {name: sum(row["prompt_tokens"] or 0 for row in rows) for name, rows in threads.items()}
+    print(f"{'total':>6}" + "".join(f"{total:>12,}" for total in totals.values()))
+    errors = sum(1 for rows in threads.values() for row in rows if row["error"])
+    if errors:
+        print(f"{errors} turns failed", file=sys.stderr)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "threads": threads, "totals": totals}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Peak memory of taking in one upload, by upload size: full decode vs. ingestion at working resolution.
+
+    python benchmarks/bench_ingest.py --sizes 12 24 50 100
+    python benchmarks/bench_ingest.py --sizes 50 --format PNG --json ingest.json
+
+For each size (megapixels), a synthetic photo is saved as JPEG (or PNG).
+Each variant then runs in a fresh interpreter, so every peak RSS starts from
+the same baseline:
+- before: what the apps used to do with an upload. Image.open, keep the PIL
+  image in the session, prepare_image for the API payload, and st.image of
+  the full image (one full-size JPEG encode).
+- after: EncodedImageStore.ingest, which decodes at working resolution with
+  draft/reduce, then the API payload from the working copy. Only the
+  compact bytes and a preview are kept.
+The report gives peak RSS above the bare-import baseline, the bytes the
+session keeps afterwards, and the time taken.
+"""
+
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecovision.imaging import prepare_image  # noqa: E402
+from ecovision.session import EncodedImageStore  # noqa: E402
+
+VARIANTS = ("baseline", "before", "after")
+
+
+def peak_rss_mb():
+    """This process's peak RSS. VmHWM on Linux, because ru_maxrss keeps the parent's peak across fork and exec"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def synthetic_photo(megapixels, seed=0):
+    """Smooth random texture at 4:3, roughly as compressible as a landscape photo"""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    seed_image = Image.fromarray((np.random.default_rng(seed).random((96, 128, 3)) * 255).astype("uint8"))
+    return seed_image.resize((width, height), Image.BICUBIC)
+
+
+def run_variant(variant, path):
+    """One upload taken in by `variant`; returns (bytes kept in the session, seconds)"""
+    with open(path, "rb") as f:
+        upload = io.BytesIO(f.read())  # Streamlit hands the app an in-memory upload
+    started = time.perf_counter()
+    if variant == "before":
+        session = {"current_image": Image.open(upload)}
+        prepared = prepare_image(session["current_image"])
+        display = io.BytesIO()
+        session["current_image"].convert("RGB").save(display, format="JPEG", quality=75)
+        image = session["current_image"]
+        held = image.width * image.height * len(image.getbands()) + len(prepared.base64) + display.tell()
+    elif variant == "after":
+        store = EncodedImageStore()
+        store.ingest("upload", upload)
+        store.get("upload")
+        held = store.nbytes
+    else:
+        held = 0
+    return held, time.perf_counter() - started
+
+
+def measure(variant, path):
+    """Run one variant in a fresh interpreter"""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", variant, path],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[12, 24, 50, 100], help="Upload sizes in MP")
+    parser.add_argument("--format", choices=["JPEG", "PNG"], default="JPEG", help="Upload file format")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--child", nargs=2, metavar=("VARIANT", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        variant, path = args.child
+        held, seconds = run_variant(variant, path)
+        print(json.dumps({"peak_rss_mb": peak_rss_mb(), "held_bytes": held, "seconds": seconds}))
+        return 0
+
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for megapixels in args.sizes:
+            path = os.path.join(folder, f"upload_{megapixels:g}mp.{args.format.lower()}")
+            image = synthetic_photo(megapixels)
+            image.save(path, format=args.format, **({"quality": 90} if args.format == "JPEG" else {}))
+            size = image.size
+            del image
+            results = {variant: measure(variant, path) for variant in VARIANTS}
+            baseline = results.pop("baseline")["peak_rss_mb"]
+            for variant, result in results.items():
+                rows.append({"megapixels": megapixels, "size": size, "file_bytes": os.path.getsize(path),
+                             "variant": variant, "peak_rss_mb": result["peak_rss_mb"] - baseline,
+                             "held_bytes": result["held_bytes"], "seconds": result["seconds"]})
+
+    print(f"{args.format} uploads; peak RSS above a {baseline:.0f} MB import baseline, fresh interpreter per run")
+    print(f"{'upload':>16}{'file':>9}{'variant':>9}{'peak RSS':>11}{'kept':>11}{'time':>8}")
+    for row in rows:
+        width, height = row["size"]
+        print(f"{f'{width}x{height}':>16}{row['file_bytes'] / 1e6:>7.1f}MB{row['variant']:>9}"
+              f"{row['peak_rss_mb']:>9.0f}MB{row['held_bytes'] / 1e6:>9.1f}MB{row['seconds']:>7.2f}s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Script-thread blocking time: analyses run inline vs. submitted to the background job queue.
+
+    python benchmarks/bench_jobs.py --jobs 16 --workers 8
+    python benchmarks/bench_jobs.py --base-url https://api.openai.com/v1 --jobs 4 --json jobs.json
+
+Inline is what the "Analyze with AI" button used to do: the script thread
+waits for every analysis. Queued submits each analysis to an
+ecovision.jobs.JobQueue and polls it every --poll seconds, the way
+ui.poll_analysis does. The script thread is then blocked only for the
+submit call. Results arrive as soon as the pool gets to them, plus up to one
+poll interval. The cache is disabled so every analysis reaches the endpoint.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecovision.batch import list_images  # noqa: E402
+from ecovision.cache import AnalysisCache  # noqa: E402
+from ecovision.client import build_client  # noqa: E402
+from ecovision.engine import EcoVisionAI  # noqa: E402
+from ecovision.history import HistoryStore  # noqa: E402
+from ecovision.jobs import JobQueue  # noqa: E402
+from ecovision.neardup import NearDuplicateIndex  # noqa: E402
+from ecovision.stub_server import StubServer  # noqa: E402
+
+DEFAULT_IMAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "sample_images", "Forest-ocean-waste-Image")
+
+
+def make_engine(client):
+    return EcoVisionAI(client=client, cache=AnalysisCache(":memory:", max_entries=0),
+                       history=HistoryStore(":memory:"), near_duplicates=NearDuplicateIndex(":memory:"),
+                       near_duplicate_distance=-1)
+
+
+def run_inline(eco_ai, images):
+    """Each analysis blocks the caller; returns (blocked seconds per call, seconds to each result, wall)"""
+    blocked, ready = [], []
+    started = time.perf_counter()
+    for image in images:
+        call = time.perf_counter()
+        eco_ai.analyze_image_with_ai(image, "comprehensive", verbose=False)
+        blocked.append(time.perf_counter() - call)
+        ready.append(time.perf_counter() - started)
+    return blocked, ready, time.perf_counter() - started
+
+
+def run_queued(eco_ai, images, workers, poll):
+    """Submit every analysis, then poll until all are done"""
+    queue = JobQueue(max_workers=workers)
+    blocked, ready, jobs = [], [], []
+    started = time.perf_counter()
+    for image in images:
+        call = time.perf_counter()
+        jobs.append(queue.submit(lambda job, image=image: eco_ai.analyze_image_with_ai(image, "comprehensive",
+                                                                                       verbose=False)))
+        blocked.append(time.perf_counter() - call)
+    pending = list(jobs)
+    while pending:
+        time.sleep(poll)
+        for job in [job for job in pending if job.done]:
+            ready.append(time.perf_counter() - started)
+            pending.remove(job)
+    wall = time.perf_counter() - started
+    failed = sum(job.status != "done" for job in jobs)
+    queue.shutdown()
+    return blocked, ready, wall, failed
+
+
+def summarize(blocked, ready, wall):
+    return {
+        "blocked_p50": float(np.percentile(blocked, 50)),
+        "blocked_max": float(np.max(blocked)),
+        "ready_p50": float(np.percentile(ready, 50)),
+        "ready_p95": float(np.percentile(ready, 95)),
+        "wall": wall,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Image folder")
+    parser.add_argument("--jobs", type=int, default=16, help="Analyses to run per variant")
+    parser.add_argument("--workers", type=int, default=8, help="Job queue worker threads")
+    parser.add_argument("--poll", type=float, default=0.5, help="Seconds between status polls")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub base latency in seconds")
+    parser.add_argument("--base-url", help="Use this endpoint instead of the in-process stub")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    paths = list_images(args.images)
+    if not paths:
+        print(f"No images found under {args.images}", file=sys.stderr)
+        return 1
+    images = [Image.open(paths[i % len(paths)]) for i in range(args.jobs)]
+    for image in images:
+        image.load()
+
+    stub = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        stub = StubServer(latency=args.latency, seed=0).start()
+        base_url = stub.url
+    client = build_client(os.getenv("OPENAI_API_KEY", "stub"), base_url)
+
+    try:
+        inline = summarize(*run_inline(make_engine(client), images))
+        *queued, failed = run_queued(make_engine(client), images, args.workers, args.poll)
+        queued = summarize(*queued)
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    print(f"{args.jobs} analyses, {args.workers} workers, {args.poll}s poll, endpoint {base_url}")
+    print(f"{'variant':>8}{'blocked p50':>14}{'blocked max':>14}{'result p50':>13}{'result p95':>13}{'wall':>9}")
+    for name, row in (("inline", inline), ("queued", queued)):
+        print(f"{name:>8}{row['blocked_p50'] * 1000:>12.1f}ms{row['blocked_max'] * 1000:>12.1f}ms"
+              f"{row['ready_p50']:>12.2f}s{row['ready_p95']:>12.2f}s{row['wall']:>8.2f}s")
+    if failed:
+        print(f"{failed} queued jobs failed")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "inline": inline, "queued": queued, "failed": failed}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
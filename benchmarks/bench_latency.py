@@ -0,0 +1,186 @@
+"""End-to-end latency benchmark against the local OpenAI-compatible stub.
+
+    python benchmarks/bench_latency.py --iterations 5 --concurrency 4 --latency 0.3
+    python benchmarks/bench_latency.py --json baseline.json
+
+Drives analyze_image_with_ai, analyze_image_with_question and stream_answer
+over the sample images and reports p50/p95/p99 latency, throughput, bytes sent
+and the client-side overhead (measured latency minus the stub's injected
+delay). Encoding and scoring are also timed on their own. Pass --base-url to
+point at another OpenAI-compatible endpoint instead of the in-process stub.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecovision.batch import list_images  # noqa: E402
+from ecovision.cache import AnalysisCache  # noqa: E402
+from ecovision.client import build_client  # noqa: E402
+from ecovision.engine import EcoVisionAI, StreamedAnswer  # noqa: E402
+from ecovision.history import HistoryStore  # noqa: E402
+from ecovision.imaging import prepare_image  # noqa: E402
+from ecovision.neardup import NearDuplicateIndex  # noqa: E402
+from ecovision.scoring import score_analysis  # noqa: E402
+from ecovision.stub_server import StubServer  # noqa: E402
+from ecovision.transport import Transport  # noqa: E402
+
+DEFAULT_IMAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "sample_images", "Forest-ocean-waste-Image")
+QUESTION = "What environmental issues do you see in this image?"
+
+
+def percentiles(samples):
+    if not samples:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "mean": float(np.mean(samples))}
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def run_phase(name, images, call, iterations, concurrency, stub):
+    """Run call(image) iterations × len(images) times and summarize it"""
+    if stub is not None:
+        stub.reset_counters()
+    jobs = [image for _ in range(iterations) for image in images]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda image: timed(lambda: call(image)), jobs))
+    wall = time.perf_counter() - started
+
+    latencies = [latency for latency, _ in outcomes]
+    errors = sum(1 for _, ok in outcomes if not ok)
+    summary = {"phase": name, "requests": len(jobs), "errors": errors, "wall_s": wall,
+               "throughput_rps": len(jobs) / wall, **percentiles(latencies)}
+    if stub is not None:
+        summary["bytes_sent"] = stub.bytes_received
+        summary["kb_per_request"] = stub.bytes_received / 1024 / max(stub.requests, 1)
+        summary["overhead_ms"] = (sum(latencies) - stub.delay_total) / len(jobs) * 1000
+    return summary
+
+
+def print_table(rows):
+    columns = ["phase", "requests", "errors", "p50", "p95", "p99", "throughput_rps", "kb_per_request", "overhead_ms"]
+    print(" ".join(f"{column:>14}" for column in columns))
+    for row in rows:
+        cells = []
+        for column in columns:
+            value = row.get(column)
+            if value is None:
+                cells.append(f"{'—':>14}")
+            elif isinstance(value, float):
+                cells.append(f"{value * 1000:>12.1f}ms" if column in ("p50", "p95", "p99") else f"{value:>14.2f}")
+            else:
+                cells.append(f"{value:>14}")
+        print(" ".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Image folder")
+    parser.add_argument("--iterations", type=int, default=3, help="Passes over the image folder per phase")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent requests")
+    parser.add_argument("--mode", default="comprehensive", help="Analysis type")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Stub latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub injected error rate")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status of injected errors")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected errors")
+    parser.add_argument("--retries", type=int, default=0, help="Transport retries per call (0 measures raw errors)")
+    parser.add_argument("--base-url", help="Use this endpoint instead of the in-process stub")
+    parser.add_argument("--json", help="Write the results to this JSON file as a regression baseline")
+    args = parser.parse_args(argv)
+
+    images = [Image.open(path) for path in list_images(args.images)]
+    for image in images:
+        image.load()
+    if not images:
+        print(f"No images found under {args.images}", file=sys.stderr)
+        return 1
+
+    stub = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        stub = StubServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                          error_status=args.error_status, retry_after=args.retry_after, seed=0).start()
+        base_url = stub.url
+
+    # max_entries=0 keeps the cache empty so every analysis reaches the endpoint
+    client = build_client(os.getenv("OPENAI_API_KEY", "stub"), base_url)
+    transport = Transport(max_retries=args.retries)
+    eco_ai = EcoVisionAI(client=client, cache=AnalysisCache(":memory:", max_entries=0),
+                         history=HistoryStore(":memory:"), transport=transport,
+                         near_duplicates=NearDuplicateIndex(":memory:"), near_duplicate_distance=-1)
+
+    # Local stages on their own
+    encode_times = [timed(lambda: prepare_image(image))[0] for image in images for _ in range(args.iterations)]
+    sample_result = eco_ai.analyze_image_with_ai(images[0], args.mode, verbose=False)
+    score_times = [timed(lambda: score_analysis(sample_result))[0] for _ in range(1000)]
+    encoded = {id(image): prepare_image(image).base64 for image in images}
+
+    def analyze(image):
+        return "error" not in eco_ai.analyze_image_with_ai(image, args.mode, verbose=False)
+
+    def question(image):
+        answer = eco_ai.analyze_image_with_question(image, QUESTION, base64_image=encoded[id(image)])
+        return not answer.startswith("I encountered an error")
+
+    ttfts = []
+
+    def stream(image):
+        answer = StreamedAnswer()
+        for _ in eco_ai.stream_answer(image, QUESTION, base64_image=encoded[id(image)], answer=answer):
+            pass
+        if answer.error is None:
+            ttfts.append(answer.time_to_first_token)
+        return answer.error is None
+
+    try:
+        rows = [
+            run_phase("analyze", images, analyze, args.iterations, args.concurrency, stub),
+            run_phase("question", images, question, args.iterations, args.concurrency, stub),
+            run_phase("stream", images, stream, args.iterations, args.concurrency, stub),
+        ]
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    local = {
+        "encode": percentiles(encode_times),
+        "score": percentiles(score_times),
+        "stream_ttft": percentiles(ttfts),
+    }
+    print(f"{len(images)} images × {args.iterations} iterations, concurrency {args.concurrency}, "
+          f"endpoint {base_url}")
+    print_table(rows)
+    transport_stats = transport.stats()
+    print(f"transport: {transport_stats['retries']} retries, {transport_stats['failures']} failed attempts, "
+          f"{transport_stats['short_circuited']} short-circuited, circuit {transport_stats['circuit']}")
+    print()
+    for stage, stats in local.items():
+        if stats["p50"] is not None:
+            print(f"{stage:>12}: p50 {stats['p50'] * 1000:.2f}ms  p95 {stats['p95'] * 1000:.2f}ms  "
+                  f"p99 {stats['p99'] * 1000:.2f}ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "phases": rows, "local": local, "transport": transport_stats}, f, indent=2, default=float)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""Near-duplicate index: lookup latency at scale and pHash robustness on the sample images.
+
+    python benchmarks/bench_near_duplicates.py --entries 100000
+    python benchmarks/bench_near_duplicates.py --entries 100000 --path /tmp/neardup.sqlite3 --json neardup.json
+
+Fills a NearDuplicateIndex with random 64-bit hashes spread over a few
+analysis scopes, then times nearest() for queries a few bits away from an
+indexed hash (hits) and for random hashes (misses). With --path the index
+is written to that SQLite file and the time to reload it is reported too.
+
+The second part perturbs each sample image (JPEG recompression, resize, small
+crops and shifts, brightness) and prints the Hamming distance to the original
+next to the closest distance between two different images, to help choose
+ECOVISION_NEAR_DUPLICATE_DISTANCE.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageEnhance
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecovision import config  # noqa: E402
+from ecovision.batch import list_images  # noqa: E402
+from ecovision.imaging import perceptual_hash  # noqa: E402
+from ecovision.neardup import NearDuplicateIndex  # noqa: E402
+
+DEFAULT_IMAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "sample_images", "Forest-ocean-waste-Image")
+SCOPES = ["comprehensive", "waste_detection", "biodiversity"]
+
+
+def percentiles(samples):
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99}
+
+
+def flip_bits(value, count, rng):
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def perturbations(image):
+    width, height = image.size
+    recompressed = io.BytesIO()
+    image.save(recompressed, "JPEG", quality=30)
+    return {
+        "jpeg_q30": Image.open(io.BytesIO(recompressed.getvalue())),
+        "half_size": image.resize((width // 2, height // 2)),
+        "brighter": ImageEnhance.Brightness(image).enhance(1.15),
+        "crop_3pct": image.crop((int(width * 0.03), int(height * 0.03), width, height)),
+        "shift_5pct": image.crop((int(width * 0.05), 0, width, height)).resize((width, height)),
+        "crop_6pct": image.crop((int(width * 0.06), 0, width, int(height * 0.95))),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000, help="Indexed hashes")
+    parser.add_argument("--queries", type=int, default=2000, help="Lookups per kind")
+    parser.add_argument("--distance", type=int, default=config.NEAR_DUPLICATE_DISTANCE, help="Match threshold")
+    parser.add_argument("--path", default=":memory:", help="SQLite file for the index (default: in memory)")
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Image folder for the robustness check")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    index = NearDuplicateIndex(args.path, max_entries=0)
+    index.clear()
+    hashes = [(rng.getrandbits(64), SCOPES[i % len(SCOPES)]) for i in range(args.entries)]
+    started = time.perf_counter()
+    for i, (phash, scope) in enumerate(hashes):
+        index.add(phash, scope, f"key-{i}")
+    fill_s = time.perf_counter() - started
+
+    reload_s = None
+    if args.path != ":memory:":
+        started = time.perf_counter()
+        index = NearDuplicateIndex(args.path, max_entries=0)
+        reload_s = time.perf_counter() - started
+
+    hit_times, miss_times, found = [], [], 0
+    for _ in range(args.queries):
+        phash, scope = rng.choice(hashes)
+        query = flip_bits(phash, rng.randint(0, args.distance), rng)
+        started = time.perf_counter()
+        found += index.nearest(query, scope, args.distance) is not None
+        hit_times.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        index.nearest(rng.getrandbits(64), rng.choice(SCOPES), args.distance)
+        miss_times.append(time.perf_counter() - started)
+
+    lookup = {"near": percentiles(hit_times), "random": percentiles(miss_times)}
+    print(f"{len(index):,} indexed hashes ({args.path}), filled in {fill_s:.1f}s"
+          + (f", reloaded in {reload_s * 1000:.0f}ms" if reload_s is not None else ""))
+    for kind, stats in lookup.items():
+        print(f"{kind:>8} lookups: p50 {stats['p50'] * 1e6:.0f}µs  p95 {stats['p95'] * 1e6:.0f}µs  "
+              f"p99 {stats['p99'] * 1e6:.0f}µs")
+    print(f"near lookups matched: {found}/{args.queries}")
+
+    robustness = {}
+    images = [Image.open(path).convert("RGB") for path in list_images(args.images)]
+    if images:
+        originals = [perceptual_hash(image) for image in images]
+        closest_other = min(hamming(a, b) for i, a in enumerate(originals) for b in originals[:i]) \
+            if len(originals) > 1 else None
+        for image, original in zip(images, originals):
+            for name, variant in perturbations(image).items():
+                robustness.setdefault(name, []).append(hamming(original, perceptual_hash(variant)))
+        print()
+        print(f"pHash distance to the original over {len(images)} images "
+              f"(closest pair of different images: {closest_other}, threshold {args.distance}):")
+        for name, distances in robustness.items():
+            matched = sum(distance <= args.distance for distance in distances)
+            print(f"{name:>12}: max {max(distances):>2}, mean {np.mean(distances):4.1f}, "
+                  f"{matched}/{len(distances)} matched")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "fill_s": fill_s, "reload_s": reload_s, "lookup": lookup,
+                       "robustness": robustness}, f, indent=2, default=float)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
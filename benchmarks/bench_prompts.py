@@ -0,0 +1,125 @@
+"""Output tokens and latency per analysis type: per-mode templates vs. the single comprehensive prompt.
+
+    python benchmarks/bench_prompts.py --iterations 3 --token-latency 0.01
+    python benchmarks/bench_prompts.py --base-url https://api.openai.com/v1 --iterations 1 --json prompts.json
+
+For every analysis type the sample images are analyzed twice: once with the
+single comprehensive prompt, schema and 1500-token ceiling every mode used to
+share, and once with the mode's own template from ecovision.templates. The
+stub trims its canned analysis to the requested schema and charges
+--token-latency seconds per completion token, so shorter JSON also shows up
+as lower latency; against a real endpoint both come from the model.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecovision.batch import list_images  # noqa: E402
+from ecovision.cache import AnalysisCache  # noqa: E402
+from ecovision.client import build_client  # noqa: E402
+from ecovision.engine import EcoVisionAI  # noqa: E402
+from ecovision.history import HistoryStore  # noqa: E402
+from ecovision.neardup import NearDuplicateIndex  # noqa: E402
+from ecovision.stub_server import StubServer  # noqa: E402
+from ecovision.templates import ANALYSIS_MODES, TEMPLATES  # noqa: E402
+
+DEFAULT_IMAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "sample_images", "Forest-ocean-waste-Image")
+
+# What every mode sent before the registry: the comprehensive template
+SINGLE_PROMPT = {mode: TEMPLATES["comprehensive"] for mode in ANALYSIS_MODES}
+
+
+def run_variant(client, templates, mode, images, iterations):
+    """Analyze every image `iterations` times with `templates`; returns a summary dict"""
+    # max_entries=0 keeps the cache empty so every analysis reaches the endpoint
+    history = HistoryStore(":memory:")
+    eco_ai = EcoVisionAI(client=client, cache=AnalysisCache(":memory:", max_entries=0), history=history,
+                         templates=templates, near_duplicates=NearDuplicateIndex(":memory:"),
+                         near_duplicate_distance=-1)
+    latencies, sizes, errors = [], [], 0
+    for _ in range(iterations):
+        for image in images:
+            started = time.perf_counter()
+            result = eco_ai.analyze_image_with_ai(image, mode, verbose=False)
+            latencies.append(time.perf_counter() - started)
+            errors += "error" in result
+            sizes.append(len(json.dumps(result)))
+    rows, _ = history.page(limit=len(latencies))
+    completion = [row["completion_tokens"] for row in rows if row["completion_tokens"] is not None]
+    prompt = [row["prompt_tokens"] for row in rows if row["prompt_tokens"] is not None]
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "prompt_tokens": float(np.mean(prompt)) if prompt else None,
+        "completion_tokens": float(np.mean(completion)) if completion else None,
+        "result_bytes": float(np.mean(sizes)),
+        "p50": float(np.percentile(latencies, 50)),
+        "p95": float(np.percentile(latencies, 95)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Image folder")
+    parser.add_argument("--iterations", type=int, default=2, help="Passes over the image folder per variant")
+    parser.add_argument("--modes", nargs="+", default=ANALYSIS_MODES, choices=ANALYSIS_MODES,
+                        help="Analysis types to compare")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub base latency in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.005,
+                        help="Stub seconds per completion token")
+    parser.add_argument("--base-url", help="Use this endpoint instead of the in-process stub")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    images = [Image.open(path) for path in list_images(args.images)]
+    for image in images:
+        image.load()
+    if not images:
+        print(f"No images found under {args.images}", file=sys.stderr)
+        return 1
+
+    stub = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        stub = StubServer(latency=args.latency, token_latency=args.token_latency, seed=0).start()
+        base_url = stub.url
+    client = build_client(os.getenv("OPENAI_API_KEY", "stub"), base_url)
+
+    results = []
+    try:
+        for mode in args.modes:
+            for variant, templates in (("single", SINGLE_PROMPT), ("template", TEMPLATES)):
+                summary = run_variant(client, templates, mode, images, args.iterations)
+                results.append({"mode": mode, "variant": variant, **summary})
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    print(f"{len(images)} images × {args.iterations} iterations per variant, endpoint {base_url}")
+    print(f"{'mode':>16}{'variant':>10}{'max_tokens':>12}{'prompt':>9}{'output':>9}{'bytes':>8}{'p50':>10}{'p95':>10}")
+    for row in results:
+        templates = SINGLE_PROMPT if row["variant"] == "single" else TEMPLATES
+        prompt = f"{row['prompt_tokens']:.0f}" if row["prompt_tokens"] is not None else "—"
+        output = f"{row['completion_tokens']:.0f}" if row["completion_tokens"] is not None else "—"
+        print(f"{row['mode']:>16}{row['variant']:>10}{templates[row['mode']].max_tokens:>12}{prompt:>9}{output:>9}"
+              f"{row['result_bytes']:>8.0f}{row['p50'] * 1000:>8.0f}ms{row['p95'] * 1000:>8.0f}ms"
+              f"{'  ' + str(row['errors']) + ' errors' if row['errors'] else ''}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Rerun time of the Detected Objects section: rebuilt every rerun vs. memoized per analysis.
+
+    python benchmarks/bench_rerun.py --objects 50 --reruns 30
+
+A synthetic analysis with --objects detected objects is put on screen, and
+an unrelated sidebar button is clicked --reruns times. Every click reruns
+the whole script. There are two variants:
+- before: the old code, which built the DataFrame and px.scatter and applied
+  four styling passes on every rerun.
+- after: session.objects_view, which builds the frame, figure (with the
+  shared dark template), table and CSV once per analysis.
+The first, uncached run is reported separately from the reruns.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMPACTS = ("positive", "negative", "neutral")
+TYPES = ("vegetation", "waste", "water", "wildlife", "infrastructure")
+
+
+def synthetic_analysis(count, seed=0):
+    rng = random.Random(seed)
+    return {
+        "summary": "Synthetic analysis for the rerun benchmark",
+        "objects_detected": [
+            {
+                "name": f"Object {i + 1}",
+                "type": rng.choice(TYPES),
+                "confidence": round(rng.uniform(0.5, 1.0), 2),
+                "environmental_impact": rng.choice(IMPACTS),
+                "sustainability_score": rng.randint(1, 10),
+                "description": "A detected object with a sentence or two of description, as the model returns.",
+                "recommended_action": "Keep monitoring and act on the concerns listed above.",
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def objects_page(analysis, variant):
+    """The Detected Objects section of app_gpt.py, old or memoized (AppTest runs the function body)"""
+    import pandas as pd
+    import plotly.express as px
+    import streamlit as st
+
+    from ecovision.session import objects_view
+
+    st.sidebar.button("Unrelated sidebar click")
+    if variant == "before":
+        objects_df = pd.DataFrame(analysis["objects_detected"])
+        fig = px.scatter(objects_df, x="sustainability_score", y="confidence", color="environmental_impact",
+                         size="sustainability_score", hover_data=["name", "type"],
+                         title="🌍 Environmental Objects Analysis",
+                         color_discrete_map={"positive": "#1de9b6", "negative": "#ff6b6b", "neutral": "#ffd93d"})
+        fig.update_layout(plot_bgcolor="rgba(0,0,0,0)", paper_bgcolor="rgba(15,20,25,0.8)", font_color="#8892b0",
+                          title_font_size=18, title_font_color="#64ffda", title_x=0.5, showlegend=True,
+                          legend=dict(bgcolor="rgba(20,25,40,0.8)", bordercolor="rgba(100,255,218,0.3)",
+                                      borderwidth=1, font_color="#8892b0"),
+                          margin=dict(l=10, r=10, t=50, b=10))
+        axis = dict(gridcolor="rgba(100,255,218,0.1)", title_font_color="#8892b0", tickfont_color="#8892b0",
+                    showgrid=True, zeroline=False)
+        fig.update_xaxes(**axis)
+        fig.update_yaxes(**axis)
+        fig.update_traces(marker=dict(line=dict(width=1, color="rgba(255,255,255,0.3)"), opacity=0.8),
+                          hoverlabel=dict(bgcolor="rgba(20,25,40,0.9)", font_color="#e1e5e9",
+                                          bordercolor="rgba(100,255,218,0.3)"))
+        clean_df = objects_df.dropna(subset=["name"]).copy()
+        clean_df = clean_df[clean_df["name"].str.strip() != ""]
+        csv = clean_df.to_csv(index=False)
+    else:
+        view = objects_view(st.session_state, analysis["objects_detected"])
+        fig, clean_df, csv = view.figure, view.table, view.csv()
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(clean_df, use_container_width=True, height=min(400, len(clean_df) * 35 + 50))
+    st.download_button("📥 Download Analysis Data as CSV", data=csv, file_name="analysis.csv", mime="text/csv")
+
+
+def run_variant(analysis, variant, reruns):
+    at = AppTest.from_function(objects_page, kwargs={"analysis": analysis, "variant": variant}, default_timeout=60)
+    started = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - started
+    times = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.sidebar.button[0].click().run()
+        times.append(time.perf_counter() - started)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+    return {
+        "first": first,
+        "p50": float(np.percentile(times, 50)),
+        "p95": float(np.percentile(times, 95)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--objects", type=int, default=50, help="Detected objects in the synthetic analysis")
+    parser.add_argument("--reruns", type=int, default=30, help="Sidebar clicks per variant")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    analysis = synthetic_analysis(args.objects)
+    # Untimed pass so both variants start with Plotly and pandas imported
+    for variant in ("before", "after"):
+        run_variant(analysis, variant, 1)
+    results = {variant: run_variant(analysis, variant, args.reruns) for variant in ("before", "after")}
+
+    print(f"{args.objects} objects, {args.reruns} reruns per variant")
+    print(f"{'variant':>8}{'first run':>12}{'rerun p50':>12}{'rerun p95':>12}")
+    for variant, row in results.items():
+        print(f"{variant:>8}{row['first'] * 1000:>10.1f}ms{row['p50'] * 1000:>10.1f}ms{row['p95'] * 1000:>10.1f}ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Streamlit script-run time of an analysis: per-event page output vs. the opt-in debug panel.
+
+    python benchmarks/bench_script_run.py --iterations 5
+
+Each sample image is analyzed inside a Streamlit script run (AppTest) against
+the in-process stub, with the cache disabled. Three variants are measured:
+- before: the old reporter. It wrote every engine event into the page (an
+  st.sidebar.info per encode, st.write per step, an expander with the raw
+  response) plus an always-on analysis JSON expander.
+- quiet: the current reporter. It only collects events, with the debug panel off.
+- panel: the same reporter with the debug panel switched on.
+Both the run time and the number of page elements are reported.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from streamlit.testing.v1 import AppTest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecovision.batch import list_images  # noqa: E402
+from ecovision.stub_server import StubServer  # noqa: E402
+
+DEFAULT_IMAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "sample_images", "Forest-ocean-waste-Image")
+VARIANTS = ("before", "quiet", "panel")
+
+
+def analysis_page(base_url, path, variant):
+    """The analysis part of app.py as a standalone script (AppTest runs the function body)"""
+    import streamlit as st
+    from PIL import Image
+
+    from ecovision.cache import AnalysisCache
+    from ecovision.client import build_client
+    from ecovision.engine import EcoVisionAI
+    from ecovision.history import HistoryStore
+    from ecovision.neardup import NearDuplicateIndex
+    from ecovision.ui import render_debug_panel, streamlit_reporter
+    from ecovision.usage import UsageLedger
+
+    def legacy_reporter(event, message):
+        if event == "encoded":
+            st.sidebar.info(message)
+        elif event == "encode_error":
+            st.error(message)
+        elif event == "raw_response":
+            with st.expander("🔧 Debug - Raw AI Response"):
+                st.text(message)
+        else:
+            st.write(message)
+
+    st.session_state.debug_panel = variant == "panel"
+    eco_ai = EcoVisionAI(client=build_client("stub", base_url), cache=AnalysisCache(":memory:", max_entries=0),
+                         history=HistoryStore(":memory:"), near_duplicates=NearDuplicateIndex(":memory:"),
+                         near_duplicate_distance=-1, usage=UsageLedger(),
+                         reporter=legacy_reporter if variant == "before" else streamlit_reporter)
+    analysis = eco_ai.analyze_image_with_ai(Image.open(path), "comprehensive")
+    if variant == "before":
+        with st.expander("🔧 Debug - Analysis Structure"):
+            st.json(analysis)
+    st.markdown(analysis.get("summary", ""))
+    render_debug_panel(analysis)
+
+
+def count_elements(node):
+    children = getattr(node, "children", None)
+    if not children:
+        return 1
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+def run_variant(base_url, paths, variant, iterations):
+    runs, elements = [], []
+    for _ in range(iterations):
+        for path in paths:
+            at = AppTest.from_function(analysis_page, kwargs={"base_url": base_url, "path": path, "variant": variant},
+                                       default_timeout=60)
+            started = time.perf_counter()
+            at.run()
+            runs.append(time.perf_counter() - started)
+            if at.exception:
+                raise RuntimeError(at.exception[0].message)
+            elements.append(count_elements(at._tree))
+    return {
+        "runs": len(runs),
+        "p50": float(np.percentile(runs, 50)),
+        "p95": float(np.percentile(runs, 95)),
+        "elements": float(np.mean(elements)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Image folder")
+    parser.add_argument("--iterations", type=int, default=3, help="Passes over the image folder per variant")
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub latency in seconds")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    paths = list_images(args.images)
+    if not paths:
+        print(f"No images found under {args.images}", file=sys.stderr)
+        return 1
+
+    stub = StubServer(latency=args.latency, seed=0).start()
+    try:
+        # One untimed run per variant warms imports and the HTTP pool
+        for variant in VARIANTS:
+            run_variant(stub.url, paths[:1], variant, 1)
+        results = {variant: run_variant(stub.url, paths, variant, args.iterations) for variant in VARIANTS}
+    finally:
+        stub.stop()
+
+    print(f"{len(paths)} images × {args.iterations} iterations, stub latency {args.latency}s")
+    print(f"{'variant':>8}{'p50':>10}{'p95':>10}{'elements':>10}")
+    for variant, row in results.items():
+        print(f"{variant:>8}{row['p50'] * 1000:>8.1f}ms{row['p95'] * 1000:>8.1f}ms{row['elements']:>10.0f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
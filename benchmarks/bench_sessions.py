@@ -0,0 +1,167 @@
+"""Soak test of session-state memory: hundreds of simulated sessions, with and without the governor.
+
+    python benchmarks/bench_sessions.py --sessions 300
+    python benchmarks/bench_sessions.py --sessions 500 --process-mb 64 --json sessions.json
+
+Each simulated session is a plain dict standing in for st.session_state, fed
+the way the apps feed it: an upload ingested into its EncodedImageStore, an
+analysis with its objects view, then --turns Q&A turns. The turns go through
+ConversationState and build_context, and a canned summarizer folds older
+turns into the summary.
+Sessions stay open after their last run, like tabs left open.
+
+Both variants run in a fresh interpreter:
+- ungoverned: the session state as the apps kept it before the governor,
+  including a second reference to the API payload in current_image_base64.
+- governed: MemoryGovernor.govern after every script run, with a
+  --process-mb process limit. The payload lives only in the image store.
+The report samples resident memory (VmRSS) and the bytes the governor
+accounts for as sessions accumulate.
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecovision.conversation import build_context  # noqa: E402
+from ecovision.governor import MemoryGovernor  # noqa: E402
+from ecovision.session import conversation_state, encoded_image_store, objects_view  # noqa: E402
+
+VARIANTS = ("ungoverned", "governed")
+CATEGORIES = ("plant", "animal", "waste", "water", "structure")
+
+
+def rss_mb():
+    """Resident memory of this process, from /proc on Linux"""
+    with open("/proc/self/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def synthetic_upload(megapixels, seed):
+    """JPEG bytes of a smooth random 4:3 texture, roughly as compressible as a landscape photo"""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    seed_image = Image.fromarray((np.random.default_rng(seed).random((96, 128, 3)) * 255).astype("uint8"))
+    buffered = io.BytesIO()
+    seed_image.resize((width, width * 3 // 4), Image.BICUBIC).save(buffered, format="JPEG", quality=90)
+    return buffered.getvalue()
+
+
+def synthetic_analysis(rng, count=15):
+    objects = [{"name": f"object {rng.randrange(1000)}", "category": rng.choice(CATEGORIES),
+                "confidence": round(rng.uniform(0.5, 1.0), 2), "environmental_impact": "x" * 120}
+               for _ in range(count)]
+    return {"summary": "s" * 400, "objects_detected": objects,
+            "overall_analysis": {"environmental_health_score": 7, "recommendations": ["r" * 100] * 4}}
+
+
+class CannedSummarizer:
+    """Stands in for the engine in build_context: folds turns into a fixed-size summary without an API call"""
+
+    def summarize_conversation(self, summary, turns):
+        return ("Summary of earlier turns. " * 20)[:500]
+
+
+def simulate_session(state, upload, rng, turns, answer_chars, after_run, keep_payload=False):
+    """One session's script runs: upload and analysis, then Q&A turns; after_run(state) ends every run"""
+    store = encoded_image_store(state)
+    store.ingest("upload", io.BytesIO(upload))
+    payload = store.get("upload").base64
+    if keep_payload:
+        state["current_image_base64"] = payload
+    state["current_analysis"] = synthetic_analysis(rng)
+    objects_view(state, state["current_analysis"]["objects_detected"])
+    state["chat_history"] = [{"type": "ai", "content": "Hello there!", "timestamp": "10:00"}]
+    after_run(state)
+    summarizer = CannedSummarizer()
+    for turn in range(turns):
+        history = state["chat_history"]
+        conversation = conversation_state(state)
+        conversation.follow("upload", history)
+        history.append({"type": "user", "content": f"Question {turn}: what do you see? " * 3, "timestamp": "10:01"})
+        build_context(summarizer, conversation, history[:-1])
+        history.append({"type": "ai", "content": "a" * answer_chars, "timestamp": "10:01",
+                        "time_to_first_token": 0.4, "total_latency": 2.0})
+        after_run(state)
+
+
+def run_variant(args):
+    """All sessions under one variant; returns RSS and accounted-bytes samples"""
+    rng = random.Random(0)
+    uploads = [synthetic_upload(args.megapixels, seed) for seed in range(4)]
+    # Only the governed variant evicts; the other uses one with unlimited budgets just to account
+    unlimited = 1 << 62
+    governor = (MemoryGovernor(args.session_mb * 1024 * 1024, args.process_mb * 1024 * 1024,
+                               spill_dir=args.spill_dir)
+                if args.child == "governed" else MemoryGovernor(unlimited, unlimited, spill_dir=args.spill_dir))
+    after_run = governor.govern
+    sessions, samples = [], []
+    started = time.perf_counter()
+    for index in range(1, args.sessions + 1):
+        state = {}
+        sessions.append(state)
+        simulate_session(state, uploads[index % len(uploads)], rng, args.turns, args.answer_chars, after_run,
+                         keep_payload=args.child == "ungoverned")
+        if index % args.sample_every == 0 or index == args.sessions:
+            samples.append({"sessions": index, "rss_mb": rss_mb(), "accounted_mb": governor.total_bytes() / 2 ** 20})
+    stats = governor.stats()
+    return {"samples": samples, "evictions": stats["evictions"], "seconds": time.perf_counter() - started}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=300, help="Simulated sessions, all left open")
+    parser.add_argument("--turns", type=int, default=12, help="Q&A turns per session")
+    parser.add_argument("--answer-chars", type=int, default=1500, help="Length of each answer")
+    parser.add_argument("--megapixels", type=float, default=8, help="Upload size in MP")
+    parser.add_argument("--session-mb", type=int, default=16, help="Governor per-session limit")
+    parser.add_argument("--process-mb", type=int, default=128, help="Governor process-wide limit")
+    parser.add_argument("--sample-every", type=int, default=50, help="Sample memory every N sessions")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    parser.add_argument("--child", choices=VARIANTS, help=argparse.SUPPRESS)
+    parser.add_argument("--spill-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_variant(args)))
+        return 0
+
+    results = {}
+    with tempfile.TemporaryDirectory() as spill_dir:
+        for variant in VARIANTS:
+            command = [sys.executable, os.path.abspath(__file__), "--child", variant, "--spill-dir", spill_dir,
+                       *(argv if argv is not None else sys.argv[1:])]
+            output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+            results[variant] = json.loads(output)
+
+    print(f"{args.sessions} sessions left open, {args.megapixels:g} MP uploads, {args.turns} Q&A turns each; "
+          f"governor limits {args.session_mb} MB per session, {args.process_mb} MB per process")
+    print(f"{'sessions':>9}{'RSS ungoverned':>16}{'RSS governed':>14}{'held ungoverned':>17}{'held governed':>15}")
+    for before, after in zip(results["ungoverned"]["samples"], results["governed"]["samples"]):
+        print(f"{before['sessions']:>9}{before['rss_mb']:>14.0f}MB{after['rss_mb']:>12.0f}MB"
+              f"{before['accounted_mb']:>15.0f}MB{after['accounted_mb']:>13.0f}MB")
+    for variant, result in results.items():
+        evictions = ", ".join(f"{count} {kind}" for kind, count in result["evictions"].items()) or "none"
+        print(f"{variant}: {result['seconds']:.1f}s, evictions: {evictions}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
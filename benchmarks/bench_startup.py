@@ -0,0 +1,92 @@
+"""Cold start of each front-end: first script run time and which heavy modules it loads.
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --apps app_gpt.py --json startup.json
+
+Every run is a fresh interpreter started with `python -X importtime`, like a
+new container serving its first session. It executes the app's first script
+run under Streamlit's AppTest and reports:
+- the wall time of that run;
+- the cumulative import time, from the -X importtime report, of each heavy
+  module that got loaded (NumPy, pandas, OpenCV, Plotly Express, OpenAI).
+Modules that are not listed were never imported.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = ("app.py", "app_gpt.py", "app_agenticai.py")
+HEAVY = ("numpy", "pandas", "cv2", "plotly.express", "openai")
+
+FIRST_RUN = """
+import json, os, sys, time
+os.environ.setdefault("OPENAI_API_KEY", "sk-startup-benchmark")
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120).run()
+elapsed = time.perf_counter() - started
+print(json.dumps({"seconds": elapsed, "exceptions": [str(e.value) for e in at.exception]}))
+"""
+
+
+def import_times(report):
+    """Cumulative import time in seconds per HEAVY module from a -X importtime report"""
+    times = {}
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if name in HEAVY and cumulative.strip().isdigit():
+            times[name] = int(cumulative) / 1e6
+    return times
+
+
+def cold_start(app):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", FIRST_RUN, os.path.join(ROOT, app)],
+                          capture_output=True, text=True, cwd=ROOT, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["imports"] = import_times(proc.stderr)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", nargs="+", default=APPS, help="App scripts to start")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per app")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for app in args.apps:
+        runs = [cold_start(app) for _ in range(args.runs)]
+        errors = sorted({error for run in runs for error in run["exceptions"]})
+        if errors:
+            print(f"{app}: {errors[0]}", file=sys.stderr)
+        loaded = sorted({name for run in runs for name in run["imports"]}, key=HEAVY.index)
+        results[app] = {
+            "p50": float(np.percentile([run["seconds"] for run in runs], 50)),
+            "max": float(np.max([run["seconds"] for run in runs])),
+            "imports": {name: float(np.median([run["imports"].get(name, 0.0) for run in runs])) for name in loaded},
+        }
+
+    print(f"First script run in a fresh interpreter, {args.runs} runs per app")
+    print(f"{'app':>18}{'p50':>9}{'max':>9}  heavy imports (median cumulative)")
+    for app, row in results.items():
+        imports = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in row["imports"].items()) or "none"
+        print(f"{app:>18}{row['p50']:>8.2f}s{row['max']:>8.2f}s  {imports}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
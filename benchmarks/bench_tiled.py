@@ -0,0 +1,148 @@
+"""Tiled analysis of a large image: tiles analyzed concurrently vs. one by one.
+
+    python benchmarks/bench_tiled.py --size 4000x3000 --workers 4
+    python benchmarks/bench_tiled.py --image orthomosaic.jpg --base-url https://api.openai.com/v1 --json tiled.json
+
+Without --image, the sample photos are pasted into a mosaic of --size, which
+stands in for a drone orthomosaic. Three variants are run:
+- whole image: one analyze_image_with_ai request, scaled to the model's budget.
+- sequential: EcoVisionAI.analyze_tiled with one worker.
+- concurrent: analyze_tiled with --workers workers.
+The report gives per-tile latency, wall time and the number of merged
+objects. The cache is disabled, so every tile reaches the endpoint.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ecovision import config  # noqa: E402
+from ecovision.batch import list_images  # noqa: E402
+from ecovision.cache import AnalysisCache  # noqa: E402
+from ecovision.client import build_client  # noqa: E402
+from ecovision.engine import EcoVisionAI  # noqa: E402
+from ecovision.history import HistoryStore  # noqa: E402
+from ecovision.neardup import NearDuplicateIndex  # noqa: E402
+from ecovision.stub_server import StubServer  # noqa: E402
+
+DEFAULT_IMAGES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "sample_images", "Forest-ocean-waste-Image")
+
+
+def make_engine(client):
+    return EcoVisionAI(client=client, cache=AnalysisCache(":memory:", max_entries=0),
+                       history=HistoryStore(":memory:"), near_duplicates=NearDuplicateIndex(":memory:"),
+                       near_duplicate_distance=-1)
+
+
+def mosaic(paths, width, height, cell=1000):
+    """The sample photos repeated in a grid of `cell` px squares"""
+    image = Image.new("RGB", (width, height))
+    photos = [Image.open(path).convert("RGB").resize((cell, cell)) for path in paths]
+    index = 0
+    for top in range(0, height, cell):
+        for left in range(0, width, cell):
+            image.paste(photos[index % len(photos)], (left, top))
+            index += 1
+    return image
+
+
+def summarize(result):
+    if "error" in result:
+        return {"error": result["error"]}
+    tiling = result.get("tiling")
+    if tiling is None:
+        return {"tiles": 1, "objects": len(result.get("objects_detected", []))}
+    latencies = [row["latency_s"] for row in tiling["per_tile"]]
+    return {
+        "tiles": tiling["tiles"],
+        "tile_size": tiling["tile_size"],
+        "objects": len(result["objects_detected"]),
+        "tile_p50": float(np.percentile(latencies, 50)),
+        "tile_p95": float(np.percentile(latencies, 95)),
+        "wall": tiling["wall_seconds"],
+        "sum_of_tiles": tiling["sequential_seconds"],
+        "failed": sum(row["status"] == "failed" for row in tiling["per_tile"]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", help="Large image to analyze (default: a mosaic of the sample photos)")
+    parser.add_argument("--images", default=DEFAULT_IMAGES, help="Sample photo folder for the mosaic")
+    parser.add_argument("--size", default="4000x3000", help="Mosaic size as WIDTHxHEIGHT")
+    parser.add_argument("--workers", type=int, default=config.TILED_MAX_WORKERS, help="Concurrent tiles")
+    parser.add_argument("--tile-size", type=int, default=config.TILED_TILE_SIZE, help="Tile size in px")
+    parser.add_argument("--overlap", type=int, default=config.TILED_OVERLAP, help="Tile overlap in px")
+    parser.add_argument("--max-tiles", type=int, default=config.TILED_MAX_TILES, help="Tile count cap")
+    parser.add_argument("--latency", type=float, default=0.8, help="Stub base latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Stub latency jitter in seconds")
+    parser.add_argument("--base-url", help="Use this endpoint instead of the in-process stub")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.image:
+        image = Image.open(args.image)
+    else:
+        paths = list_images(args.images)
+        if not paths:
+            print(f"No images found under {args.images}", file=sys.stderr)
+            return 1
+        width, height = (int(side) for side in args.size.lower().split("x"))
+        image = mosaic(paths, width, height)
+    image.load()
+
+    stub = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        stub = StubServer(latency=args.latency, jitter=args.jitter, seed=0).start()
+        base_url = stub.url
+    client = build_client(os.getenv("OPENAI_API_KEY", "stub"), base_url)
+
+    tiling = {"tile_size": args.tile_size, "overlap": args.overlap, "max_tiles": args.max_tiles}
+    results = {}
+    try:
+        started = time.perf_counter()
+        whole = make_engine(client).analyze_image_with_ai(image, "comprehensive", verbose=False)
+        results["whole image"] = {**summarize(whole), "wall": time.perf_counter() - started}
+        sequential = make_engine(client)
+        results["sequential"] = summarize(sequential.analyze_tiled(image, max_workers=1, verbose=False, **tiling))
+        concurrent = make_engine(client)
+        results["concurrent"] = summarize(concurrent.analyze_tiled(image, max_workers=args.workers, verbose=False,
+                                                                   **tiling))
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    tile_size = results["concurrent"].get("tile_size", args.tile_size)
+    print(f"{image.size[0]}x{image.size[1]} image, tiles of {tile_size}px (overlap {args.overlap}px, "
+          f"at most {args.max_tiles}), {args.workers} workers, endpoint {base_url}")
+    print(f"{'variant':>12}{'tiles':>7}{'objects':>9}{'tile p50':>10}{'tile p95':>10}{'wall':>9}")
+    for name, row in results.items():
+        if "error" in row:
+            print(f"{name:>12}  error: {row['error']}")
+        elif "tile_p50" not in row:
+            print(f"{name:>12}{row['tiles']:>7}{row['objects']:>9}{'-':>10}{'-':>10}{row['wall']:>8.2f}s")
+        else:
+            print(f"{name:>12}{row['tiles']:>7}{row['objects']:>9}{row['tile_p50']:>9.2f}s{row['tile_p95']:>9.2f}s"
+                  f"{row['wall']:>8.2f}s")
+    if "tile_p50" in results["sequential"] and "tile_p50" in results["concurrent"]:
+        print(f"Concurrent tiles: {results['sequential']['wall'] / results['concurrent']['wall']:.1f}x faster "
+              f"than one by one")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
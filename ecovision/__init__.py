@@ -0,0 +1,25 @@
+"""EcoVision AI core: analysis engine, scoring and shared building blocks.
+
+Importable without Streamlit; the Streamlit apps and the `python -m ecovision`
+command line are thin front-ends over it.
+"""
+
+from .batch import BatchResult, RateLimiter, list_images, run_batch
+from .cache import AnalysisCache, default_cache, make_cache_key, prompt_fingerprint
+from .charts import ObjectsView, build_objects_view, dark_template
+from .conversation import ConversationState, build_context
+from .engine import EcoVisionAI, StreamedAnswer, estimate_request_tokens, is_polite_response
+from .governor import MemoryGovernor, SessionMemory, default_governor, estimate_bytes
+from .history import HistoryStore, default_history
+from .imaging import PreparedImage, image_digest, perceptual_hash, prepare_image, tile_grid
+from .jobs import Job, JobQueue, default_job_queue
+from .logs import configure_logging
+from .neardup import NearDuplicateIndex, default_near_duplicates
+from .prescreen import LocalMetrics, PrescreenStats, Screening, screen_image
+from .schema import AnalysisResult, AnalysisValidationError, parse_analysis, repair_json
+from .scoring import Metrics, analysis_metrics, attach_metrics, score_analysis, score_frame, score_metrics
+from .singleflight import SingleFlight, default_singleflight
+from .templates import ANALYSIS_MODES, TEMPLATES, PromptTemplate, get_template
+from .tiling import fit_tile_size, merge_tiles
+from .transport import CircuitBreaker, CircuitOpenError, Transport, default_transport
+from .usage import CallRecord, UsageLedger, default_usage, estimate_cost
@@ -0,0 +1,112 @@
+"""Concurrent, rate-limited batch analysis of many images."""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from . import config
+from .imaging import open_image
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+class RateLimiter:
+    """Token-bucket limiter enforcing requests-per-minute and tokens-per-minute budgets.
+
+    Both buckets start full and refill continuously; acquire() blocks the
+    calling worker until one request and the requested tokens are available.
+    """
+
+    def __init__(self, requests_per_minute=config.BATCH_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=config.BATCH_TOKENS_PER_MINUTE, clock=time.monotonic, sleep=time.sleep):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._clock = clock
+        self._sleep = sleep
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute,
+                                 self._requests + elapsed * self.requests_per_minute / 60.0)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute,
+                               self._tokens + elapsed * self.tokens_per_minute / 60.0)
+
+    def acquire(self, tokens=0):
+        """Block until a request slot and `tokens` tokens can be spent"""
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill(self._clock())
+                wait = 0.0
+                if self.requests_per_minute and self._requests < 1:
+                    wait = (1 - self._requests) * 60.0 / self.requests_per_minute
+                if self.tokens_per_minute and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60.0 / self.tokens_per_minute)
+                if wait == 0.0:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens
+                    return
+            self._sleep(wait)
+
+
+@dataclass
+class BatchResult:
+    """Outcome of analyzing one image in a batch"""
+    name: str
+    result: dict = None
+    error: str = None
+    latency: float = 0.0
+
+
+def list_images(folder):
+    """Image files under a server-side folder, sorted by path"""
+    paths = []
+    for root, _, files in os.walk(folder):
+        for filename in files:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, filename))
+    return sorted(paths)
+
+
+def run_batch(items, analyze, max_workers=config.BATCH_MAX_WORKERS, load=open_image):
+    """Analyze (name, source) items concurrently, yielding BatchResults as they complete.
+
+    Each worker loads its image (by default at working resolution, see
+    imaging.open_image), then calls analyze(image). At most `max_workers`
+    analyses run at once. Rate limiting is up to `analyze`: pass a
+    RateLimiter to the engine, which waits on it only for images that need a
+    request.
+    """
+
+    def task(name, source):
+        try:
+            image = load(source)
+            started = time.perf_counter()
+            result = analyze(image)
+            latency = time.perf_counter() - started
+            if isinstance(result, dict) and "error" in result:
+                return BatchResult(name, result, result["error"], latency)
+            return BatchResult(name, result, None, latency)
+        except Exception as e:
+            return BatchResult(name, None, str(e))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(task, name, source) for name, source in items]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
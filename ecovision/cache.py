@@ -0,0 +1,151 @@
+"""Persistent, content-addressed cache for analysis results.
+
+Entries are keyed by the image content hash plus everything that changes the
+model's answer (analysis type, prompt fingerprint, model name) and stored in a
+local SQLite file so results survive restarts and are shared by every session
+in the process. Eviction is least-recently-used, bounded by a TTL, a byte cap
+and an entry cap.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from . import config
+
+
+def prompt_fingerprint(prompt):
+    """Short stable fingerprint of a prompt, used as its cache version"""
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+def make_cache_key(image_hash, analysis_type, prompt_version, model):
+    """Combine the inputs that determine an analysis result into one key"""
+    raw = "\x1f".join([image_hash, analysis_type, prompt_version, model])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, path=config.CACHE_PATH, ttl_seconds=config.CACHE_TTL_SECONDS,
+                 max_bytes=config.CACHE_MAX_BYTES, max_entries=config.CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache (accessed_at)"
+        )
+
+    def get(self, key, count=True):
+        """Return the cached result for key, or None on a miss or expired entry.
+
+        With count=False the lookup is left out of the hit/miss statistics
+        (secondary lookups such as near-duplicate reuse).
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += count
+                return None
+            value, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                self.misses += count
+                return None
+            self._conn.execute(
+                "UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += count
+        return json.loads(value)
+
+    def put(self, key, result):
+        """Store a result and evict least-recently-used entries beyond the caps"""
+        value = json.dumps(result)
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        if self.ttl_seconds:
+            self._conn.execute(
+                "DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM analysis_cache ORDER BY accessed_at ASC"
+        ).fetchall()
+        stale = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append((key,))
+            count -= 1
+            total -= size
+        self._conn.executemany("DELETE FROM analysis_cache WHERE key = ?", stale)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_cache")
+
+    def stats(self):
+        """Hit/miss counters for this process plus what is currently stored"""
+        with self._lock:
+            entries, stored = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes_stored": stored,
+        }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """Process-wide cache instance shared by every Streamlit session"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AnalysisCache()
+        return _default_cache
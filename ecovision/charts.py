@@ -0,0 +1,109 @@
+"""Detected-objects chart and table, built once per analysis.
+
+Most of the time in a results rerun went into building the Plotly scatter
+and styling it. build_objects_view does that once, and
+session.objects_view keeps the result for the current analysis. Reruns from
+unrelated widgets then only send the ready-made figure and table again. The
+dark styling lives in one shared Plotly template rather than in
+update_layout, update_*axes and update_traces calls on every render.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+
+from .lazy import lazy_import
+
+go = lazy_import("plotly.graph_objects")
+pd = lazy_import("pandas")
+pio = lazy_import("plotly.io")
+px = lazy_import("plotly.express")
+
+IMPACT_COLORS = {"positive": "#1de9b6", "negative": "#ff6b6b", "neutral": "#ffd93d"}
+SCATTER_COLUMNS = ("sustainability_score", "confidence")
+# Table columns in display order; any others follow
+TABLE_COLUMNS = ("name", "type", "environmental_impact", "sustainability_score", "confidence", "description",
+                 "recommended_action")
+
+_dark_template = None
+
+
+def dark_template():
+    """The apps' dark chart styling on top of Plotly's default template, built on first use"""
+    global _dark_template
+    if _dark_template is None:
+        axis = dict(gridcolor="rgba(100,255,218,0.1)", title_font_color="#8892b0", tickfont_color="#8892b0",
+                    showgrid=True, zeroline=False)
+        template = go.layout.Template(pio.templates["plotly"])
+        template.layout.update(
+            plot_bgcolor="rgba(0,0,0,0)",
+            paper_bgcolor="rgba(15,20,25,0.8)",
+            font_color="#8892b0",
+            title=dict(font=dict(size=18, color="#64ffda"), x=0.5),
+            showlegend=True,
+            legend=dict(bgcolor="rgba(20,25,40,0.8)", bordercolor="rgba(100,255,218,0.3)", borderwidth=1,
+                        font_color="#8892b0"),
+            margin=dict(l=10, r=10, t=50, b=10),
+            xaxis=axis,
+            yaxis=axis,
+        )
+        template.data.scatter = [go.Scatter(
+            marker=dict(line=dict(width=1, color="rgba(255,255,255,0.3)"), opacity=0.8),
+            hoverlabel=dict(bgcolor="rgba(20,25,40,0.9)", font_color="#e1e5e9",
+                            bordercolor="rgba(100,255,218,0.3)"),
+        )]
+        _dark_template = template
+    return _dark_template
+
+
+def objects_key(objects):
+    """Analysis id for memoizing: a digest of the detected objects"""
+    return hashlib.sha256(json.dumps(objects, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ObjectsView:
+    """Everything the Detected Objects section draws for one analysis"""
+    frame: object
+    figure: object = None
+    table: object = None
+    _csv: str = None
+
+    def csv(self):
+        """The table as CSV, serialized on first request"""
+        if self._csv is None:
+            self._csv = self.table.to_csv(index=False)
+        return self._csv
+
+
+def objects_figure(frame):
+    """Sustainability vs. confidence scatter, or None when the columns are missing"""
+    if not all(column in frame.columns for column in SCATTER_COLUMNS):
+        return None
+    return px.scatter(
+        frame,
+        x="sustainability_score",
+        y="confidence",
+        color="environmental_impact",
+        size="sustainability_score",
+        hover_data=["name", "type"],
+        title="🌍 Environmental Objects Analysis",
+        color_discrete_map=IMPACT_COLORS,
+        template=dark_template(),
+    )
+
+
+def objects_table(frame):
+    """Objects with a non-blank name, preferred columns first"""
+    if "name" in frame.columns:
+        frame = frame.dropna(subset=["name"])
+        frame = frame[frame["name"].astype(str).str.strip() != ""]
+    columns = [column for column in TABLE_COLUMNS if column in frame.columns]
+    return frame[columns + [column for column in frame.columns if column not in columns]]
+
+
+def build_objects_view(objects):
+    frame = pd.DataFrame(objects)
+    if frame.empty:
+        return ObjectsView(frame, table=frame)
+    return ObjectsView(frame, objects_figure(frame), objects_table(frame))
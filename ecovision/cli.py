@@ -0,0 +1,123 @@
+"""Command-line entry point: `python -m ecovision analyze <dir> --mode biodiversity --out results.jsonl`"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+from . import config
+from .batch import RateLimiter, list_images, run_batch
+from .client import MissingAPIKeyError, get_client
+from .engine import EcoVisionAI
+from .logs import configure_logging
+from .scoring import BASIC, DETAILED, analysis_metrics
+from .templates import ANALYSIS_MODES
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ecovision", description="EcoVision AI headless analysis")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="Analyze every image in a file or directory")
+    analyze.add_argument("path", help="Image file or directory (searched recursively)")
+    analyze.add_argument("--mode", choices=ANALYSIS_MODES, default="comprehensive", help="Analysis type")
+    analyze.add_argument("--out", default="-", help="JSONL output file (default: stdout)")
+    analyze.add_argument("--scoring", choices=[DETAILED, BASIC], default=DETAILED,
+                         help="Scoring profile for CO₂/health metrics")
+    analyze.add_argument("--workers", type=int, default=config.BATCH_MAX_WORKERS,
+                         help="Concurrent requests")
+    analyze.add_argument("--rpm", type=int, default=config.BATCH_REQUESTS_PER_MINUTE,
+                         help="Requests-per-minute budget")
+    analyze.add_argument("--tpm", type=int, default=config.BATCH_TOKENS_PER_MINUTE,
+                         help="Tokens-per-minute budget")
+    analyze.add_argument("--tiled", action="store_true",
+                         help="Analyze each image as overlapping tiles (large aerial or drone images)")
+    analyze.add_argument("--usage-csv", help="Write per-call token, timing and cost records to this CSV file")
+    return parser
+
+
+def analysis_record(eco_ai, item, mode, profile):
+    """JSON-serializable record for one analyzed image"""
+    record = {
+        "image": item.name,
+        "mode": mode,
+        "model": eco_ai.model,
+        "latency_s": round(item.latency, 3),
+        "error": item.error,
+        "result": item.result,
+    }
+    if item.result and not item.error:
+        record["metrics"] = analysis_metrics(item.result, profile).to_dict()
+        record["recommendations"] = eco_ai.generate_recommendations(item.result)
+    return record
+
+
+def analyze(args):
+    paths = [args.path] if os.path.isfile(args.path) else list_images(args.path)
+    if not paths:
+        print(f"No images found under {args.path}", file=sys.stderr)
+        return 1
+
+    try:
+        eco_ai = EcoVisionAI(client=get_client())
+    except MissingAPIKeyError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+
+    limiter = RateLimiter(args.rpm, args.tpm)
+    out = sys.stdout if args.out == "-" else open(args.out, "w", encoding="utf-8")
+    started = time.perf_counter()
+    failures = 0
+    try:
+        # The engine waits for the rate limiter per request sent (per tile when tiled), after the cache
+        if args.tiled:
+            completed = run_batch(
+                [(path, path) for path in paths],
+                lambda image: eco_ai.analyze_tiled(image, args.mode, limiter=limiter, verbose=False),
+                max_workers=args.workers,
+            )
+        else:
+            completed = run_batch(
+                [(path, path) for path in paths],
+                lambda image: eco_ai.analyze_image_with_ai(image, args.mode, verbose=False, limiter=limiter),
+                max_workers=args.workers,
+            )
+        for done, item in enumerate(completed, start=1):
+            failures += bool(item.error)
+            out.write(json.dumps(analysis_record(eco_ai, item, args.mode, args.scoring), ensure_ascii=False) + "\n")
+            out.flush()
+            status = "error" if item.error else "ok"
+            print(f"[{done}/{len(paths)}] {status} {item.name} ({item.latency:.1f}s)", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    parse_stats = eco_ai.parse_stats.snapshot()
+    print(f"Analyzed {len(paths)} images in {elapsed:.1f}s "
+          f"({len(paths) / elapsed:.2f} images/s, {failures} failed)", file=sys.stderr)
+    print(f"Responses: {parse_stats['parsed']} parsed, {parse_stats['repaired']} repaired, "
+          f"{parse_stats['failed']} unparseable", file=sys.stderr)
+    prescreen_stats = eco_ai.prescreen_stats.snapshot()
+    if prescreen_stats["screened"]:
+        print(f"Pre-screen: {prescreen_stats['rejected']} rejected (API calls saved), "
+              f"{prescreen_stats['low_detail']} sent at low detail", file=sys.stderr)
+    usage = eco_ai.usage.totals()
+    print(f"Usage: {usage['calls']} API calls, {usage['prompt_tokens']:,} prompt / "
+          f"{usage['completion_tokens']:,} completion tokens, ~${usage['cost']:.4f} estimated", file=sys.stderr)
+    if args.usage_csv:
+        with open(args.usage_csv, "w", encoding="utf-8", newline="") as f:
+            f.write(eco_ai.usage.to_csv())
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    load_dotenv()
+    configure_logging()
+    args = build_parser().parse_args(argv)
+    if args.command == "analyze":
+        return analyze(args)
+    return 1
@@ -0,0 +1,50 @@
+"""Shared OpenAI client, built on first use rather than at import time."""
+
+import os
+import threading
+
+import openai
+from openai import OpenAI
+
+from . import config
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class MissingAPIKeyError(RuntimeError):
+    """Raised when no OpenAI API key is configured"""
+
+
+def build_client(api_key, base_url=None):
+    """OpenAI client with a tuned connection pool and per-attempt timeouts.
+
+    SDK retries are disabled because ecovision.transport retries with
+    backoff and a circuit breaker instead.
+    """
+    # The SDK's own Limits class, so this works with whichever httpx build it ships with
+    limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    timeout = openai.Timeout(config.REQUEST_TIMEOUT_SECONDS, connect=config.HTTP_CONNECT_TIMEOUT)
+    return OpenAI(
+        api_key=api_key,
+        base_url=base_url or os.getenv("OPENAI_BASE_URL") or None,
+        timeout=timeout,
+        max_retries=0,
+        http_client=openai.DefaultHttpxClient(limits=limits, timeout=timeout),
+    )
+
+
+def get_client(api_key=None):
+    """Process-wide OpenAI client so every session reuses one connection pool"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            api_key = api_key or os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise MissingAPIKeyError("OPENAI_API_KEY not found in environment variables")
+            _client = build_client(api_key)
+        return _client
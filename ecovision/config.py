@@ -0,0 +1,135 @@
+"""Runtime settings shared by the EcoVision AI apps, read from the environment."""
+
+import json
+import os
+
+# Vision model used for every analysis request
+MODEL = os.getenv("ECOVISION_MODEL", "gpt-4o")
+
+# Ask for output matching the analysis JSON schema (response_format). Turn off
+# for OpenAI-compatible endpoints that do not support structured outputs.
+STRUCTURED_OUTPUTS = os.getenv("ECOVISION_STRUCTURED_OUTPUTS", "1").lower() not in ("0", "false", "no")
+
+# Engine events at this level and above go to stderr (DEBUG includes the raw
+# model output). The in-page debug panel is off unless ECOVISION_DEBUG_PANEL is
+# set, and keeps the last DEBUG_MAX_EVENTS events of a session.
+LOG_LEVEL = os.getenv("ECOVISION_LOG_LEVEL", "WARNING").upper()
+DEBUG_PANEL = os.getenv("ECOVISION_DEBUG_PANEL", "0").lower() not in ("0", "false", "no")
+DEBUG_MAX_EVENTS = int(os.getenv("ECOVISION_DEBUG_MAX_EVENTS", "200"))
+
+# Local directory for on-disk stores (analysis cache, history, ...)
+DATA_DIR = os.getenv("ECOVISION_DATA_DIR", ".ecovision")
+
+# Analysis result cache
+CACHE_PATH = os.getenv("ECOVISION_CACHE_PATH", os.path.join(DATA_DIR, "analysis_cache.sqlite3"))
+CACHE_TTL_SECONDS = float(os.getenv("ECOVISION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MAX_BYTES = int(os.getenv("ECOVISION_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_MAX_ENTRIES = int(os.getenv("ECOVISION_CACHE_MAX_ENTRIES", "10000"))
+
+# Local pre-screen before an analysis is sent. Metrics are measured on a copy
+# scaled to PRESCREEN_SIZE px. Laplacian variance below PRESCREEN_MIN_SHARPNESS
+# means the image is either blurred (there is coarse structure, measured as the
+# mean gradient at 128px, of at least PRESCREEN_MIN_STRUCTURE) and rejected, or
+# featureless and sent at low detail, as are scenes with fewer Canny edge
+# pixels than PRESCREEN_LOW_DETAIL_EDGES (a fraction).
+PRESCREEN = os.getenv("ECOVISION_PRESCREEN", "1").lower() not in ("0", "false", "no")
+PRESCREEN_SIZE = int(os.getenv("ECOVISION_PRESCREEN_SIZE", "512"))
+PRESCREEN_MIN_SHARPNESS = float(os.getenv("ECOVISION_PRESCREEN_MIN_SHARPNESS", "60"))
+PRESCREEN_MIN_BRIGHTNESS = float(os.getenv("ECOVISION_PRESCREEN_MIN_BRIGHTNESS", "0.06"))
+PRESCREEN_MAX_BRIGHTNESS = float(os.getenv("ECOVISION_PRESCREEN_MAX_BRIGHTNESS", "0.94"))
+PRESCREEN_MIN_STRUCTURE = float(os.getenv("ECOVISION_PRESCREEN_MIN_STRUCTURE", "25"))
+PRESCREEN_MIN_CONTRAST = float(os.getenv("ECOVISION_PRESCREEN_MIN_CONTRAST", "0.015"))
+PRESCREEN_LOW_DETAIL_EDGES = float(os.getenv("ECOVISION_PRESCREEN_LOW_DETAIL_EDGES", "0.02"))
+
+# Multi-turn Q&A: prior turns sent with each question are capped at this many
+# (estimated) tokens; older turns are folded into a summary by QA_SUMMARY_MODEL
+QA_CONTEXT_TOKEN_BUDGET = int(os.getenv("ECOVISION_QA_CONTEXT_TOKEN_BUDGET", "2000"))
+QA_SUMMARY_MODEL = os.getenv("ECOVISION_QA_SUMMARY_MODEL", "gpt-4o-mini")
+
+# Usage accounting: estimated USD per million tokens as [input, cached input,
+# output] for each model (ECOVISION_MODEL_PRICES, a JSON object of the same
+# shape, adds or overrides entries) and how many recent calls are kept for export
+MODEL_PRICES = {
+    "gpt-4o": [2.50, 1.25, 10.00],
+    "gpt-4o-mini": [0.15, 0.075, 0.60],
+}
+MODEL_PRICES.update(json.loads(os.getenv("ECOVISION_MODEL_PRICES", "{}")))
+USAGE_MAX_RECORDS = int(os.getenv("ECOVISION_USAGE_MAX_RECORDS", "5000"))
+
+# Near-duplicate reuse: an image whose perceptual hash is within this many of
+# 64 bits of an analyzed one reuses its result (a negative value turns it off)
+NEAR_DUPLICATE_PATH = os.getenv("ECOVISION_NEAR_DUPLICATE_PATH", os.path.join(DATA_DIR, "near_duplicates.sqlite3"))
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("ECOVISION_NEAR_DUPLICATE_DISTANCE", "8"))
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("ECOVISION_NEAR_DUPLICATE_MAX_ENTRIES", "200000"))
+
+# Analysis history
+HISTORY_PATH = os.getenv("ECOVISION_HISTORY_PATH", os.path.join(DATA_DIR, "history.sqlite3"))
+
+# Image preprocessing before upload. The vision model fits high-detail images
+# within 2048px on the long side and 768px on the short side, so anything larger
+# only costs bandwidth. The byte budget applies to the JPEG before base64.
+IMAGE_MAX_LONG_SIDE = int(os.getenv("ECOVISION_IMAGE_MAX_LONG_SIDE", "2048"))
+IMAGE_MAX_SHORT_SIDE = int(os.getenv("ECOVISION_IMAGE_MAX_SHORT_SIDE", "768"))
+IMAGE_BYTE_BUDGET = int(os.getenv("ECOVISION_IMAGE_BYTE_BUDGET", str(300 * 1024)))
+IMAGE_QUALITY = int(os.getenv("ECOVISION_IMAGE_QUALITY", "85"))
+IMAGE_MIN_QUALITY = int(os.getenv("ECOVISION_IMAGE_MIN_QUALITY", "40"))
+
+# Upload ingestion. Uploads are decoded straight to a working copy of at most
+# INGEST_MAX_PIXELS. That is enough for a tiled analysis, and far more than a
+# single request uses. Files over INGEST_MAX_SOURCE_PIXELS are refused. A
+# session keeps its image only as JPEG bytes (working copy at up to
+# INGEST_QUALITY, a preview of INGEST_PREVIEW_SIDE px, and the API payload),
+# together at most SESSION_IMAGE_MAX_BYTES.
+INGEST_MAX_PIXELS = int(os.getenv("ECOVISION_INGEST_MAX_PIXELS", str(12_000_000)))
+INGEST_MAX_SOURCE_PIXELS = int(os.getenv("ECOVISION_INGEST_MAX_SOURCE_PIXELS", str(150_000_000)))
+INGEST_QUALITY = int(os.getenv("ECOVISION_INGEST_QUALITY", "90"))
+INGEST_PREVIEW_SIDE = int(os.getenv("ECOVISION_INGEST_PREVIEW_SIDE", "1024"))
+SESSION_IMAGE_MAX_BYTES = int(os.getenv("ECOVISION_SESSION_IMAGE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+# Session memory governor. Each script run ends by measuring the session's
+# st.session_state. A session may hold GOVERNOR_SESSION_MAX_BYTES, or an equal
+# share of GOVERNOR_PROCESS_MAX_BYTES once all sessions together exceed it.
+# Above that, cached views are dropped, chat turns the model no longer sees
+# are archived (the newest GOVERNOR_KEEP_MESSAGES stay), and the image's
+# working copy is spilled, to files under GOVERNOR_SPILL_DIR. With an empty
+# GOVERNOR_SPILL_DIR, archived turns are dropped and images are not spilled.
+GOVERNOR_SESSION_MAX_BYTES = int(os.getenv("ECOVISION_GOVERNOR_SESSION_MAX_BYTES", str(16 * 1024 * 1024)))
+GOVERNOR_PROCESS_MAX_BYTES = int(os.getenv("ECOVISION_GOVERNOR_PROCESS_MAX_BYTES", str(512 * 1024 * 1024)))
+GOVERNOR_KEEP_MESSAGES = int(os.getenv("ECOVISION_GOVERNOR_KEEP_MESSAGES", "20"))
+GOVERNOR_SPILL_DIR = os.getenv("ECOVISION_GOVERNOR_SPILL_DIR", os.path.join(DATA_DIR, "spill"))
+
+# Tiled analysis of large aerial and drone images. Tiles are sent at the
+# model's native high-detail size, and they overlap so that an object on a seam
+# appears whole in at least one. Up to TILED_MAX_WORKERS tiles are in flight at
+# once. Larger images get larger tiles, keeping one analysis at most
+# TILED_MAX_TILES requests.
+TILED_TILE_SIZE = int(os.getenv("ECOVISION_TILED_TILE_SIZE", "768"))
+TILED_OVERLAP = int(os.getenv("ECOVISION_TILED_OVERLAP", "96"))
+TILED_MAX_WORKERS = int(os.getenv("ECOVISION_TILED_MAX_WORKERS", "4"))
+TILED_MAX_TILES = int(os.getenv("ECOVISION_TILED_MAX_TILES", "16"))
+
+# Batch analysis: worker threads and the upstream budgets they share
+BATCH_MAX_WORKERS = int(os.getenv("ECOVISION_BATCH_MAX_WORKERS", "4"))
+BATCH_REQUESTS_PER_MINUTE = int(os.getenv("ECOVISION_BATCH_RPM", "60"))
+BATCH_TOKENS_PER_MINUTE = int(os.getenv("ECOVISION_BATCH_TPM", "30000"))
+
+# Background analysis jobs: worker threads shared by every session, how often
+# the UI polls a running job, and how long finished jobs are kept for pickup
+JOB_MAX_WORKERS = int(os.getenv("ECOVISION_JOB_MAX_WORKERS", "8"))
+JOB_POLL_SECONDS = float(os.getenv("ECOVISION_JOB_POLL_SECONDS", "0.5"))
+JOB_RETENTION_SECONDS = float(os.getenv("ECOVISION_JOB_RETENTION_SECONDS", "600"))
+
+# OpenAI transport: connection pool, timeouts, retries and circuit breaker.
+# Timeouts are per attempt; the deadline bounds a call including its retries.
+# A call is attempted at most 1 + RETRY_MAX_RETRIES times.
+HTTP_MAX_CONNECTIONS = int(os.getenv("ECOVISION_HTTP_MAX_CONNECTIONS", "64"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("ECOVISION_HTTP_MAX_KEEPALIVE", "16"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("ECOVISION_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("ECOVISION_HTTP_CONNECT_TIMEOUT", "5"))
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("ECOVISION_REQUEST_TIMEOUT_SECONDS", "60"))
+REQUEST_DEADLINE_SECONDS = float(os.getenv("ECOVISION_REQUEST_DEADLINE_SECONDS", "150"))
+RETRY_MAX_RETRIES = int(os.getenv("ECOVISION_RETRY_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("ECOVISION_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("ECOVISION_RETRY_MAX_DELAY", "20"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("ECOVISION_BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("ECOVISION_BREAKER_RESET_SECONDS", "30"))
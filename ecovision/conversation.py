@@ -0,0 +1,133 @@
+"""Multi-turn Q&A context: which earlier turns go back to the model with a new question.
+
+Each request is laid out as system prompt, then the image, then an optional
+summary of older turns, then the recent turns that fit the token budget, then
+the new question. The system prompt and image come first and stay identical
+for the whole thread, so the provider's prompt cache can reuse them. Turns
+that fall out of the budget are folded into a running summary once, rather
+than being dropped or re-sent.
+"""
+
+from dataclasses import dataclass, field
+
+from . import config
+
+
+def estimate_text_tokens(text):
+    """Rough token count for English text: ~4 characters per token plus message overhead"""
+    return len(text) // 4 + 4
+
+
+@dataclass
+class TurnUsage:
+    """Prompt accounting for one answered question"""
+    prompt_tokens: int = None
+    cached_tokens: int = None
+    completion_tokens: int = None
+    context_turns: int = 0
+    context_tokens: int = 0
+    summarized: bool = False
+
+
+@dataclass
+class ConversationState:
+    """Per-session thread state layered over st.session_state.chat_history.
+
+    `start` is the chat_history index where the thread for the current image
+    begins, and `summarized_until` is the index up to which turns have been
+    folded into `summary`.
+    """
+    image_key: str = None
+    start: int = 0
+    summary: str = ""
+    summarized_until: int = 0
+    usage: list = field(default_factory=list)
+
+    def follow(self, image_key, chat_history):
+        """Start a new thread when the image changes or the chat was cleared"""
+        if image_key != self.image_key:
+            # Earlier turns were about another image
+            self.image_key = image_key
+            self.start = self.summarized_until = len(chat_history)
+            self.summary = ""
+        elif self.start > len(chat_history):
+            self.start = self.summarized_until = 0
+            self.summary = ""
+
+    def archivable(self):
+        """How many leading chat messages the model will never see again: older threads and summarized turns"""
+        return max(self.start, self.summarized_until)
+
+    def drop_before(self, count):
+        """Shift the indices after the first `count` chat_history messages were archived"""
+        self.start = max(0, self.start - count)
+        self.summarized_until = max(0, self.summarized_until - count)
+
+    def reset(self):
+        self.image_key = None
+        self.start = self.summarized_until = 0
+        self.summary = ""
+        self.usage = []
+
+
+def is_model_answer(message):
+    """AI chat messages produced by the model (not canned replies or errors)"""
+    return message["type"] == "ai" and message.get("time_to_first_token") is not None and not message.get("error")
+
+
+def chat_turns(chat_history, start=0):
+    """(index, message) pairs for the question/answer exchanges from `start`, as OpenAI messages.
+
+    Greetings, polite replies and failed answers are left out; a question
+    only goes back to the model together with its answer.
+    """
+    turns = []
+    for index in range(start, len(chat_history) - 1):
+        question, reply = chat_history[index], chat_history[index + 1]
+        if question["type"] == "user" and is_model_answer(reply):
+            turns.append((index, {"role": "user", "content": question["content"]}))
+            turns.append((index + 1, {"role": "assistant", "content": reply["content"]}))
+    return turns
+
+
+def recent_window(turns, budget):
+    """Newest whole question/answer pairs fitting `budget`; returns (messages, estimated tokens)"""
+    window, used = [], 0
+    for position in range(len(turns) - 2, -1, -2):
+        pair = [message for _, message in turns[position:position + 2]]
+        tokens = sum(estimate_text_tokens(message["content"]) for message in pair)
+        if used + tokens > budget:
+            break
+        window[:0] = pair
+        used += tokens
+    return window, used
+
+
+def build_context(eco_ai, state, chat_history, budget=config.QA_CONTEXT_TOKEN_BUDGET):
+    """Prior-turn messages for the next question and the TurnUsage describing them.
+
+    `chat_history` holds the turns before the new question. The newest turns
+    that fit `budget` are sent verbatim; when older turns overflow it, they
+    are folded into state.summary with one cheap text-only model call.
+    """
+    turns = chat_turns(chat_history, max(state.start, state.summarized_until))
+    window, used = recent_window(turns, budget)
+    overflow = turns[:len(turns) - len(window)]
+    summarized = False
+    if overflow:
+        # Summarize down to half the budget so the next few turns fit without another summary call
+        kept, kept_tokens = recent_window(turns, budget // 2)
+        folded = turns[:len(turns) - len(kept)]
+        summary = eco_ai.summarize_conversation(state.summary, [message for _, message in folded])
+        if summary is not None:
+            state.summary = summary
+            state.summarized_until = folded[-1][0] + 1
+            window, used, summarized = kept, kept_tokens, True
+
+    usage = TurnUsage(context_turns=len(window) // 2, context_tokens=used, summarized=summarized)
+    context = []
+    if state.summary:
+        context.append({"role": "system", "content": f"Summary of the earlier conversation about this image: "
+                                                      f"{state.summary}"})
+        usage.context_tokens += estimate_text_tokens(context[0]["content"])
+    return context + window, usage
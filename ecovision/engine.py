@@ -0,0 +1,616 @@
+"""Streamlit-free analysis engine shared by the apps and the command line."""
+
+import copy
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+
+from . import config
+from .batch import run_batch
+from .cache import default_cache, make_cache_key, prompt_fingerprint
+from .client import get_client
+from .history import default_history
+from .imaging import estimate_image_tokens, image_digest, perceptual_hash, prepare_image, tile_grid
+from .logs import log_event
+from .neardup import default_near_duplicates
+from .prescreen import PrescreenStats, screen_image
+from .prompts import QA_IMAGE_INTRO, QA_SUMMARY_PROMPT, QA_SYSTEM_PROMPT, QA_USER_TEMPLATE
+from .schema import AnalysisValidationError, ParseStats, parse_analysis, strip_fences
+from .scoring import DETAILED, analysis_metrics, attach_metrics
+from .singleflight import default_singleflight
+from .templates import TEMPLATES, get_template
+from .tiling import fit_tile_size, merge_tiles, tile_status
+from .transport import default_transport
+from .usage import CallRecord, default_usage, usage_counts
+
+QA_MAX_TOKENS = 1500
+QA_SUMMARY_MAX_TOKENS = 300
+
+POLITE_PHRASES = ["thank you", "thanks", "thanks a lot", "thank you so much", "cheers"]
+
+
+def is_polite_response(text):
+    """Check if the user's input is a simple polite phrase like 'thank you'"""
+    normalized_text = text.lower().strip()
+    return any(phrase in normalized_text for phrase in POLITE_PHRASES)
+
+
+def estimate_request_tokens(image, analysis_type="comprehensive", detail="high", templates=TEMPLATES):
+    """Upper bound on tokens one analysis request spends: image, prompt text and completion"""
+    template = get_template(analysis_type, templates)
+    return estimate_image_tokens(image.size, detail) + len(template.prompt) // 4 + template.max_tokens
+
+
+@dataclass
+class StreamedAnswer:
+    """Text and timings of one streamed Q&A answer (seconds from request start)"""
+    text: str = ""
+    time_to_first_token: float = None
+    total_latency: float = None
+    chunks: int = 0
+    error: str = None
+    coalesced: bool = False
+    prompt_tokens: int = None
+    cached_tokens: int = None
+    completion_tokens: int = None
+
+
+def record_usage(answer, usage):
+    """Copy prompt, cached and completion token counts from an API usage object"""
+    answer.prompt_tokens, answer.cached_tokens, answer.completion_tokens = usage_counts(usage)
+
+
+class EcoVisionAI:
+    """Image encoding, prompting, response parsing and recommendations.
+
+    Progress events go to the "ecovision" logger and, when verbose, to
+    `reporter(event, message)`; the engine itself never renders anything.
+    """
+
+    def __init__(self, client=None, model=config.MODEL, cache=None, reporter=None,
+                 structured_outputs=config.STRUCTURED_OUTPUTS, history=None, transport=None, singleflight=None,
+                 templates=None, prescreen=config.PRESCREEN, near_duplicates=None,
+                 near_duplicate_distance=config.NEAR_DUPLICATE_DISTANCE, usage=None, record_history=True):
+        self._client = client
+        self.model = model
+        self.cache = cache if cache is not None else default_cache()
+        self.reporter = reporter
+        self.structured_outputs = structured_outputs
+        self.parse_stats = ParseStats()
+        self.history = history if history is not None else default_history()
+        self.transport = transport if transport is not None else default_transport()
+        self.singleflight = singleflight if singleflight is not None else default_singleflight()
+        self.templates = templates if templates is not None else TEMPLATES
+        self.prescreen = prescreen
+        self.prescreen_stats = PrescreenStats()
+        self.near_duplicates = near_duplicates if near_duplicates is not None else default_near_duplicates()
+        self.near_duplicate_distance = near_duplicate_distance
+        self.usage = usage if usage is not None else default_usage()
+        self.record_history = record_history
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client()
+        return self._client
+
+    def _complete(self, **kwargs):
+        """chat.completions.create with retries, backoff, circuit breaking and a per-attempt timeout"""
+        kwargs.setdefault("timeout", config.REQUEST_TIMEOUT_SECONDS)
+        return self.transport.call(self.client.chat.completions.create, **kwargs)
+
+    def _report(self, verbose, event, message):
+        log_event(event, message)
+        if verbose and self.reporter is not None:
+            self.reporter(event, message)
+
+    def _account(self, kind, model, usage=None, ok=True, **timings):
+        """Record one API call's tokens, bytes, timings and estimated cost in the usage ledger"""
+        self.usage.record(CallRecord.from_usage(kind, model, usage, ok=ok, **timings))
+
+    def _remember(self, verbose, image_hash, analysis_type, result, latency, usage=None, cached=False):
+        """Persist a successful analysis to the history store"""
+        if not self.record_history:
+            return
+        try:
+            self.history.record(
+                image_hash, analysis_type, self.model, result, analysis_metrics(result, DETAILED),
+                latency=latency,
+                prompt_tokens=getattr(usage, "prompt_tokens", None),
+                completion_tokens=getattr(usage, "completion_tokens", None),
+                cached=cached,
+            )
+        except Exception as e:
+            self._report(verbose, "history_error", f"⚠️ Could not save analysis to history: {e}")
+
+    def encode_image(self, image, verbose=True, detail="high"):
+        """Convert PIL image to base64 string for OpenAI API"""
+        try:
+            # Downscale and compress to the model's effective resolution and byte budget;
+            # low detail is a single 512px tile
+            limits = {"max_long_side": 512, "max_short_side": 512} if detail == "low" else {}
+            prepared = prepare_image(image, **limits)
+            self._report(verbose, "encoded", f"✅ Image encoded successfully ({prepared.describe()})")
+            return prepared.base64
+        except Exception as e:
+            self._report(verbose, "encode_error", f"❌ Error encoding image: {e}")
+            return None
+
+    def analyze_image_with_ai(self, image, analysis_type="comprehensive", verbose=True, limiter=None):
+        """Analyze image using OpenAI GPT-4 Vision and return the parsed JSON result.
+
+        Pass verbose=False to skip progress reporting, e.g. from batch worker threads.
+        A batch.RateLimiter is only waited on when a request is actually sent:
+        cache hits, near-duplicate reuses, pre-screen rejections and coalesced
+        analyses spend none of its budget.
+        """
+        self._report(verbose, "start", "🔍 **Starting AI Analysis...**")
+        self._report(verbose, "start", f"**Analysis Mode:** {analysis_type}")
+        self._report(verbose, "start", f"**Image Size:** {image.size}")
+
+        template = get_template(analysis_type, self.templates)
+        # Structured output changes what comes back, so it is part of the prompt version
+        prompt_version = template.prompt
+        if self.structured_outputs:
+            prompt_version += json.dumps(template.response_format)
+
+        # Serve repeat analyses of the same image from the persistent cache
+        image_hash = image_digest(image)
+        fingerprint = prompt_fingerprint(prompt_version)
+        cache_key = make_cache_key(image_hash, analysis_type, fingerprint, self.model)
+        cached_result = self.cache.get(cache_key)
+        if cached_result is not None:
+            self._report(verbose, "cache_hit", "⚡ **Loaded from analysis cache**")
+            attach_metrics(cached_result)
+            self._remember(verbose, image_hash, analysis_type, cached_result, latency=0.0, cached=True)
+            return cached_result
+
+        # Near-identical photos (re-framed, recompressed) reuse an earlier analysis in the same scope
+        near_key = None
+        if self.near_duplicate_distance >= 0:
+            near_key = (perceptual_hash(image), make_cache_key("", analysis_type, fingerprint, self.model))
+            reused = self._reuse_near_duplicate(image, near_key, image_hash, analysis_type, cache_key, verbose)
+            if reused is not None:
+                return reused
+
+        # Unusable photos are turned away locally; trivial scenes go at low detail
+        screening = None
+        if self.prescreen:
+            screening = screen_image(image)
+            self.prescreen_stats.record(screening, image.size)
+            if screening.verdict == "rejected":
+                self._report(verbose, "prescreen", f"🚫 **Skipped the API call:** image is {screening.reason}")
+                return {
+                    "error": f"Image not analyzed: it is {screening.reason}. Please try a clearer photo.",
+                    "summary": "Rejected by local pre-screen",
+                    "local_metrics": screening.to_dict()
+                }
+            if screening.verdict == "low_detail":
+                self._report(verbose, "prescreen", f"🪶 **Simple scene** ({screening.reason}); using low detail")
+
+        # Identical analyses already in flight (other sessions, double clicks) share one request
+        result, shared = self.singleflight.do(
+            ("analysis", cache_key),
+            lambda: self._request_analysis(image, analysis_type, template, image_hash, cache_key, verbose,
+                                           screening, near_key, limiter)
+        )
+        if shared:
+            self._report(verbose, "coalesced", "🔗 **Joined an identical analysis already in progress**")
+            return copy.deepcopy(result)
+        return result
+
+    def analyze_tiled(self, image, analysis_type="comprehensive", tile_size=config.TILED_TILE_SIZE,
+                      overlap=config.TILED_OVERLAP, max_workers=config.TILED_MAX_WORKERS,
+                      max_tiles=config.TILED_MAX_TILES, limiter=None, verbose=True):
+        """Analyze a large image as overlapping tiles on a worker pool, merged into one result.
+
+        Each tile goes through analyze_image_with_ai (cache, pre-screen, usage
+        accounting, the rate limiter); only the merged result is saved to history. Its "tiling"
+        entry reports per-tile latency and wall time vs. sequential (see
+        ecovision.tiling). Images that fit in one tile are analyzed directly.
+        """
+        tile_size = fit_tile_size(image.size, tile_size, overlap, max_tiles)
+        boxes = tile_grid(image.size, tile_size, overlap)
+        if len(boxes) == 1:
+            return self.analyze_image_with_ai(image, analysis_type, verbose, limiter)
+        self._report(verbose, "start", f"🧩 **Tiled analysis:** {len(boxes)} tiles of up to {tile_size}px, "
+                                       f"{max_workers} at a time")
+
+        tile_engine = copy.copy(self)
+        tile_engine.record_history = False
+        image.load()  # decode once here, not in every worker's crop
+        started = time.perf_counter()
+        items = []
+        completed = run_batch(
+            [(box, box) for box in boxes],
+            lambda tile: tile_engine.analyze_image_with_ai(tile, analysis_type, verbose=False, limiter=limiter),
+            max_workers=max_workers,
+            load=image.crop,
+        )
+        for done, item in enumerate(completed, start=1):
+            items.append(item)
+            status = tile_status(item)
+            if status == "failed":
+                self._report(verbose, "tile_error", f"⚠️ Tile {done}/{len(boxes)} failed: {item.error}")
+            else:
+                self._report(verbose, "tile", f"🧩 Tile {done}/{len(boxes)} {status} ({item.latency:.1f}s)")
+        wall_seconds = time.perf_counter() - started
+
+        result = merge_tiles(items, wall_seconds, tile_size=tile_size, overlap=overlap, max_workers=max_workers)
+        if "error" in result:
+            self._report(verbose, "analysis_error", f"❌ **Error:** {result['error']}")
+            return result
+        attach_metrics(result)
+        tiling = result["tiling"]
+        self._report(verbose, "merged", f"🧩 **Merged {len(result['objects_detected'])} objects** from "
+                                        f"{tiling['tiles']} tiles in {wall_seconds:.1f}s "
+                                        f"({tiling['sequential_seconds']:.1f}s one by one)")
+        self._remember(verbose, image_digest(image), analysis_type, result, wall_seconds)
+        return result
+
+    def _reuse_near_duplicate(self, image, near_key, image_hash, analysis_type, cache_key, verbose):
+        """A copy of the cached result for the closest near-duplicate, or None.
+
+        The source lookup is not counted in the cache statistics (the exact-key
+        miss already was), and local_metrics are measured on this image, not
+        carried over from the source.
+        """
+        phash, scope = near_key
+        match = self.near_duplicates.nearest(phash, scope, self.near_duplicate_distance)
+        if match is None:
+            return None
+        source_key, distance = match
+        result = self.cache.get(source_key, count=False)
+        if result is None:
+            # The source result was evicted from the cache; stop matching against it
+            self.near_duplicates.discard(source_key)
+            return None
+        result["near_duplicate"] = {"distance": distance, "max_distance": self.near_duplicate_distance}
+        result.pop("local_metrics", None)
+        if self.prescreen:
+            result["local_metrics"] = screen_image(image).to_dict()
+        attach_metrics(result)
+        self.cache.put(cache_key, result)
+        self._report(verbose, "near_duplicate",
+                     f"♻️ **Reused the analysis of a near-identical image** ({distance}/64 bits differ)")
+        self._remember(verbose, image_hash, analysis_type, result, latency=0.0, cached=True)
+        return result
+
+    def _request_analysis(self, image, analysis_type, template, image_hash, cache_key, verbose, screening=None,
+                          near_key=None, limiter=None):
+        """Encode, call the model and parse; the uncached part of analyze_image_with_ai"""
+        detail = screening.detail if screening is not None else "high"
+        # Encode image
+        encode_started = time.perf_counter()
+        base64_image = self.encode_image(image, verbose=verbose, detail=detail)
+        if not base64_image:
+            return {"error": "Failed to encode image"}
+        timings = {"encode_seconds": time.perf_counter() - encode_started, "image_bytes": len(base64_image) * 3 // 4}
+        started = None
+        if limiter is not None:
+            limiter.acquire(estimate_request_tokens(image, analysis_type, detail, self.templates))
+
+        try:
+            self._report(verbose, "request", "📡 **Sending request to OpenAI...**")
+
+            extra = {"response_format": template.response_format} if self.structured_outputs else {}
+            started = time.perf_counter()
+            response = self._complete(
+                model=self.model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": template.prompt},
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:image/jpeg;base64,{base64_image}",
+                                    "detail": detail
+                                }
+                            }
+                        ]
+                    }
+                ],
+                max_tokens=template.max_tokens,
+                temperature=0.1,
+                **extra
+            )
+
+            latency = timings["network_seconds"] = time.perf_counter() - started
+            usage = getattr(response, "usage", None)
+            result_text = strip_fences(response.choices[0].message.content or "")
+            self._report(verbose, "response", "✅ **Received response from OpenAI**")
+            self._report(verbose, "raw_response",
+                         result_text[:500] + "..." if len(result_text) > 500 else result_text)
+
+            # Validate against the schema; truncated or wrapped JSON is repaired, not discarded
+            parse_started = time.perf_counter()
+            try:
+                parsed_result, outcome = parse_analysis(result_text, subset=template.subset)
+                timings["parse_seconds"] = time.perf_counter() - parse_started
+                self._account("analysis", self.model, usage, **timings)
+                self.parse_stats.record(outcome)
+                if outcome == "repaired":
+                    self._report(verbose, "parsed", "🩹 **Recovered partial JSON response**")
+                else:
+                    self._report(verbose, "parsed", "✅ **JSON parsing successful**")
+                if screening is not None:
+                    parsed_result["local_metrics"] = screening.to_dict()
+                attach_metrics(parsed_result)
+                self.cache.put(cache_key, parsed_result)
+                if near_key is not None:
+                    self.near_duplicates.add(near_key[0], near_key[1], cache_key)
+                self._remember(verbose, image_hash, analysis_type, parsed_result, latency, usage=usage)
+                return parsed_result
+            except AnalysisValidationError as parse_error:
+                timings["parse_seconds"] = time.perf_counter() - parse_started
+                self._account("analysis", self.model, usage, ok=False, **timings)
+                self.parse_stats.record("failed")
+                self._report(verbose, "parse_error", f"⚠️ **JSON parsing failed:** {parse_error}")
+                # Nothing usable came back; surface the raw text rather than inventing objects or scores
+                return {
+                    "error": f"Could not read the analysis: {parse_error}",
+                    "summary": "The model's response could not be parsed",
+                    "raw_analysis": result_text,
+                }
+
+        except Exception as e:
+            if started is not None and "network_seconds" not in timings:
+                self._account("analysis", self.model, ok=False, network_seconds=time.perf_counter() - started,
+                              **timings)
+            error_msg = f"Analysis failed: {str(e)}"
+            self._report(verbose, "analysis_error", f"❌ **Error:** {error_msg}")
+            return {
+                "error": error_msg,
+                "debug_info": f"Error type: {type(e).__name__}",
+                "summary": "Analysis encountered an error"
+            }
+
+    def _question_messages(self, question, base64_image, context=None):
+        """System prompt and image first, then prior turns, then the question.
+
+        The image is sent once per request at a fixed position, so every turn
+        of a thread shares the same prefix and the provider's prompt cache can
+        serve it.
+        """
+        return [
+            {
+                "role": "system",
+                "content": QA_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{base64_image}",
+                            "detail": "high"
+                        }
+                    },
+                    {
+                        "type": "text",
+                        "text": QA_IMAGE_INTRO
+                    }
+                ]
+            },
+            *(context or []),
+            {
+                "role": "user",
+                "content": QA_USER_TEMPLATE.format(question=question)
+            }
+        ]
+
+    def _question_key(self, question, base64_image, context=None):
+        thread = json.dumps(context or [], sort_keys=True)
+        digest = hashlib.sha256(f"{self.model}\x1f{question}\x1f{thread}\x1f{base64_image}".encode("utf-8")).hexdigest()
+        return ("question", digest)
+
+    def summarize_conversation(self, summary, turns):
+        """Fold chat turns ({"role", "content"} dicts) into the running summary; text only, no image.
+
+        Returns None if the call fails, so the caller keeps the turns for the next attempt.
+        """
+        transcript = "\n".join(f"{turn['role'].title()}: {turn['content']}" for turn in turns)
+        started = time.perf_counter()
+        try:
+            response = self._complete(
+                model=config.QA_SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": QA_SUMMARY_PROMPT},
+                    {"role": "user", "content": f"Earlier summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+                ],
+                max_tokens=QA_SUMMARY_MAX_TOKENS,
+                temperature=0
+            )
+            self._account("summary", config.QA_SUMMARY_MODEL, getattr(response, "usage", None),
+                          network_seconds=time.perf_counter() - started)
+            return response.choices[0].message.content.strip() or None
+        except Exception as e:
+            self._account("summary", config.QA_SUMMARY_MODEL, ok=False, network_seconds=time.perf_counter() - started)
+            self._report(True, "summary_error", f"⚠️ Could not summarize earlier turns: {str(e)}")
+            return None
+
+    def analyze_image_with_question(self, image, question, base64_image=None, context=None):
+        """Answer a question about an image, ChatGPT style.
+
+        Pass base64_image to reuse an already encoded upload, and context
+        (from conversation.build_context) to carry earlier turns of the thread.
+        """
+        encode_started = time.perf_counter()
+        if base64_image is None:
+            base64_image = self.encode_image(image)
+        if not base64_image:
+            return "Sorry, I couldn't process the image. Please try again."
+        timings = {"encode_seconds": time.perf_counter() - encode_started, "image_bytes": len(base64_image) * 3 // 4}
+
+        def ask():
+            started = time.perf_counter()
+            try:
+                response = self._complete(
+                    model=self.model,
+                    messages=self._question_messages(question, base64_image, context),
+                    max_tokens=QA_MAX_TOKENS,
+                    temperature=0.1
+                )
+            except Exception:
+                self._account("question", self.model, ok=False, network_seconds=time.perf_counter() - started,
+                              **timings)
+                raise
+            self._account("question", self.model, getattr(response, "usage", None),
+                          network_seconds=time.perf_counter() - started, **timings)
+            return response
+
+        try:
+            # The same question about the same image asked concurrently is answered once
+            response, _ = self.singleflight.do(self._question_key(question, base64_image, context), ask)
+
+            return response.choices[0].message.content
+
+        except Exception as e:
+            return f"I encountered an error while analyzing the image: {str(e)}. Please try again."
+
+    def stream_answer(self, image, question, base64_image=None, answer=None, context=None):
+        """Answer a question about an image, yielding text as the model produces it.
+
+        Timing, token usage and the full text are recorded on `answer` (a
+        StreamedAnswer).
+        """
+        answer = answer if answer is not None else StreamedAnswer()
+        started = time.perf_counter()
+
+        def emit(text):
+            if answer.time_to_first_token is None:
+                answer.time_to_first_token = time.perf_counter() - started
+            answer.text += text
+            return text
+
+        if base64_image is None:
+            base64_image = self.encode_image(image)
+        if not base64_image:
+            yield emit("Sorry, I couldn't process the image. Please try again.")
+            answer.total_latency = time.perf_counter() - started
+            return
+        timings = {"encode_seconds": time.perf_counter() - started, "image_bytes": len(base64_image) * 3 // 4}
+        stream_usage = None
+
+        # The same question about the same image asked concurrently is answered once;
+        # followers wait for the leader's complete answer
+        key = self._question_key(question, base64_image, context)
+        call, is_leader = self.singleflight.begin(key)
+        completed = False
+        try:
+            if is_leader:
+                stream = self._complete(
+                    model=self.model,
+                    messages=self._question_messages(question, base64_image, context),
+                    max_tokens=QA_MAX_TOKENS,
+                    temperature=0.1,
+                    stream=True,
+                    stream_options={"include_usage": True}
+                )
+                for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        stream_usage = chunk.usage
+                        record_usage(answer, stream_usage)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        answer.chunks += 1
+                        yield emit(delta)
+            else:
+                answer.coalesced = True
+                text = call.wait()
+                answer.chunks += 1
+                yield emit(text)
+            completed = True
+        except Exception as e:
+            if is_leader:
+                self.singleflight.finish(key, call, error=e)
+            answer.error = str(e)
+            yield emit(f"I encountered an error while analyzing the image: {str(e)}. Please try again.")
+        finally:
+            if is_leader and not call.done.is_set():
+                if completed:
+                    self.singleflight.finish(key, call, result=answer.text)
+                else:
+                    self.singleflight.finish(key, call, error=RuntimeError("the answer stream was abandoned"))
+            answer.total_latency = time.perf_counter() - started
+            if is_leader:
+                self._account("stream", self.model, stream_usage, ok=completed,
+                              network_seconds=answer.total_latency - timings["encode_seconds"], **timings)
+
+    def generate_recommendations(self, analysis_result):
+        """Generate actionable environmental recommendations"""
+        recommendations = []
+
+        if "overall_analysis" in analysis_result:
+            recommendations = analysis_result["overall_analysis"].get("recommendations", [])
+
+        # If no recommendations or empty, generate based on analysis content
+        if not recommendations or len(recommendations) == 0:
+            if "objects_detected" in analysis_result:
+                objects = analysis_result["objects_detected"]
+                if any("tree" in obj.get("name", "").lower() or "forest" in obj.get("name", "").lower() for obj in objects):
+                    recommendations.extend([
+                        "🌳 Protect existing tree canopy by avoiding development in forested areas",
+                        "🌱 Support reforestation initiatives in your local community", 
+                        "🚫 Avoid disturbing wildlife habitats and maintain natural corridors"
+                    ])
+                elif any("waste" in obj.get("name", "").lower() or "plastic" in obj.get("name", "").lower() for obj in objects):
+                    recommendations.extend([
+                        "♻️ Implement proper waste sorting and recycling practices",
+                        "🚯 Reduce single-use plastics and choose sustainable alternatives",
+                        "🔄 Support circular economy initiatives in your community"
+                    ])
+                else:
+                    recommendations.extend([
+                        "🔍 Continue monitoring environmental conditions regularly",
+                        "📊 Document changes over time to track environmental health",
+                        "🤝 Share findings with local environmental groups"
+                    ])
+            elif "raw_analysis" in analysis_result:
+                analysis_text = analysis_result["raw_analysis"].lower()
+                if "forest" in analysis_text or "tree" in analysis_text:
+                    recommendations.extend([
+                        "🌲 Preserve forest ecosystems through conservation efforts",
+                        "🌿 Promote biodiversity by protecting natural habitats",
+                        "🏞️ Support sustainable forestry practices"
+                    ])
+                elif "waste" in analysis_text or "recycl" in analysis_text:
+                    recommendations.extend([
+                        "♻️ Improve waste management and recycling systems",
+                        "🌍 Reduce environmental impact through better disposal practices", 
+                        "💡 Educate others about proper waste sorting"
+                    ])
+                else:
+                    recommendations.extend([
+                        "🌱 Take action to improve environmental sustainability",
+                        "📈 Monitor and measure environmental impact regularly",
+                        "🤝 Collaborate with others on conservation efforts"
+                    ])
+            else:
+                recommendations = [
+                    "🔍 Upload an image to receive personalized environmental recommendations",
+                    "🌍 Start by analyzing your local environment for improvement opportunities", 
+                    "📱 Use this tool regularly to track environmental changes"
+                ]
+
+        # Ensure we have at least 3 recommendations
+        while len(recommendations) < 3:
+            additional_recs = [
+                "🌳 Plant native species to support local ecosystems",
+                "💧 Conserve water resources through mindful usage",
+                "🔋 Choose renewable energy sources when possible",
+                "🚴‍♂️ Use sustainable transportation options",
+                "📚 Educate others about environmental conservation",
+                "🧹 Participate in local environmental cleanup efforts"
+            ]
+            for rec in additional_recs:
+                if rec not in recommendations and len(recommendations) < 3:
+                    recommendations.append(rec)
+
+        return recommendations[:3]  # Return max 3 recommendations
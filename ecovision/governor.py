@@ -0,0 +1,281 @@
+"""Session memory governor: accounting and eviction for what sessions keep in st.session_state.
+
+A long-running server keeps every open session's state in memory: the
+attached image, analyses, chat history and cached views. MemoryGovernor.govern
+runs at the end of each script run. It estimates the bytes held under each
+session key and reports the total to the process-wide governor. A session
+over its budget evicts, cheapest to rebuild first:
+
+1. the cached objects view, which is rebuilt on the next render;
+2. chat messages the model will never see again (older threads and turns
+   already folded into the summary), appended to a JSONL archive while the
+   newest GOVERNOR_KEEP_MESSAGES stay on screen;
+3. the image's working copy, written to a file and read back only when an
+   analysis needs it. The preview and API payload stay in memory.
+
+Only a session's own script run touches its session state. When the process
+is over budget, the images of other sessions are also spilled, least
+recently run first, through their thread-safe image stores. For those idle
+sessions the preview is spilled and the payload dropped as well; both are
+restored when the session runs again. Sessions are tracked through their
+SessionMemory, which lives in the session state: when Streamlit drops a
+session, its entry and its spill files go with it.
+"""
+
+import atexit
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter, deque
+from dataclasses import fields, is_dataclass
+
+from PIL import Image
+
+from . import config
+
+# Derived session values that are rebuilt on demand, so they are dropped first
+REBUILDABLE_KEYS = ("objects_view",)
+SCALARS = (str, bytes, bytearray, int, float, bool, type(None))
+
+
+def estimate_bytes(value, seen=None):
+    """Approximate bytes held by a session value.
+
+    Containers, dataclasses, strings and bytes are walked. Objects with an
+    `nbytes` (arrays, image stores), DataFrames, figures and PIL images report
+    their payload. Other objects count shallowly, so the engines and
+    process-wide ledgers they point to are not charged to every session.
+    Anything reachable twice through `seen` is counted once.
+    """
+    if seen is None:
+        seen = {}
+    if id(value) in seen:
+        return 0
+    seen[id(value)] = value  # keeps temporaries alive so their ids are not reused during the walk
+    size = sys.getsizeof(value)
+    if isinstance(value, SCALARS):
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_bytes(key, seen) + estimate_bytes(item, seen) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset, deque)):
+        return size + sum(estimate_bytes(item, seen) for item in value)
+    if isinstance(value, Image.Image):
+        return size + value.width * value.height * len(value.getbands())
+    if is_dataclass(value) and not isinstance(value, type):
+        return size + sum(estimate_bytes(getattr(value, f.name), seen) for f in fields(value))
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        # Shallow: string cells mostly share the analysis dict's strings, and deep=True costs ms per frame
+        usage = memory_usage(index=False)
+        return size + int(usage.sum() if hasattr(usage, "sum") else usage)
+    to_plotly_json = getattr(value, "to_plotly_json", None)
+    if callable(to_plotly_json):
+        return size + estimate_bytes(to_plotly_json(), seen)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return size + nbytes
+    return size
+
+
+class SessionMemory:
+    """One session's measured bytes, what was evicted from it, and where it spills"""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:12]
+        self.bytes = 0
+        self.by_key = {}
+        self.last_run = time.monotonic()
+        self.evictions = Counter()
+        self.archived_messages = 0
+        self.archived_questions = 0
+        self.folder = None
+        self.image_store = None  # weak reference, so another session's run can spill it
+
+    def reset_chat(self):
+        """Forget the chat archive (chat cleared)"""
+        self.archived_messages = self.archived_questions = 0
+        if self.folder is not None:
+            try:
+                os.remove(os.path.join(self.folder, "chat.jsonl"))
+            except OSError:
+                pass
+
+
+class MemoryGovernor:
+    """Process-wide accounting of session memory and the budgets that trigger eviction"""
+
+    def __init__(self, session_max_bytes=config.GOVERNOR_SESSION_MAX_BYTES,
+                 process_max_bytes=config.GOVERNOR_PROCESS_MAX_BYTES, keep_messages=config.GOVERNOR_KEEP_MESSAGES,
+                 spill_dir=config.GOVERNOR_SPILL_DIR):
+        self.session_max_bytes = session_max_bytes
+        self.process_max_bytes = process_max_bytes
+        self.keep_messages = max(2, keep_messages)
+        self.spill_dir = spill_dir
+        self._folder = None
+        self._sessions = weakref.WeakSet()
+        self._evictions = Counter()
+        self._lock = threading.Lock()
+
+    def track(self, session_state):
+        """The session's SessionMemory, created and registered on first use"""
+        memory = session_state.get("session_memory")
+        if memory is None:
+            memory = SessionMemory()
+            session_state["session_memory"] = memory
+            with self._lock:
+                self._sessions.add(memory)
+        return memory
+
+    def measure(self, session_state, memory=None):
+        """Estimate the bytes held under each key of a session's state; returns its SessionMemory"""
+        memory = memory or self.track(session_state)
+        seen = {}
+        by_key = {}
+        for key in list(session_state.keys()):
+            try:
+                value = session_state[key]
+            except Exception:
+                continue  # a widget value Streamlit will not hand back; measuring must never break the page
+            by_key[str(key)] = estimate_bytes(value, seen)
+        memory.by_key = by_key
+        memory.bytes = sum(by_key.values())
+        return memory
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions)
+
+    def total_bytes(self):
+        """Bytes held by all live sessions, as of their last measurement"""
+        return sum(memory.bytes for memory in self.sessions())
+
+    def budget(self):
+        """Bytes one session may hold now: the session limit, or its share of the process limit under pressure"""
+        sessions = self.sessions()
+        if sum(memory.bytes for memory in sessions) <= self.process_max_bytes:
+            return self.session_max_bytes
+        return min(self.session_max_bytes, self.process_max_bytes // max(1, len(sessions)))
+
+    def govern(self, session_state):
+        """Measure a session at the end of its script run and evict until it fits; returns its SessionMemory"""
+        memory = self.track(session_state)
+        memory.last_run = time.monotonic()
+        store = session_state.get("encoded_image_store")
+        memory.image_store = weakref.ref(store) if store is not None else None
+        self.measure(session_state, memory)
+        budget = self.budget()
+        if memory.bytes > budget:
+            self._evict(session_state, memory, budget)
+            self.measure(session_state, memory)
+        if self.total_bytes() > self.process_max_bytes:
+            self.reclaim_idle(exclude=memory)
+        return memory
+
+    def reclaim_idle(self, exclude=None):
+        """Spill other sessions' images, least recently run first, until the process fits"""
+        sessions = sorted((memory for memory in self.sessions() if memory is not exclude),
+                          key=lambda memory: memory.last_run)
+        excess = self.total_bytes() - self.process_max_bytes
+        for memory in sessions:
+            if excess <= 0:
+                break
+            excess -= self._spill_image(memory, idle=True)
+
+    def stats(self):
+        """Live sessions, bytes held, limits and eviction counts for the debug sidebar"""
+        sessions = self.sessions()
+        with self._lock:
+            evictions = dict(self._evictions)
+        return {
+            "sessions": len(sessions),
+            "bytes": sum(memory.bytes for memory in sessions),
+            "session_max_bytes": self.session_max_bytes,
+            "process_max_bytes": self.process_max_bytes,
+            "budget": self.budget(),
+            "evictions": evictions,
+        }
+
+    def _evict(self, session_state, memory, budget):
+        for key in REBUILDABLE_KEYS:
+            if memory.bytes > budget and key in session_state:
+                memory.bytes -= memory.by_key.pop(key, 0)
+                del session_state[key]
+                self._count(memory, "views")
+        if memory.bytes > budget:
+            self._archive_chat(session_state, memory)
+        if memory.bytes > budget:
+            self._spill_image(memory)
+
+    def _archive_chat(self, session_state, memory):
+        history = session_state.get("chat_history")
+        if not history:
+            return
+        state = session_state.get("conversation_state")
+        count = len(history) - self.keep_messages
+        if state is not None:
+            count = min(count, state.archivable())
+        if count <= 0:
+            return
+        archived = history[:count]
+        folder = self._session_folder(memory)
+        if folder is not None:
+            with open(os.path.join(folder, "chat.jsonl"), "a", encoding="utf-8") as f:
+                for message in archived:
+                    f.write(json.dumps(message, default=str) + "\n")
+        del history[:count]
+        if state is not None:
+            state.drop_before(count)
+        memory.bytes -= estimate_bytes(archived) - sys.getsizeof(archived)
+        memory.archived_messages += count
+        memory.archived_questions += sum(1 for message in archived if message.get("type") == "user")
+        self._count(memory, "chat_messages", count)
+
+    def _spill_image(self, memory, idle=False):
+        store = memory.image_store() if memory.image_store is not None else None
+        if store is None or store.ingested is None:
+            return 0
+        folder = self._session_folder(memory)
+        if folder is None:
+            return 0
+        freed = store.spill(os.path.join(folder, f"image-{uuid.uuid4().hex[:12]}.jpg"), idle=idle)
+        if freed:
+            memory.bytes -= freed
+            self._count(memory, "images")
+        return freed
+
+    def _session_folder(self, memory):
+        """The session's spill folder under this process's folder, created on first use; None if spilling is off"""
+        if not self.spill_dir:
+            return None
+        if memory.folder is None:
+            with self._lock:
+                if self._folder is None:
+                    self._folder = os.path.join(self.spill_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}")
+                    atexit.register(shutil.rmtree, self._folder, True)
+            memory.folder = os.path.join(self._folder, memory.id)
+            weakref.finalize(memory, shutil.rmtree, memory.folder, True)
+        os.makedirs(memory.folder, exist_ok=True)
+        return memory.folder
+
+    def _count(self, memory, kind, count=1):
+        memory.evictions[kind] += count
+        with self._lock:
+            self._evictions[kind] += count
+
+
+_default_governor = None
+_default_governor_lock = threading.Lock()
+
+
+def default_governor():
+    """Process-wide memory governor shared by every Streamlit session"""
+    global _default_governor
+    with _default_governor_lock:
+        if _default_governor is None:
+            _default_governor = MemoryGovernor()
+        return _default_governor
@@ -0,0 +1,176 @@
+"""Persistent analysis history.
+
+Every analysis is stored in a local SQLite file with its image hash, mode,
+model, latency, token usage, computed metrics and the full parsed result.
+Words of detected object names go into a separate indexed table, so history
+can be filtered by time, mode and object and paged with keyset pagination
+(`before_id`) without loading more than one page into memory.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from . import config
+
+SUMMARY_COLUMNS = ("id, created_at, image_hash, mode, model, latency, prompt_tokens, completion_tokens, "
+                   "cached, object_count, co2_impact, health_score, biodiversity, summary")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def object_terms(analysis):
+    """Distinct lower-cased words of the detected object names"""
+    terms = set()
+    for obj in analysis.get("objects_detected", []):
+        name = obj.get("name", "")
+        if isinstance(name, str):
+            terms.update(_WORD.findall(name.lower()))
+    return terms
+
+
+class HistoryStore:
+    def __init__(self, path=config.HISTORY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS analyses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at REAL NOT NULL,
+                image_hash TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                model TEXT NOT NULL,
+                latency REAL,
+                prompt_tokens INTEGER,
+                completion_tokens INTEGER,
+                cached INTEGER NOT NULL DEFAULT 0,
+                object_count INTEGER NOT NULL,
+                co2_impact REAL,
+                health_score INTEGER,
+                biodiversity REAL,
+                summary TEXT,
+                result TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses (created_at);
+            CREATE INDEX IF NOT EXISTS idx_analyses_mode ON analyses (mode, id);
+            CREATE INDEX IF NOT EXISTS idx_analyses_image ON analyses (image_hash);
+            CREATE TABLE IF NOT EXISTS analysis_terms (
+                term TEXT NOT NULL,
+                analysis_id INTEGER NOT NULL REFERENCES analyses (id) ON DELETE CASCADE,
+                PRIMARY KEY (term, analysis_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS idx_analysis_terms_analysis ON analysis_terms (analysis_id);
+        """)
+
+    def record(self, image_hash, mode, model, result, metrics, latency=None, prompt_tokens=None,
+               completion_tokens=None, cached=False, created_at=None):
+        """Store one analysis and its scoring.Metrics record; returns the new id"""
+        row = (
+            created_at if created_at is not None else time.time(), image_hash, mode, model, latency,
+            prompt_tokens, completion_tokens, int(cached), len(result.get("objects_detected", [])),
+            metrics.co2_impact, metrics.health_score, metrics.biodiversity,
+            result.get("summary", ""), json.dumps(result),
+        )
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                analysis_id = self._conn.execute(
+                    "INSERT INTO analyses (created_at, image_hash, mode, model, latency, prompt_tokens, "
+                    "completion_tokens, cached, object_count, co2_impact, health_score, biodiversity, summary, "
+                    "result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    row,
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO analysis_terms (term, analysis_id) VALUES (?, ?)",
+                    [(term, analysis_id) for term in object_terms(result)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return analysis_id
+
+    @staticmethod
+    def _filters(mode=None, object_name=None, since=None, until=None):
+        clauses, params = [], []
+        if mode:
+            clauses.append("mode = ?")
+            params.append(mode)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        # Every word of the query must prefix-match a word of some object name
+        for word in _WORD.findall((object_name or "").lower()):
+            clauses.append("id IN (SELECT analysis_id FROM analysis_terms WHERE term >= ? AND term < ?)")
+            params.extend([word, word + "\uffff"])
+        return clauses, params
+
+    def page(self, mode=None, object_name=None, since=None, until=None, before_id=None, limit=25):
+        """Newest-first page of summary rows (without the full result).
+
+        Returns (rows, next_before_id); pass next_before_id back to get the
+        following page. It is None on the last page.
+        """
+        clauses, params = self._filters(mode, object_name, since, until)
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {SUMMARY_COLUMNS} FROM analyses {where} ORDER BY id DESC LIMIT ?",
+                params + [limit + 1],
+            ).fetchall()
+        rows = [dict(row) for row in rows]
+        next_before_id = rows[limit - 1]["id"] if len(rows) > limit else None
+        return rows[:limit], next_before_id
+
+    def count(self, mode=None, object_name=None, since=None, until=None):
+        clauses, params = self._filters(mode, object_name, since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM analyses {where}", params).fetchone()[0]
+
+    def get(self, analysis_id):
+        """Full record including the parsed result, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM analyses WHERE id = ?", (analysis_id,)).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record["result"] = json.loads(record["result"])
+        return record
+
+    def modes(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT mode FROM analyses ORDER BY mode")]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM analysis_terms")
+            self._conn.execute("DELETE FROM analyses")
+
+
+_default_history = None
+_default_history_lock = threading.Lock()
+
+
+def default_history():
+    """Process-wide history store shared by every Streamlit session"""
+    global _default_history
+    with _default_history_lock:
+        if _default_history is None:
+            _default_history = HistoryStore()
+        return _default_history
@@ -0,0 +1,304 @@
+"""Image helpers shared by the EcoVision AI apps."""
+
+import base64
+import hashlib
+import io
+import math
+import warnings
+from dataclasses import dataclass
+
+from PIL import Image
+
+from . import config
+from .lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Modes Image.reduce works on; others are converted to RGB first
+REDUCIBLE_MODES = ("L", "LA", "I", "F", "RGB", "RGBA", "CMYK", "YCbCr")
+PREVIEW_QUALITY = 80
+
+
+@dataclass
+class PreparedImage:
+    """JPEG payload ready to send to the vision model, plus size bookkeeping"""
+    base64: str
+    jpeg_bytes: int
+    quality: int
+    size: tuple
+    original_size: tuple
+
+    @property
+    def original_bytes(self):
+        """Decoded RGB size of the original image"""
+        return self.original_size[0] * self.original_size[1] * 3
+
+    @property
+    def sent_bytes(self):
+        """Size of the base64 payload actually sent"""
+        return len(self.base64)
+
+    def describe(self):
+        ow, oh = self.original_size
+        w, h = self.size
+        return (f"{ow}×{oh} → {w}×{h} px, {self.sent_bytes / 1024:.0f} KB sent "
+                f"(JPEG q{self.quality})")
+
+
+class ImageTooLargeError(ValueError):
+    """An image with more pixels than the ingestion limit"""
+
+
+@dataclass
+class IngestedImage:
+    """An upload decoded at working resolution and kept only as compact JPEG bytes.
+
+    The working copy can be spilled to a file, in which case `data` is None
+    and image() reads it back from `path` without keeping it. The preview can
+    follow it to disk until load_preview() is called.
+    """
+    data: bytes
+    preview: bytes
+    size: tuple
+    original_size: tuple
+    quality: int
+    path: str = None
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory: working copy and preview, unless spilled"""
+        return (len(self.data) if self.data is not None else 0) + (len(self.preview) if self.preview is not None else 0)
+
+    def spill(self, path, preview=False):
+        """Move the working copy (and with `preview`, the preview) to files; returns the bytes freed"""
+        freed = 0
+        data = self.data
+        if data is not None:
+            with open(path, "wb") as f:
+                f.write(data)
+            self.path = path
+            self.data = None
+            freed += len(data)
+        if preview and self.preview is not None:
+            with open(self.path + ".preview", "wb") as f:
+                f.write(self.preview)
+            freed += len(self.preview)
+            self.preview = None
+        return freed
+
+    def load_preview(self):
+        """The preview bytes, read back into memory if spilled.
+
+        Safe while another thread spills it: spill() writes the file before
+        clearing the attribute, and the attribute is read only once here.
+        """
+        preview = self.preview
+        if preview is None:
+            with open(self.path + ".preview", "rb") as f:
+                preview = self.preview = f.read()
+        return preview
+
+    def image(self):
+        """Decode the working copy; the PIL image belongs to the caller and is not kept"""
+        data = self.data
+        if data is None:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def describe(self):
+        ow, oh = self.original_size
+        w, h = self.size
+        return f"{ow}×{oh} → {w}×{h} px, {self.nbytes / 1024:.0f} KB held (JPEG q{self.quality})"
+
+
+def image_digest(image):
+    """Content hash of an image's decoded RGB pixels.
+
+    Hashing the pixels rather than the uploaded file means the same photo
+    re-saved with different metadata or container settings maps to the same key.
+    """
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    digest = hashlib.sha256()
+    digest.update(f"{image.width}x{image.height}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def perceptual_hash(image):
+    """64-bit DCT perceptual hash (pHash) as an int.
+
+    The low-frequency 8×8 DCT block of a 32×32 grayscale copy, thresholded at
+    its median: recompression, resizing and small exposure or framing changes
+    flip only a few bits, so Hamming distance measures visual similarity.
+    """
+    small = image.convert('L') if image.mode not in ('L', 'RGB') else image
+    small = small.resize((32, 32), Image.BOX, reducing_gap=2.0).convert('L')
+    pixels = np.asarray(small, dtype=np.float32)
+    block = cv2.dct(pixels)[:8, :8].flatten()
+    bits = block > np.median(block[1:])
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+def fit_to_vision_grid(size, max_long_side=config.IMAGE_MAX_LONG_SIDE,
+                       max_short_side=config.IMAGE_MAX_SHORT_SIDE):
+    """Target size for an image so it fits the model's long/short side limits"""
+    width, height = size
+    scale = min(1.0, max_long_side / max(width, height), max_short_side / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _tile_starts(length, tile_size, step):
+    if length <= tile_size:
+        return [0]
+    starts = list(range(0, length - tile_size + 1, step))
+    if starts[-1] + tile_size < length:
+        starts.append(length - tile_size)
+    return starts
+
+
+def tile_grid(size, tile_size=config.TILED_TILE_SIZE, overlap=0):
+    """Row-major (left, top, right, bottom) boxes covering `size`, overlapping by `overlap` px"""
+    width, height = size
+    step = max(1, tile_size - overlap)
+    return [(left, top, min(left + tile_size, width), min(top + tile_size, height))
+            for top in _tile_starts(height, tile_size, step)
+            for left in _tile_starts(width, tile_size, step)]
+
+
+def _open_checked(source, max_source_pixels):
+    """Image.open with our own pixel limit in place of Pillow's decompression-bomb warning"""
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", Image.DecompressionBombWarning)
+            image = Image.open(source)
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from e
+    if image.width * image.height > max_source_pixels:
+        raise ImageTooLargeError(f"{image.width}×{image.height} px is over the "
+                                 f"{max_source_pixels / 1e6:.0f} MP limit")
+    return image
+
+
+def _decode_reduced(image, max_pixels):
+    """Decode an opened image to RGB at no more than `max_pixels`"""
+    factor = math.ceil(math.sqrt(image.width * image.height / max_pixels))
+    if factor > 1 and image.format == "JPEG":
+        # libjpeg scales while decoding: the smallest power of two reaching the target, up to 1/8
+        scale = min(8, 2 ** math.ceil(math.log2(factor)))
+        image.draft("RGB", (image.width // scale, image.height // scale))
+        factor = math.ceil(math.sqrt(image.width * image.height / max_pixels))
+    if factor > 1:
+        if image.mode not in REDUCIBLE_MODES:
+            image = image.convert("RGB")
+        image = image.reduce(factor)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def open_image(source, max_pixels=config.INGEST_MAX_PIXELS, max_source_pixels=config.INGEST_MAX_SOURCE_PIXELS):
+    """Open an image file as RGB with at most `max_pixels` pixels.
+
+    A large JPEG is never decoded at full resolution: libjpeg decodes it at
+    1/2, 1/4 or 1/8 scale (draft). Other formats are decoded once, then
+    shrunk by an integer factor (reduce) before the RGB conversion, so the
+    conversion only touches the small image.
+    """
+    return _decode_reduced(_open_checked(source, max_source_pixels), max_pixels)
+
+
+def ingest_image(source, max_bytes=config.SESSION_IMAGE_MAX_BYTES, max_pixels=config.INGEST_MAX_PIXELS,
+                 max_source_pixels=config.INGEST_MAX_SOURCE_PIXELS, quality=config.INGEST_QUALITY,
+                 preview_side=config.INGEST_PREVIEW_SIDE):
+    """Decode an upload once at working resolution into JPEG bytes plus a preview, together within `max_bytes`"""
+    opened = _open_checked(source, max_source_pixels)
+    original_size = opened.size
+    image = _decode_reduced(opened, max_pixels)
+    scale = min(1.0, preview_side / max(image.size))
+    preview = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                           Image.LANCZOS, reducing_gap=2.0) if scale < 1 else image
+    preview_data = _jpeg(preview, PREVIEW_QUALITY)
+    image, data, used_quality = _fit_budget(image, max_bytes - len(preview_data), quality, config.IMAGE_MIN_QUALITY)
+    return IngestedImage(data, preview_data, image.size, original_size, used_quality)
+
+
+def _jpeg(image, quality):
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=quality, optimize=True)
+    return buffered.getvalue()
+
+
+def _encode_within_budget(image, byte_budget, max_quality, min_quality):
+    """Highest JPEG quality whose output fits the byte budget (binary search)"""
+    data = _jpeg(image, max_quality)
+    if len(data) <= byte_budget:
+        return data, max_quality
+    best = None
+    low, high = min_quality, max_quality - 1
+    while low <= high:
+        quality = (low + high) // 2
+        candidate = _jpeg(image, quality)
+        if len(candidate) <= byte_budget:
+            best = (candidate, quality)
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best if best else (None, min_quality)
+
+
+def _fit_budget(image, byte_budget, quality, min_quality):
+    """(image, data, quality) at the highest quality fitting the budget, shrinking if even min_quality is too big"""
+    data, used_quality = _encode_within_budget(image, byte_budget, quality, min_quality)
+    while data is None:
+        image = image.resize((max(1, int(image.width * 0.8)), max(1, int(image.height * 0.8))),
+                             Image.LANCZOS)
+        data, used_quality = _encode_within_budget(image, byte_budget, min_quality, min_quality)
+        if image.width <= 64 or image.height <= 64:
+            data, used_quality = _jpeg(image, min_quality), min_quality
+    return image, data, used_quality
+
+
+def prepare_image(image, byte_budget=config.IMAGE_BYTE_BUDGET,
+                  max_long_side=config.IMAGE_MAX_LONG_SIDE,
+                  max_short_side=config.IMAGE_MAX_SHORT_SIDE,
+                  quality=config.IMAGE_QUALITY, min_quality=config.IMAGE_MIN_QUALITY):
+    """Resize, compress and base64-encode an image for the vision API.
+
+    The image is downscaled to the model's effective resolution, then encoded at
+    the highest JPEG quality that fits `byte_budget`. If even `min_quality` is
+    too large the image is shrunk further until it fits.
+    """
+    original_size = image.size
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    target = fit_to_vision_grid(image.size, max_long_side, max_short_side)
+    if target != image.size:
+        image = image.resize(target, Image.LANCZOS, reducing_gap=3.0)
+
+    image, data, used_quality = _fit_budget(image, byte_budget, quality, min_quality)
+    return PreparedImage(
+        base64=base64.b64encode(data).decode('utf-8'),
+        jpeg_bytes=len(data),
+        quality=used_quality,
+        size=image.size,
+        original_size=original_size,
+    )
+
+
+def estimate_image_tokens(size, detail="high"):
+    """Approximate prompt tokens the vision model bills for an image.
+
+    High-detail images are fitted to the 2048/768 grid and billed 170 tokens
+    per 512px tile plus a fixed 85; low detail is a flat 85.
+    """
+    if detail == "low":
+        return 85
+    width, height = fit_to_vision_grid(size, 2048, 768)
+    tiles = -(-width // 512) * -(-height // 512)
+    return 85 + 170 * tiles
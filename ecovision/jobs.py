@@ -0,0 +1,129 @@
+"""Background job queue for analyses, so the Streamlit script thread never waits on OpenAI.
+
+A front-end submits work and keeps only the job id in st.session_state. Each
+rerun polls the job's status and progress events, and picks up the result
+once it is done. Jobs run on one process-wide thread pool, so a single server
+can have many analyses in flight across sessions. A queued job can be
+cancelled before it starts. A running one is marked cancelled and its result
+is discarded when the request returns.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+class Job:
+    """One unit of background work: status, progress events and the outcome"""
+
+    def __init__(self, label=""):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.status = "queued"
+        self.events = []
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._future = None
+
+    def log(self, event, message):
+        """Reporter-compatible callback: record a progress event"""
+        self.events.append((event, message))
+
+    @property
+    def done(self):
+        return self.status in FINISHED
+
+    @property
+    def elapsed(self):
+        """Seconds since submission, or until finish for finished jobs"""
+        return (self.finished_at or time.time()) - self.submitted_at
+
+
+class JobQueue:
+    def __init__(self, max_workers=config.JOB_MAX_WORKERS, retention_seconds=config.JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ecovision-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, label=""):
+        """Run fn(job) on the pool; returns the Job immediately"""
+        job = Job(label)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            # Under the lock, so cancel() always sees the future it may cancel
+            job._future = self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        with self._lock:
+            if job.status == "cancelled":
+                # Cancelled after the pool picked it up but before it started
+                job.finished_at = job.finished_at or time.time()
+                return
+            job.status = "running"
+            job.started_at = time.time()
+        try:
+            result, error = fn(job), None
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+        with self._lock:
+            job.finished_at = time.time()
+            if job.status == "cancelled":
+                return
+            job.result, job.error = result, error
+            job.status = "failed" if error else "done"
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a job; returns False if it had already finished"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return False
+            job.status = "cancelled"
+            if job._future is not None and job._future.cancel():
+                job.finished_at = time.time()
+            return True
+
+    def _prune(self):
+        # Caller holds the lock; finished jobs nobody picked up are dropped after the retention period
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.done and job.finished_at is not None and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            counts = {"queued": 0, "running": 0, "done": 0, "failed": 0, "cancelled": 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_default_job_queue = None
+_default_job_queue_lock = threading.Lock()
+
+
+def default_job_queue():
+    """Process-wide job queue shared by every Streamlit session"""
+    global _default_job_queue
+    with _default_job_queue_lock:
+        if _default_job_queue is None:
+            _default_job_queue = JobQueue()
+        return _default_job_queue
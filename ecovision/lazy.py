@@ -0,0 +1,31 @@
+"""Deferred imports for heavy dependencies.
+
+`np = lazy_import("numpy")` binds a stand-in when the importing module loads.
+The real module is imported on first attribute access, so a page that never
+measures an image or draws a chart doesn't pay for NumPy, pandas, OpenCV or
+Plotly at startup.
+"""
+
+import importlib
+
+
+class LazyModule:
+    """Stand-in that imports `name` the first time one of its attributes is used"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        # Only reached for attributes the stand-in itself doesn't have; the import lock makes this thread-safe
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -0,0 +1,52 @@
+"""Structured logging for engine progress events.
+
+The engine sends every event to the "ecovision" logger with its event name
+attached. Front-ends choose separately whether to show any of it, e.g. in an
+opt-in debug panel, so the normal analysis path adds nothing to the page.
+"""
+
+import logging
+
+from . import config
+
+logger = logging.getLogger("ecovision")
+
+# Events that are not plain progress; the raw model output is only for debugging
+EVENT_LEVELS = {
+    "start": logging.DEBUG,
+    "encoded": logging.DEBUG,
+    "raw_response": logging.DEBUG,
+    "history_error": logging.WARNING,
+    "parse_error": logging.WARNING,
+    "tile_error": logging.WARNING,
+    "summary_error": logging.WARNING,
+    "encode_error": logging.ERROR,
+    "analysis_error": logging.ERROR,
+}
+
+
+def plain(message):
+    """Event message without Markdown emphasis"""
+    return message.replace("**", "")
+
+
+def log_event(event, message):
+    logger.log(EVENT_LEVELS.get(event, logging.INFO), "%s", plain(message), extra={"event": event})
+
+
+def _with_event(record):
+    if not hasattr(record, "event"):
+        record.event = "-"
+    return True
+
+
+def configure_logging(level=config.LOG_LEVEL):
+    """Send ecovision logs at `level` and above to stderr as key=value lines; safe to call on every rerun"""
+    logger.setLevel(level)
+    if not any(getattr(handler, "ecovision", False) for handler in logger.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s level=%(levelname)s event=%(event)s %(message)s"))
+        handler.addFilter(_with_event)
+        handler.ecovision = True
+        logger.addHandler(handler)
+        logger.propagate = False
@@ -0,0 +1,178 @@
+"""Perceptual-hash index for reusing analyses of near-identical images.
+
+Field teams upload bursts of the same scene with slightly different framing
+or compression, which the exact pixel-digest cache misses. Each analyzed
+image's 64-bit pHash is recorded with the cache key of its result. A new
+image whose hash is within a few bits (Hamming distance) of an indexed one
+in the same analysis scope (analysis type, prompt version, model) reuses
+that result.
+
+Rows persist in SQLite; lookups run against an in-memory NumPy copy, a
+vectorized XOR and popcount over every entry, which stays well under a
+millisecond at 100k images. The copy is loaded on first use, so sessions that
+never analyze an image don't pay for NumPy or for reading the table.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from . import config
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+
+_SIGN = 1 << 63
+
+
+def _to_sql(phash):
+    # SQLite integers are signed 64-bit
+    return phash - (1 << 64) if phash >= _SIGN else phash
+
+
+def _from_sql(value):
+    return value + (1 << 64) if value < 0 else value
+
+
+def popcount64(values):
+    """Set bits in each element of a uint64 array; np.bitwise_count on NumPy 2, an unpackbits sum on NumPy 1.x"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    values = np.ascontiguousarray(values, dtype=np.uint64)
+    return np.unpackbits(values.view(np.uint8)).reshape(-1, 64).sum(axis=1, dtype=np.uint8)
+
+
+class NearDuplicateIndex:
+    def __init__(self, path=config.NEAR_DUPLICATE_PATH, max_entries=config.NEAR_DUPLICATE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.lookups = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS near_duplicates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                phash INTEGER NOT NULL,
+                scope TEXT NOT NULL,
+                cache_key TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+
+        self._hashes = None
+
+    def _load(self):
+        """Read the table into memory on first use (caller holds the lock)"""
+        if self._hashes is not None:
+            return
+        rows = self._conn.execute("SELECT id, phash, scope, cache_key FROM near_duplicates ORDER BY id").fetchall()
+        self._scope_ids = {}
+        self._ids = [row[0] for row in rows]
+        self._keys = [row[3] for row in rows]
+        self._size = len(rows)
+        hashes = np.zeros(max(1024, self._size * 2), dtype=np.uint64)
+        self._scopes = np.full(len(hashes), -1, dtype=np.int32)
+        hashes[:self._size] = [_from_sql(row[1]) for row in rows]
+        self._scopes[:self._size] = [self._scope_id(row[2]) for row in rows]
+        self._hashes = hashes
+
+    def _scope_id(self, scope):
+        return self._scope_ids.setdefault(scope, len(self._scope_ids))
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return int((self._scopes[:self._size] >= 0).sum())
+
+    def add(self, phash, scope, cache_key):
+        """Index an analyzed image"""
+        with self._lock:
+            self._load()
+            row_id = self._conn.execute(
+                "INSERT INTO near_duplicates (phash, scope, cache_key, created_at) VALUES (?, ?, ?, ?)",
+                (_to_sql(phash), scope, cache_key, time.time()),
+            ).lastrowid
+            if self._size == len(self._hashes):
+                self._hashes = np.concatenate([self._hashes, np.zeros_like(self._hashes)])
+                self._scopes = np.concatenate([self._scopes, np.full_like(self._scopes, -1)])
+            self._hashes[self._size] = phash
+            self._scopes[self._size] = self._scope_id(scope)
+            self._ids.append(row_id)
+            self._keys.append(cache_key)
+            self._size += 1
+            if self.max_entries and self._size > self.max_entries:
+                self._drop_oldest(self._size - self.max_entries + self.max_entries // 10)
+
+    def _drop_oldest(self, count):
+        """Forget the `count` oldest entries (caller holds the lock)"""
+        self._conn.execute("DELETE FROM near_duplicates WHERE id <= ?", (self._ids[count - 1],))
+        keep = self._size - count
+        self._hashes[:keep] = self._hashes[count:self._size]
+        self._scopes[:keep] = self._scopes[count:self._size]
+        self._scopes[keep:self._size] = -1
+        del self._ids[:count]
+        del self._keys[:count]
+        self._size = keep
+
+    def nearest(self, phash, scope, max_distance):
+        """(cache_key, distance) of the closest indexed image within max_distance bits, or None"""
+        with self._lock:
+            self._load()
+            self.lookups += 1
+            scope_id = self._scope_ids.get(scope)
+            if scope_id is None or not self._size:
+                return None
+            distances = popcount64(self._hashes[:self._size] ^ np.uint64(phash))
+            distances[self._scopes[:self._size] != scope_id] = 255
+            best = int(distances.argmin())
+            distance = int(distances[best])
+            if distance > max_distance:
+                return None
+            self.hits += 1
+            return self._keys[best], distance
+
+    def discard(self, cache_key):
+        """Drop entries whose cached result is gone"""
+        with self._lock:
+            self._load()
+            positions = [i for i, key in enumerate(self._keys) if key == cache_key]
+            for i in positions:
+                self._scopes[i] = -1
+            self._conn.execute("DELETE FROM near_duplicates WHERE cache_key = ?", (cache_key,))
+
+    def stats(self):
+        with self._lock:
+            if self._hashes is None:
+                # Not loaded yet: count the rows rather than loading them for the sidebar
+                entries = self._conn.execute("SELECT COUNT(*) FROM near_duplicates").fetchone()[0]
+            else:
+                entries = int((self._scopes[:self._size] >= 0).sum())
+            return {"lookups": self.lookups, "hits": self.hits, "entries": entries}
+
+    def clear(self):
+        with self._lock:
+            self._load()
+            self._conn.execute("DELETE FROM near_duplicates")
+            self._scopes[:self._size] = -1
+            self._ids.clear()
+            self._keys.clear()
+            self._size = 0
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def default_near_duplicates():
+    """Process-wide index shared by every Streamlit session"""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = NearDuplicateIndex()
+        return _default_index
@@ -0,0 +1,155 @@
+"""Local pre-screen run before an analysis is sent to the vision model.
+
+A few milliseconds of OpenCV on a 512px copy catch photos that would waste
+an API call: blurred, nearly black or white, or blank frames are rejected
+with a reason. Clearly trivial scenes with almost no edges are sent at low
+detail, a flat 85 image tokens. Blur is told apart from a genuinely smooth
+scene by whether coarse structure is still present at 128px. The same pass measures an excess-green
+vegetation index and the dominant colours, which are attached to the result
+as `local_metrics`.
+"""
+
+import threading
+from dataclasses import asdict, dataclass, field
+
+from PIL import Image
+
+from . import config
+from .imaging import estimate_image_tokens
+from .lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# OpenCV hues run 0-179; twelve 15° bins starting at red
+HUE_NAMES = ["red", "orange", "yellow", "lime", "green", "spring green", "cyan", "azure", "blue", "violet",
+             "magenta", "rose"]
+# Excess green (2g - r - b on chromaticity) above this counts as vegetation
+VEGETATION_EXG = 0.1
+
+
+@dataclass
+class LocalMetrics:
+    sharpness: float
+    structure: float
+    brightness: float
+    contrast: float
+    dark_fraction: float
+    bright_fraction: float
+    edge_density: float
+    excess_green: float
+    vegetation_fraction: float
+    dominant_colors: list = field(default_factory=list)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass
+class Screening:
+    """Pre-screen outcome: verdict is "ok", "low_detail" or "rejected"."""
+    metrics: LocalMetrics
+    verdict: str
+    reason: str = ""
+
+    @property
+    def detail(self):
+        return "low" if self.verdict == "low_detail" else "high"
+
+    def to_dict(self):
+        return {**self.metrics.to_dict(), "verdict": self.verdict, "reason": self.reason}
+
+
+def dominant_colors(hsv, top=3):
+    """Largest hue families as [name, fraction]; unsaturated or dark pixels count as "neutral" """
+    hue, saturation, value = hsv[..., 0], hsv[..., 1], hsv[..., 2]
+    colored = (saturation >= 40) & (value >= 40)
+    counts = np.bincount(hue[colored] // 15, minlength=12)[:12]
+    families = list(zip(HUE_NAMES, counts)) + [("neutral", int((~colored).sum()))]
+    total = hue.size
+    families.sort(key=lambda family: family[1], reverse=True)
+    return [[name, round(int(count) / total, 3)] for name, count in families[:top] if count]
+
+
+def measure(image, size=config.PRESCREEN_SIZE):
+    """LocalMetrics for a PIL image, computed on a copy no larger than size×size"""
+    scale = min(1.0, size / max(image.size))
+    small = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                         Image.BILINEAR, reducing_gap=2.0) if scale < 1.0 else image
+    rgb = np.asarray(small.convert("RGB"))
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+
+    # Coarse structure survives blur; it tells a blurred photo from a featureless one
+    coarse = cv2.resize(gray, (128, max(1, round(128 * gray.shape[0] / gray.shape[1]))),
+                        interpolation=cv2.INTER_AREA).astype(np.float32)
+    gradient = np.hypot(cv2.Sobel(coarse, cv2.CV_32F, 1, 0), cv2.Sobel(coarse, cv2.CV_32F, 0, 1))
+
+    channels = rgb.astype(np.float32)
+    total = channels.sum(axis=2) + 1e-6
+    excess_green = (2 * channels[..., 1] - channels[..., 0] - channels[..., 2]) / total
+
+    return LocalMetrics(
+        sharpness=round(float(cv2.Laplacian(gray, cv2.CV_64F).var()), 1),
+        structure=round(float(gradient.mean()), 1),
+        brightness=round(float(gray.mean()) / 255, 3),
+        contrast=round(float(gray.std()) / 255, 3),
+        dark_fraction=round(float((gray < 16).mean()), 3),
+        bright_fraction=round(float((gray > 240).mean()), 3),
+        edge_density=round(float((cv2.Canny(gray, 100, 200) > 0).mean()), 4),
+        excess_green=round(float(excess_green.mean()), 3),
+        vegetation_fraction=round(float((excess_green > VEGETATION_EXG).mean()), 3),
+        dominant_colors=dominant_colors(cv2.cvtColor(rgb, cv2.COLOR_RGB2HSV)),
+    )
+
+
+def screen(metrics):
+    """Decide what to do with an image from its LocalMetrics"""
+    if metrics.brightness < config.PRESCREEN_MIN_BRIGHTNESS:
+        return Screening(metrics, "rejected", f"too dark (brightness {metrics.brightness:.0%})")
+    if metrics.brightness > config.PRESCREEN_MAX_BRIGHTNESS:
+        return Screening(metrics, "rejected", f"overexposed (brightness {metrics.brightness:.0%})")
+    if metrics.contrast < config.PRESCREEN_MIN_CONTRAST:
+        return Screening(metrics, "rejected", "a blank or uniform frame")
+    if metrics.sharpness < config.PRESCREEN_MIN_SHARPNESS:
+        if metrics.structure >= config.PRESCREEN_MIN_STRUCTURE:
+            return Screening(metrics, "rejected", f"too blurry (sharpness {metrics.sharpness:.0f} < "
+                                                  f"{config.PRESCREEN_MIN_SHARPNESS:.0f})")
+        return Screening(metrics, "low_detail", "a smooth, featureless scene")
+    if metrics.edge_density < config.PRESCREEN_LOW_DETAIL_EDGES:
+        return Screening(metrics, "low_detail", f"few details ({metrics.edge_density:.1%} edge pixels)")
+    return Screening(metrics, "ok")
+
+
+def screen_image(image):
+    """Measure and screen a PIL image"""
+    return screen(measure(image))
+
+
+class PrescreenStats:
+    """Thread-safe counts of pre-screen outcomes and the API spend they avoided"""
+
+    def __init__(self):
+        self.screened = 0
+        self.rejected = 0
+        self.low_detail = 0
+        self.image_tokens_saved = 0
+        self._lock = threading.Lock()
+
+    def record(self, screening, image_size):
+        with self._lock:
+            self.screened += 1
+            if screening.verdict == "rejected":
+                self.rejected += 1
+            elif screening.verdict == "low_detail":
+                self.low_detail += 1
+                self.image_tokens_saved += estimate_image_tokens(image_size) - estimate_image_tokens(image_size, "low")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "screened": self.screened,
+                "rejected": self.rejected,
+                "low_detail": self.low_detail,
+                "api_calls_saved": self.rejected,
+                "image_tokens_saved": self.image_tokens_saved,
+            }
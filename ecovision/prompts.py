@@ -0,0 +1,96 @@
+"""Prompts sent to the vision model."""
+
+# Enhanced prompt for better forest detection and human activities
+ANALYSIS_PROMPT = """Analyze this environmental image and provide detailed insights in JSON format.
+
+Pay special attention to:
+- Individual trees, forest areas, canopy coverage
+- Vegetation types (moss, ferns, undergrowth, grass, saplings, young trees)
+- Water features (streams, rivers, lakes)
+- Soil and ground coverage
+- Human activities (tree planting, farming, conservation work, gardening)
+- People engaged in environmental activities
+- Tools or evidence of environmental work (shovels, seedlings, planted areas)
+- Any human-made structures or impacts
+
+Detect ALL visible elements including people, activities, and environmental objects.
+
+Return your response as valid JSON with this exact structure:
+{
+  "summary": "Detailed description of the environmental scene including forest density, ecosystem type, and any human activities",
+  "objects_detected": [
+    {
+      "name": "specific object, organism, or activity name (be detailed: 'people planting trees', 'tree saplings', 'reforestation activity', 'environmental workers', etc.)",
+      "type": "living or non-living",
+      "confidence": 0.9,
+      "environmental_impact": "positive, negative, or neutral",
+      "sustainability_score": 8,
+      "description": "detailed description including size, density, health, or activity purpose",
+      "recommended_action": "specific recommended action"
+    }
+  ],
+  "overall_analysis": {
+    "environmental_health_score": 8.5,
+    "biodiversity_level": "high",
+    "key_concerns": ["list of environmental concerns"],
+    "positive_aspects": ["list of positive environmental aspects"],
+    "recommendations": ["list of actionable recommendations"]
+  }
+}
+
+Please ensure your response is valid JSON only. Detect as many distinct environmental elements AND human activities as possible."""
+
+# Compact per-mode prompts; the analysis templates pair each with a narrower schema
+WASTE_PROMPT = """Identify waste, litter, pollution and recyclable materials in this environmental image, plus the main natural features they affect.
+
+Return valid JSON only:
+{
+  "summary": "one or two sentences on the waste situation",
+  "objects_detected": [
+    {"name": "specific item, e.g. 'plastic bottles'", "type": "living or non-living", "confidence": 0.9,
+     "environmental_impact": "positive, negative, or neutral", "sustainability_score": 3,
+     "recommended_action": "how to remove, recycle or prevent it"}
+  ],
+  "overall_analysis": {
+    "environmental_health_score": 6.5,
+    "key_concerns": ["main pollution concerns"],
+    "recommendations": ["clean-up and recycling actions"]
+  }
+}"""
+
+BIODIVERSITY_PROMPT = """Assess the biodiversity in this environmental image: plants, trees, animals, fungi, habitats and anything threatening them.
+
+Return valid JSON only:
+{
+  "summary": "one or two sentences on the ecosystem and its diversity",
+  "objects_detected": [
+    {"name": "species, organism group or habitat feature", "type": "living or non-living", "confidence": 0.9,
+     "environmental_impact": "positive, negative, or neutral", "sustainability_score": 8,
+     "description": "short note on abundance and health"}
+  ],
+  "overall_analysis": {
+    "environmental_health_score": 7.5,
+    "biodiversity_level": "high, medium, or low",
+    "key_concerns": ["threats to biodiversity"],
+    "positive_aspects": ["signs of a healthy ecosystem"],
+    "recommendations": ["conservation actions"]
+  }
+}"""
+
+# Comprehensive system prompt for conversational Q&A about an image
+QA_SYSTEM_PROMPT = """You are EcoVision AI, an expert environmental analyst. You can analyze any environmental image and answer questions about it comprehensively and accurately.
+
+You excel at:
+- Identifying all objects, people, animals, plants, and environmental features. Be sure to correctly distinguish between living things (like humans, plants, and animals) and non-living things (like equipment, fire, or rocks).
+- Assessing environmental health and sustainability.
+- Providing conservation recommendations.
+- Answering specific questions about what you observe.
+- Explaining ecological processes and relationships.
+
+Always provide detailed, accurate, and helpful responses. If asked about specific counts (like "how many people"), be precise. Maintain a logical and factual tone. Answer naturally as if you're having a conversation."""
+
+QA_USER_TEMPLATE = "Please analyze this environmental image and answer my question: {question}"
+
+QA_IMAGE_INTRO = "This is the environmental image we are discussing."
+
+QA_SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and EcoVision AI about one environmental image. Merge the earlier summary (if any) with the new turns into a single concise summary of at most 150 words. Keep facts the user was told (counts, species, scores, recommendations), open questions and user preferences; drop pleasantries. Reply with the summary only."""
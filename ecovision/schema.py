@@ -0,0 +1,307 @@
+"""Analysis result schema: the JSON-schema response format, a typed model and partial-JSON repair.
+
+The model is asked for output matching ANALYSIS_RESPONSE_FORMAT. Whatever comes
+back is parsed with parse_analysis(), which validates it into AnalysisResult
+and, when the text is truncated or wrapped in prose, recovers the longest
+valid JSON prefix instead of throwing the paid response away.
+"""
+
+import json
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+
+IMPACTS = ["positive", "negative", "neutral"]
+
+_OBJECT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "type": {"type": "string"},
+        "confidence": {"type": "number"},
+        "environmental_impact": {"type": "string", "enum": IMPACTS},
+        "sustainability_score": {"type": "number"},
+        "description": {"type": "string"},
+        "recommended_action": {"type": "string"},
+    },
+    "required": ["name", "type", "confidence", "environmental_impact", "sustainability_score",
+                 "description", "recommended_action"],
+    "additionalProperties": False,
+}
+
+_OVERALL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "environmental_health_score": {"type": "number"},
+        "biodiversity_level": {"type": "string"},
+        "key_concerns": {"type": "array", "items": {"type": "string"}},
+        "positive_aspects": {"type": "array", "items": {"type": "string"}},
+        "recommendations": {"type": "array", "items": {"type": "string"}},
+    },
+    "required": ["environmental_health_score", "biodiversity_level", "key_concerns", "positive_aspects",
+                 "recommendations"],
+    "additionalProperties": False,
+}
+
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "objects_detected": {"type": "array", "items": _OBJECT_SCHEMA},
+        "overall_analysis": _OVERALL_SCHEMA,
+    },
+    "required": ["summary", "objects_detected", "overall_analysis"],
+    "additionalProperties": False,
+}
+
+
+def subset_schema(object_fields, overall_fields):
+    """ANALYSIS_SCHEMA narrowed to the given objects_detected and overall_analysis fields"""
+    def narrow(schema, fields):
+        return {
+            "type": "object",
+            "properties": {name: schema["properties"][name] for name in fields},
+            "required": list(fields),
+            "additionalProperties": False,
+        }
+
+    return {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string"},
+            "objects_detected": {"type": "array", "items": narrow(_OBJECT_SCHEMA, object_fields)},
+            "overall_analysis": narrow(_OVERALL_SCHEMA, overall_fields),
+        },
+        "required": ["summary", "objects_detected", "overall_analysis"],
+        "additionalProperties": False,
+    }
+
+
+def response_format(name, schema):
+    """Strict json_schema response_format for a chat.completions request"""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+ANALYSIS_RESPONSE_FORMAT = response_format("environmental_analysis", ANALYSIS_SCHEMA)
+
+
+class AnalysisValidationError(ValueError):
+    """Raised when a response does not match the analysis schema"""
+
+
+def _string(data, key, default=None):
+    value = data.get(key, default)
+    if not isinstance(value, str):
+        raise AnalysisValidationError(f"{key} must be a string")
+    return value
+
+
+def _number(data, key, default=None):
+    value = data.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise AnalysisValidationError(f"{key} must be a number")
+    return value
+
+
+def _strings(data, key, default=None):
+    value = data.get(key, default)
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise AnalysisValidationError(f"{key} must be a list of strings")
+    return value
+
+
+@dataclass
+class DetectedObject:
+    name: str
+    type: str
+    confidence: float
+    environmental_impact: str
+    sustainability_score: float
+    description: str
+    recommended_action: str
+
+    @classmethod
+    def from_dict(cls, data, lenient=False):
+        """Validate one objects_detected entry; lenient fills missing fields except the name"""
+        if not isinstance(data, dict):
+            raise AnalysisValidationError("objects_detected entries must be objects")
+        defaults = {"type": "", "confidence": 0.0, "environmental_impact": "neutral", "sustainability_score": 0,
+                    "description": "", "recommended_action": ""} if lenient else {}
+        impact = _string(data, "environmental_impact", defaults.get("environmental_impact")).lower()
+        if impact not in IMPACTS and lenient:
+            impact = "neutral"
+        elif impact not in IMPACTS:
+            raise AnalysisValidationError(f"environmental_impact must be one of {IMPACTS}")
+        return cls(
+            name=_string(data, "name"),
+            type=_string(data, "type", defaults.get("type")),
+            confidence=_number(data, "confidence", defaults.get("confidence")),
+            environmental_impact=impact,
+            sustainability_score=_number(data, "sustainability_score", defaults.get("sustainability_score")),
+            description=_string(data, "description", defaults.get("description")),
+            recommended_action=_string(data, "recommended_action", defaults.get("recommended_action")),
+        )
+
+
+@dataclass
+class OverallAnalysis:
+    environmental_health_score: float
+    biodiversity_level: str
+    key_concerns: list = field(default_factory=list)
+    positive_aspects: list = field(default_factory=list)
+    recommendations: list = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data, lenient=False):
+        if not isinstance(data, dict):
+            raise AnalysisValidationError("overall_analysis must be an object")
+        defaults = {"environmental_health_score": 0, "biodiversity_level": "unknown", "key_concerns": [],
+                    "positive_aspects": [], "recommendations": []} if lenient else {}
+        return cls(
+            environmental_health_score=_number(data, "environmental_health_score",
+                                               defaults.get("environmental_health_score")),
+            biodiversity_level=_string(data, "biodiversity_level", defaults.get("biodiversity_level")),
+            key_concerns=_strings(data, "key_concerns", defaults.get("key_concerns")),
+            positive_aspects=_strings(data, "positive_aspects", defaults.get("positive_aspects")),
+            recommendations=_strings(data, "recommendations", defaults.get("recommendations")),
+        )
+
+
+@dataclass
+class AnalysisResult:
+    summary: str
+    objects_detected: list
+    overall_analysis: OverallAnalysis
+
+    @classmethod
+    def from_dict(cls, data, lenient=False):
+        """Validate a decoded response.
+
+        With lenient=True (used for repaired output) missing fields get
+        neutral defaults and objects cut off before their name are dropped.
+        """
+        if not isinstance(data, dict):
+            raise AnalysisValidationError("analysis must be a JSON object")
+        objects = data.get("objects_detected", [] if lenient else None)
+        if not isinstance(objects, list):
+            raise AnalysisValidationError("objects_detected must be a list")
+        if lenient:
+            objects = [obj for obj in objects if isinstance(obj, dict) and isinstance(obj.get("name"), str)]
+        return cls(
+            summary=_string(data, "summary", "" if lenient else None),
+            objects_detected=[DetectedObject.from_dict(obj, lenient) for obj in objects],
+            overall_analysis=OverallAnalysis.from_dict(data.get("overall_analysis", {} if lenient else None),
+                                                       lenient),
+        )
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def strip_fences(text):
+    """Remove a surrounding ```json ... ``` block"""
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text.replace("```json", "").replace("```", "").strip()
+    elif text.startswith("```"):
+        text = text.replace("```", "").strip()
+    return text
+
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def repair_json(text, max_attempts=200):
+    """Recover the longest valid JSON object from truncated or prose-wrapped text.
+
+    Scans from the first "{" while tracking open brackets and strings, then
+    tries cutting at each complete value (latest first) and closing whatever
+    is still open. Returns the decoded object, or None if nothing parses.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    text = text[start:]
+
+    stack = []
+    cuts = []  # (end index, closers needed) after each complete value
+    in_string = escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                cuts.append((i + 1, "".join(reversed(stack))))
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if not stack:
+                break
+            stack.pop()
+            cuts.append((i + 1, "".join(reversed(stack))))
+            if not stack:
+                break
+        elif char.isdigit() or char in "el":  # ends of numbers, true/false, null
+            cuts.append((i + 1, "".join(reversed(stack))))
+
+    for end, closers in reversed(cuts[-max_attempts:]):
+        candidate = _TRAILING_COMMA.sub(r"\1", text[:end].rstrip().rstrip(",") + closers)
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def parse_analysis(text, subset=False):
+    """Parse model output into a validated analysis dict.
+
+    Returns (result, outcome) with outcome "parsed" or "repaired"; raises
+    AnalysisValidationError when even repair finds nothing usable. Pass
+    subset=True for responses to a subset_schema() request, so the fields it
+    leaves out get the same defaults as repaired output.
+    """
+    text = strip_fences(text)
+    try:
+        return AnalysisResult.from_dict(json.loads(text), lenient=subset).to_dict(), "parsed"
+    except (json.JSONDecodeError, AnalysisValidationError) as e:
+        error = e
+
+    data = repair_json(text)
+    if data is None:
+        raise AnalysisValidationError(f"unrecoverable response: {error}")
+    result = AnalysisResult.from_dict(data, lenient=True)
+    if not result.objects_detected and not result.summary:
+        raise AnalysisValidationError(f"nothing recoverable in response: {error}")
+    return result.to_dict(), "repaired"
+
+
+class ParseStats:
+    """Thread-safe counters of how model responses were parsed"""
+
+    def __init__(self):
+        self.parsed = 0
+        self.repaired = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def record(self, outcome):
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            total = self.parsed + self.repaired + self.failed
+            return {
+                "parsed": self.parsed,
+                "repaired": self.repaired,
+                "failed": self.failed,
+                "success_rate": (self.parsed + self.repaired) / total if total else 0.0,
+            }
@@ -0,0 +1,383 @@
+"""CO₂ impact, environmental health and biodiversity scoring for analysis results.
+
+Two profiles exist: "detailed" (the main app's forest-aware scoring with
+undergrowth, water, soil, energy, emissions and summary bonuses) and "basic"
+(the Q&A app's vegetation, planting and environmental-worker rules only).
+
+The keyword taxonomy is compiled once into a single regex. Each object name is
+scanned in one pass and reduced to a bitmask of the keyword categories it
+contains. Rules are then bit tests, and score_frame() scores many analyses at
+once with NumPy.
+
+The engine scores an analysis under every profile when it lands and stores
+the Metrics records with it under "metrics", so the sidebars, the history
+store, batch exports and the command line read them instead of rescoring.
+"""
+
+import re
+from dataclasses import asdict, dataclass
+
+from .lazy import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+DETAILED = "detailed"
+BASIC = "basic"
+
+# Keyword categories, matched as case-insensitive substrings of object names
+CATEGORIES = {
+    "forest": ["tree", "forest", "vegetation", "plant", "woods", "canopy"],
+    "vegetation": ["tree", "forest", "vegetation", "plant", "woods", "canopy", "sapling"],
+    "planting": ["planting", "reforestation", "tree planting", "environmental work", "conservation"],
+    "people": ["people", "person", "human", "worker", "volunteer"],
+    "people_env": ["plant", "environment", "conservation", "garden"],
+    "seedling": ["seedling", "young tree", "saplings", "newly planted"],
+    "undergrowth": ["moss", "fern", "undergrowth", "ground cover"],
+    "water": ["stream", "river", "water", "creek", "brook"],
+    "soil": ["soil", "ground", "earth", "organic"],
+    "solar": ["solar"],
+    "wind": ["wind", "turbine"],
+    "vehicle": ["car", "truck", "vehicle", "bus"],
+    "industrial": ["factory", "industrial", "smokestack", "chimney"],
+    "waste": ["waste", "trash", "garbage", "landfill"],
+    "health_forest": ["tree", "forest", "vegetation"],
+    "health_undergrowth": ["moss", "fern", "undergrowth"],
+    "health_water": ["stream", "water"],
+    "health_activity": ["planting", "reforestation", "conservation", "environmental work"],
+    "health_people": ["people", "person", "human", "worker"],
+    "health_people_env": ["plant", "environment", "conservation"],
+}
+
+# Summary-text keyword groups
+REFORESTATION_SUMMARY = ["planting", "reforestation", "tree planting", "planted", "seedlings"]
+MATURE_SUMMARY = ["old", "mature", "ancient", "thick", "dense", "pristine"]
+YOUNG_SUMMARY = ["young", "early", "developing", "growing", "new"]
+HEALTH_REFORESTATION_SUMMARY = ["planting", "reforestation", "tree planting", "planted"]
+
+
+def _alternation(keywords):
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+
+class KeywordClassifier:
+    """Maps text to a bitmask of keyword categories with a single regex scan.
+
+    The pattern is an overlapping lookahead over every keyword, longest first,
+    so each position reports the longest keyword starting there. Every shorter
+    keyword contained in a match is also present in the text, so each keyword's
+    mask is closed over the keywords it contains.
+    """
+
+    def __init__(self, categories):
+        self.bits = {name: 1 << i for i, name in enumerate(categories)}
+        keywords = sorted({kw for kws in categories.values() for kw in kws}, key=lambda kw: (-len(kw), kw))
+        own_mask = {kw: 0 for kw in keywords}
+        for name, kws in categories.items():
+            for kw in kws:
+                own_mask[kw] |= self.bits[name]
+        self._masks = {
+            kw: _or_all(own_mask[other] for other in keywords if other in kw)
+            for kw in keywords
+        }
+        self.pattern = re.compile("(?=(" + "|".join(re.escape(kw) for kw in keywords) + "))")
+        self._memo = {}
+
+    def classify(self, text):
+        """Category bitmask for an already lower-cased text"""
+        mask = self._memo.get(text)
+        if mask is None:
+            mask = _or_all(self._masks[kw] for kw in self.pattern.findall(text))
+            if len(self._memo) < 100000:
+                self._memo[text] = mask
+        return mask
+
+    def classify_many(self, texts):
+        """Bitmasks for many lower-cased texts; each distinct text is scanned once"""
+        if not len(texts):
+            return np.zeros(0, dtype=np.int64)
+        uniques, inverse = np.unique(np.asarray(texts, dtype=object), return_inverse=True)
+        return np.fromiter((self.classify(text) for text in uniques), dtype=np.int64,
+                           count=len(uniques))[inverse]
+
+    def mask(self, *names):
+        return _or_all(self.bits[name] for name in names)
+
+
+def _or_all(values):
+    mask = 0
+    for value in values:
+        mask |= value
+    return mask
+
+
+CLASSIFIER = KeywordClassifier(CATEGORIES)
+BIT = CLASSIFIER.bits
+
+
+@dataclass(frozen=True)
+class Rule:
+    """An object rule: fires when all `required` category bits are present"""
+    required: int
+    amount: float
+    template: str = ""
+    default_name: str = ""
+    scaled: bool = False
+
+
+# CO₂ rules in priority order; the first matching rule scores an object
+CO2_RULES = [
+    # Trees and vegetation (CO₂ absorption) - Enhanced with density multiplier
+    Rule(BIT["vegetation"], 2.5, "🌳 {name}: +{value:.1f} kg CO₂/day", "Forest", scaled=True),
+    # Tree planting and reforestation activities (HUGE positive impact)
+    Rule(BIT["planting"], 15.0, "🌱 {name}: +{value:.1f} kg CO₂/day", "Tree Planting Activity", scaled=True),
+    # People engaged in environmental activities
+    Rule(BIT["people"] | BIT["people_env"], 10.0, "👥 {name}: +{value:.1f} kg CO₂/day", "Environmental Workers"),
+    # Seedlings and young trees (future CO₂ absorption)
+    Rule(BIT["seedling"], 5.0, "🌿 {name}: +{value:.1f} kg CO₂/day (future growth)", "Seedlings"),
+    # Moss and undergrowth (additional carbon sequestration)
+    Rule(BIT["undergrowth"], 1.5, "🌿 {name}: +{value:.1f} kg CO₂/day", "Undergrowth", scaled=True),
+    # Water bodies in forest (carbon sink)
+    Rule(BIT["water"], 2.0, "🌊 {name}: +{value:.1f} kg CO₂/day", "Forest Stream"),
+    # Soil and organic matter (carbon storage)
+    Rule(BIT["soil"], 3.0, "🌱 {name}: +{value:.1f} kg CO₂/day", "Forest Soil", scaled=True),
+    # Solar panels and wind turbines (CO₂ reduction)
+    Rule(BIT["solar"], 15.0, "☀️ Solar Array: +{value:.1f} kg CO₂ saved/day"),
+    Rule(BIT["wind"], 25.0, "💨 Wind Energy: +{value:.1f} kg CO₂ saved/day"),
+    # Vehicles, industry and waste (CO₂ emissions)
+    Rule(BIT["vehicle"], -25.0, "🚗 Vehicles: {value:.1f} kg CO₂/day"),
+    Rule(BIT["industrial"], -150.0, "🏭 Industrial: {value:.1f} kg CO₂/day"),
+    Rule(BIT["waste"], -8.0, "🗑️ Waste Site: {value:.1f} kg CO₂ eq/day"),
+]
+
+# Health bonuses in priority order (detailed profile only)
+HEALTH_RULES = [
+    Rule(BIT["health_forest"], 10),
+    Rule(BIT["health_undergrowth"], 8),
+    Rule(BIT["health_water"], 12),
+    Rule(BIT["health_activity"], 25),
+    Rule(BIT["health_people"] | BIT["health_people_env"], 20),
+]
+
+PROFILES = {
+    DETAILED: {"co2_rules": CO2_RULES, "health_rules": HEALTH_RULES, "summary_bonuses": True},
+    BASIC: {"co2_rules": CO2_RULES[:3], "health_rules": [], "summary_bonuses": False},
+}
+
+REFORESTATION_PATTERN = _alternation(REFORESTATION_SUMMARY)
+MATURE_PATTERN = _alternation(MATURE_SUMMARY)
+YOUNG_PATTERN = _alternation(YOUNG_SUMMARY)
+HEALTH_REFORESTATION_PATTERN = _alternation(HEALTH_REFORESTATION_SUMMARY)
+
+
+def _first_rule(rules, mask):
+    for rule in rules:
+        if mask & rule.required == rule.required:
+            return rule
+    return None
+
+
+def _density(forest_objects):
+    if forest_objects >= 3:
+        return 4, "Dense Forest Ecosystem"
+    elif forest_objects >= 2:
+        return 2.5, "Forest Area"
+    return 1, "Individual Trees"
+
+
+def _object_masks(analysis):
+    return [CLASSIFIER.classify(obj.get("name", "").lower()) for obj in analysis.get("objects_detected", [])]
+
+
+def forest_density(analysis):
+    """Count forest objects and derive the density multiplier and label"""
+    detected_forest_objects = sum(1 for mask in _object_masks(analysis) if mask & BIT["forest"])
+    return (detected_forest_objects,) + _density(detected_forest_objects)
+
+
+def co2_impact(analysis, profile=DETAILED, masks=None):
+    """Estimated daily CO₂ impact in kg and the per-item calculation details"""
+    settings = PROFILES[profile]
+    objects = analysis.get("objects_detected", [])
+    masks = _object_masks(analysis) if masks is None else masks
+    detected_forest_objects = sum(1 for mask in masks if mask & BIT["forest"])
+    forest_multiplier, forest_type = _density(detected_forest_objects)
+
+    co2_impact = 0
+    co2_details = []
+    for obj, mask in zip(objects, masks):
+        rule = _first_rule(settings["co2_rules"], mask)
+        if rule is None:
+            continue
+        value = rule.amount * forest_multiplier if rule.scaled else rule.amount
+        co2_impact += value
+        co2_details.append(rule.template.format(name=obj.get("name", rule.default_name), value=value))
+
+    # Add forest ecosystem bonus if dense forest detected
+    if detected_forest_objects >= 2:
+        ecosystem_bonus = 5.0 * detected_forest_objects
+        co2_impact += ecosystem_bonus
+        co2_details.append(f"🌲 {forest_type} Bonus: +{ecosystem_bonus:.1f} kg CO₂/day")
+
+    if not settings["summary_bonuses"]:
+        return co2_impact, co2_details
+
+    summary_text = analysis.get("summary", "").lower()
+    if REFORESTATION_PATTERN.search(summary_text):
+        co2_impact += 20.0
+        co2_details.append(f"🌱 Active Reforestation Bonus: +{20.0:.1f} kg CO₂/day")
+    if MATURE_PATTERN.search(summary_text):
+        co2_impact += 8.0
+        co2_details.append(f"🌳 Mature Forest Bonus: +{8.0:.1f} kg CO₂/day")
+    elif YOUNG_PATTERN.search(summary_text):
+        co2_impact += 12.0
+        co2_details.append(f"🌿 Young Forest Growth Bonus: +{12.0:.1f} kg CO₂/day")
+
+    return co2_impact, co2_details
+
+
+def health_score(analysis, profile=DETAILED, masks=None):
+    """Environmental health score on a 0-100 scale"""
+    settings = PROFILES[profile]
+    objects = analysis.get("objects_detected", [])
+    masks = _object_masks(analysis) if masks is None else masks
+
+    health_score = 60
+    for obj, mask in zip(objects, masks):
+        impact = obj.get("environmental_impact", "neutral")
+        if impact == "positive":
+            health_score += 15
+        elif impact == "negative":
+            health_score -= 20
+        rule = _first_rule(settings["health_rules"], mask)
+        if rule is not None:
+            health_score += rule.amount
+
+    if settings["summary_bonuses"]:
+        detected_forest_objects = sum(1 for mask in masks if mask & BIT["forest"])
+        if detected_forest_objects >= 3:
+            health_score += 20
+        elif detected_forest_objects >= 2:
+            health_score += 15
+        if HEALTH_REFORESTATION_PATTERN.search(analysis.get("summary", "").lower()):
+            health_score += 30
+
+    return max(0, min(100, health_score))
+
+
+def biodiversity(analysis):
+    """Living organisms, total objects and the living percentage (None when nothing was detected)"""
+    objects = analysis.get("objects_detected", [])
+    living_count = sum(1 for obj in objects if obj.get("type", "").lower() == "living")
+    total_objects = len(objects)
+    percentage = (living_count / total_objects) * 100 if total_objects > 0 else None
+    return living_count, total_objects, percentage
+
+
+@dataclass(frozen=True)
+class Metrics:
+    """Sidebar metrics for one analysis under one scoring profile"""
+    co2_impact: float
+    co2_details: tuple
+    health_score: int
+    living_count: int
+    total_objects: int
+    biodiversity: float = None
+
+    def to_dict(self):
+        return {**asdict(self), "co2_details": list(self.co2_details)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{**data, "co2_details": tuple(data["co2_details"])})
+
+
+def score_metrics(analysis, profile=DETAILED):
+    """Score one analysis into a Metrics record"""
+    masks = _object_masks(analysis)
+    impact, details = co2_impact(analysis, profile, masks)
+    living_count, total_objects, percentage = biodiversity(analysis)
+    return Metrics(impact, tuple(details), health_score(analysis, profile, masks), living_count, total_objects,
+                   percentage)
+
+
+def score_analysis(analysis, profile=DETAILED):
+    """All sidebar metrics for one analysis as a plain dict"""
+    return score_metrics(analysis, profile).to_dict()
+
+
+def attach_metrics(analysis):
+    """Score `analysis` under every profile and store the results in analysis["metrics"]"""
+    analysis["metrics"] = {profile: score_analysis(analysis, profile) for profile in PROFILES}
+    return analysis
+
+
+def analysis_metrics(analysis, profile=DETAILED):
+    """The Metrics stored with `analysis`, scored and stored now if it has none (e.g. older history rows)"""
+    stored = (analysis.get("metrics") or {}).get(profile)
+    if stored is None:
+        stored = attach_metrics(analysis)["metrics"][profile]
+    return Metrics.from_dict(stored)
+
+
+def _select(rules, masks, values):
+    """Per-object value of the first matching rule (0 where none match)"""
+    conditions = [(masks & rule.required) == rule.required for rule in rules]
+    return np.select(conditions, values, default=0.0) if rules else np.zeros(len(masks))
+
+
+def score_frame(analyses, profile=DETAILED):
+    """Score many analyses at once; returns one DataFrame row per analysis (no detail strings)"""
+    settings = PROFILES[profile]
+    count = len(analyses)
+    owners, names, impacts, living, summaries = [], [], [], [], []
+    for i, analysis in enumerate(analyses):
+        summaries.append(analysis.get("summary", "").lower())
+        for obj in analysis.get("objects_detected", []):
+            owners.append(i)
+            names.append(obj.get("name", "").lower())
+            impacts.append(obj.get("environmental_impact", "neutral"))
+            living.append(obj.get("type", "").lower() == "living")
+
+    owners = np.asarray(owners, dtype=np.intp)
+    masks = CLASSIFIER.classify_many(names)
+    total_objects = np.bincount(owners, minlength=count)
+    living_count = np.bincount(owners, weights=np.asarray(living, dtype=float), minlength=count).astype(int)
+    forest_objects = np.bincount(owners, weights=(masks & BIT["forest"]) != 0, minlength=count).astype(int)
+    multiplier = np.select([forest_objects >= 3, forest_objects >= 2], [4.0, 2.5], default=1.0)
+
+    # CO₂: first matching rule per object, scaled by its analysis's forest density
+    co2_rules = settings["co2_rules"]
+    amounts = _select(co2_rules, masks, [
+        rule.amount * multiplier[owners] if rule.scaled else np.full(len(masks), rule.amount)
+        for rule in co2_rules
+    ])
+    co2 = np.bincount(owners, weights=amounts, minlength=count)
+    co2 = co2 + np.where(forest_objects >= 2, 5.0 * forest_objects, 0.0)
+
+    # Health: impact deltas plus the first matching bonus per object
+    impacts = np.asarray(impacts, dtype=object)
+    deltas = np.where(impacts == "positive", 15, np.where(impacts == "negative", -20, 0)).astype(float)
+    deltas += _select(settings["health_rules"], masks, [float(rule.amount) for rule in settings["health_rules"]])
+    health = 60 + np.bincount(owners, weights=deltas, minlength=count)
+
+    if settings["summary_bonuses"]:
+        summary = pd.Series(summaries, dtype=object)
+        co2 += np.where(summary.str.contains(REFORESTATION_PATTERN), 20.0, 0.0)
+        mature = summary.str.contains(MATURE_PATTERN).to_numpy()
+        young = summary.str.contains(YOUNG_PATTERN).to_numpy()
+        co2 += np.where(mature, 8.0, np.where(young, 12.0, 0.0))
+        health += np.select([forest_objects >= 3, forest_objects >= 2], [20, 15], default=0)
+        health += np.where(summary.str.contains(HEALTH_REFORESTATION_PATTERN), 30, 0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        percentage = np.where(total_objects > 0, (living_count / total_objects) * 100, np.nan)
+
+    return pd.DataFrame({
+        "co2_impact": co2,
+        "health_score": np.clip(health, 0, 100).astype(int),
+        "living_count": living_count,
+        "total_objects": total_objects,
+        "biodiversity": percentage,
+        "forest_objects": forest_objects,
+    })
@@ -0,0 +1,158 @@
+"""Per-session state helpers for the Streamlit front-ends."""
+
+import hashlib
+import os
+import threading
+from collections import deque
+
+from . import config
+from .charts import build_objects_view, objects_key
+from .conversation import ConversationState
+from .governor import default_governor
+from .imaging import ingest_image, prepare_image
+from .usage import UsageLedger, default_usage
+
+
+def upload_key(uploaded_file):
+    """Stable identity for a Streamlit upload or camera capture"""
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id:
+        return file_id
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+
+class EncodedImageStore:
+    """Holds the image currently attached to a session, as compact bytes only.
+
+    An upload is ingested once: it is decoded at working resolution and kept
+    as JPEG bytes plus a preview. The API payload is also prepared once. Both
+    are reused for every follow-up question and Streamlit rerun, and a
+    different key replaces them. Together they stay under `max_bytes`. No
+    decoded PIL image is kept. Under memory pressure the memory governor may
+    spill the working copy to disk, from any thread. For an idle session it
+    also spills the preview and drops the payload, which the next ingest and
+    get restore.
+    """
+
+    def __init__(self, max_bytes=config.SESSION_IMAGE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.key = None
+        self.ingested = None
+        self.prepared = None
+        self.ingests = 0
+        self.encodes = 0
+        self.reuses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """Bytes held: working copy, preview and API payload"""
+        return ((self.ingested.nbytes if self.ingested is not None else 0)
+                + (len(self.prepared.base64) if self.prepared is not None else 0))
+
+    def ingest(self, key, source):
+        """Return the IngestedImage for key, decoding the upload only if it changed"""
+        with self._lock:
+            if key == self.key and self.ingested is not None:
+                self.ingested.load_preview()
+                return self.ingested
+            self._release()
+            # Leave room for the API payload, which is base64 of at most IMAGE_BYTE_BUDGET bytes
+            payload_budget = -(-config.IMAGE_BYTE_BUDGET * 4 // 3)
+            self.ingested = ingest_image(source, max_bytes=self.max_bytes - payload_budget)
+            self.key = key
+            self.ingests += 1
+            return self.ingested
+
+    def get(self, key, image=None):
+        """Return the PreparedImage for key, encoding only if the image changed.
+
+        Without `image`, the payload is prepared from the ingested working copy.
+        """
+        with self._lock:
+            if key == self.key and self.prepared is not None:
+                self.reuses += 1
+                return self.prepared
+            if image is None:
+                if key != self.key or self.ingested is None:
+                    raise KeyError(key)
+                image = self.ingested.image()
+            elif key != self.key:
+                self._release()
+            self.prepared = prepare_image(image)
+            self.key = key
+            self.encodes += 1
+            return self.prepared
+
+    def spill(self, path, idle=False):
+        """Move the working copy to `path`; returns the bytes freed.
+
+        With `idle`, the preview goes to disk too and the payload is dropped.
+        """
+        with self._lock:
+            if self.ingested is None:
+                return 0
+            freed = self.ingested.spill(path, preview=idle)
+            if idle and self.prepared is not None:
+                freed += len(self.prepared.base64)
+                self.prepared = None
+            return freed
+
+    def clear(self):
+        """Release the image (removed, replaced or chat cleared)"""
+        with self._lock:
+            self._release()
+
+    def _release(self):
+        if self.ingested is not None and self.ingested.path:
+            for path in (self.ingested.path, self.ingested.path + ".preview"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        self.key = None
+        self.ingested = None
+        self.prepared = None
+
+
+def encoded_image_store(session_state):
+    """The session's EncodedImageStore, created on first use"""
+    if "encoded_image_store" not in session_state:
+        session_state["encoded_image_store"] = EncodedImageStore()
+    return session_state["encoded_image_store"]
+
+
+def conversation_state(session_state):
+    """The session's ConversationState for multi-turn Q&A, created on first use"""
+    if "conversation_state" not in session_state:
+        session_state["conversation_state"] = ConversationState()
+    return session_state["conversation_state"]
+
+
+def debug_events(session_state):
+    """The session's recent engine events (event, message) for the opt-in debug panel"""
+    if "debug_events" not in session_state:
+        session_state["debug_events"] = deque(maxlen=config.DEBUG_MAX_EVENTS)
+    return session_state["debug_events"]
+
+
+def session_memory(session_state):
+    """The session's SessionMemory, created on first use and tracked by the process-wide governor"""
+    return default_governor().track(session_state)
+
+
+def objects_view(session_state, objects):
+    """ObjectsView for the analysis on screen; built once and reused until a different analysis is shown"""
+    key = objects_key(objects)
+    cached = session_state.get("objects_view")
+    if cached is None or cached[0] != key:
+        cached = (key, build_objects_view(objects))
+        session_state["objects_view"] = cached
+    return cached[1]
+
+
+def usage_ledger(session_state):
+    """The session's UsageLedger, created on first use; it also feeds the process-wide ledger"""
+    if "usage_ledger" not in session_state:
+        session_state["usage_ledger"] = UsageLedger(parent=default_usage())
+    return session_state["usage_ledger"]
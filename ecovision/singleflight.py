@@ -0,0 +1,79 @@
+"""Process-wide coalescing of identical in-flight requests.
+
+The first caller for a key becomes the leader and does the work. Callers that
+arrive with the same key while it is running wait for the leader and receive
+its result, or its exception, instead of issuing their own request.
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def begin(self, key):
+        """Return (call, is_leader); the leader must later call finish() exactly once"""
+        with self._lock:
+            self.calls += 1
+            call = self._inflight.get(key)
+            if call is not None:
+                self.coalesced += 1
+                return call, False
+            call = self._inflight[key] = _Call()
+            return call, True
+
+    def finish(self, key, call, result=None, error=None):
+        """Publish the leader's outcome to every waiter and retire the key"""
+        with self._lock:
+            if self._inflight.get(key) is call:
+                del self._inflight[key]
+        call.result = result
+        call.error = error
+        call.done.set()
+
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers with this key; returns (result, shared)"""
+        call, is_leader = self.begin(key)
+        if not is_leader:
+            return call.wait(), True
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result=result)
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._inflight)}
+
+
+_default_singleflight = None
+_default_singleflight_lock = threading.Lock()
+
+
+def default_singleflight():
+    """Process-wide instance shared by every Streamlit session"""
+    global _default_singleflight
+    with _default_singleflight_lock:
+        if _default_singleflight is None:
+            _default_singleflight = SingleFlight()
+        return _default_singleflight
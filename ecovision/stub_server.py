@@ -0,0 +1,308 @@
+"""Local stand-in for the OpenAI chat.completions endpoint, for offline runs and benchmarks.
+
+    python -m ecovision.stub_server --port 8765 --latency 0.8 --jitter 0.2 --error-rate 0.05
+    python -m ecovision.stub_server --error-rate 0.3 --error-status 429 --retry-after 1
+    python -m ecovision.stub_server --latency 0.3 --token-latency 0.01
+    OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=stub streamlit run app.py
+
+Requests get a canned comprehensive analysis (or the JSON file given with
+--response) after the configured latency, plus --token-latency per completion
+token, trimmed to the requested JSON schema; questions about an image (requests
+with a system prompt) get a canned answer. `stream: true` requests are answered
+with server-sent events, ending with a usage chunk when the request sets
+stream_options.include_usage. Nothing is validated beyond what the apps send.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Tokens billed for a 1024×768 high-detail image: 4 tiles × 170 + 85
+STUB_IMAGE_TOKENS = 765
+
+CANNED_ANALYSIS = {
+    "summary": "A mixed forest edge meets a shoreline with scattered plastic waste near the waterline.",
+    "objects_detected": [
+        {"name": "Mature tree canopy", "type": "living", "confidence": 0.93, "environmental_impact": "positive",
+         "sustainability_score": 9, "description": "Dense broadleaf canopy along the slope",
+         "recommended_action": "Protect from clearing"},
+        {"name": "Ocean water", "type": "natural", "confidence": 0.9, "environmental_impact": "positive",
+         "sustainability_score": 8, "description": "Open coastal water",
+         "recommended_action": "Monitor water quality"},
+        {"name": "Plastic bottles", "type": "waste", "confidence": 0.86, "environmental_impact": "negative",
+         "sustainability_score": 2, "description": "Bottles washed up on the shore",
+         "recommended_action": "Organize a beach clean-up"},
+        {"name": "Ferns and undergrowth", "type": "living", "confidence": 0.8, "environmental_impact": "positive",
+         "sustainability_score": 8, "description": "Ground cover beneath the trees",
+         "recommended_action": "Avoid trampling"},
+    ],
+    "overall_analysis": {
+        "environmental_health_score": 6.5,
+        "biodiversity_level": "medium",
+        "key_concerns": ["Plastic pollution on the shoreline"],
+        "positive_aspects": ["Healthy forest canopy", "Intact undergrowth"],
+        "recommendations": ["Remove shoreline waste", "Install collection bins"],
+    },
+}
+
+CANNED_ANSWER = ("The image shows a healthy forest edge next to open water. The main environmental "
+                 "concern is plastic waste along the shoreline, which can harm marine life; a local "
+                 "clean-up and bins at access points would help.")
+
+
+def project(data, schema):
+    """Keep only the object properties `schema` declares, recursively"""
+    if isinstance(data, dict) and "properties" in schema:
+        return {key: project(value, schema["properties"][key])
+                for key, value in data.items() if key in schema["properties"]}
+    if isinstance(data, list) and "items" in schema:
+        return [project(item, schema["items"]) for item in data]
+    return data
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            request = json.loads(body or b"{}")
+        except json.JSONDecodeError:
+            request = {}
+
+        delay, failed = stub.plan_request()
+        time.sleep(delay)
+        if failed:
+            payload = json.dumps({"error": {"message": "Stub server injected error", "type": "server_error"}})
+            headers = {"Retry-After": str(stub.retry_after)} if stub.retry_after is not None else {}
+            sent = self._send(stub.error_status, "application/json", payload.encode("utf-8"), headers)
+        elif request.get("stream"):
+            sent, paced = self._stream(stub, request)
+            delay += paced
+        else:
+            completion = stub.completion(request)
+            # Generation time grows with the length of the answer
+            generation = stub.token_latency * completion["usage"]["completion_tokens"]
+            time.sleep(generation)
+            delay += generation
+            payload = json.dumps(completion).encode("utf-8")
+            sent = self._send(200, "application/json", payload)
+        stub.record(len(body), sent, failed, delay)
+
+    def _send(self, status, content_type, payload, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+        return len(payload)
+
+    def _stream(self, stub, request):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        sent = 0
+        paced = 0.0
+        for chunk in stub.chunks(request):
+            event = f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+            self.wfile.write(event)
+            self.wfile.flush()
+            sent += len(event)
+            time.sleep(stub.chunk_interval)
+            paced += stub.chunk_interval
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        return sent + 14, paced
+
+
+class StubServer:
+    """OpenAI-compatible chat.completions stub with injectable latency, jitter and errors.
+
+    Counters (`requests`, `errors`, `bytes_received`, `bytes_sent`,
+    `delay_total`) let a benchmark report exactly what the client put on the
+    wire and how much of its latency was injected.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_status=500, retry_after=None, response=None, answer=CANNED_ANSWER, chunk_words=3,
+                 chunk_interval=0.02, token_latency=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.response = response if response is not None else CANNED_ANALYSIS
+        self.answer = answer
+        self.chunk_words = chunk_words
+        self.chunk_interval = chunk_interval
+        self.token_latency = token_latency
+        self.requests = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.delay_total = 0.0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def plan_request(self):
+        """Delay and failure decision for one request"""
+        with self._lock:
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            return delay, self._random.random() < self.error_rate
+
+    def record(self, received, sent, failed, delay=0.0):
+        with self._lock:
+            self.requests += 1
+            self.delay_total += delay
+            self.errors += bool(failed)
+            self.bytes_received += received
+            self.bytes_sent += sent
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.errors = self.bytes_received = self.bytes_sent = 0
+            self.delay_total = 0.0
+
+    def content_for(self, request):
+        """Canned answer text for questions, canned analysis JSON otherwise.
+
+        With a json_schema response_format the analysis is trimmed to the
+        properties that schema asks for, as a schema-constrained model would.
+        """
+        messages = request.get("messages", [])
+        if any(message.get("role") == "system" for message in messages):
+            return self.answer
+        schema = ((request.get("response_format") or {}).get("json_schema") or {}).get("schema")
+        return json.dumps(project(self.response, schema) if schema else self.response, indent=2)
+
+    def completion(self, request):
+        content = self.content_for(request)
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": self._usage(request, content),
+        }
+
+    def chunks(self, request):
+        words = self.content_for(request).split(" ")
+        for i in range(0, len(words), self.chunk_words):
+            text = " ".join(words[i:i + self.chunk_words])
+            yield {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"content": text if i == 0 else " " + text},
+                    "finish_reason": None,
+                }],
+            }
+        if (request.get("stream_options") or {}).get("include_usage"):
+            yield {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [],
+                "usage": self._usage(request, " ".join(words)),
+            }
+
+    @staticmethod
+    def _usage(request, content):
+        # Rough four-characters-per-token estimate for text; images are not
+        # decoded and count as one 1024×768 high-detail image
+        prompt_chars = 0
+        image_tokens = 0
+        for message in request.get("messages", []):
+            parts = message.get("content", "")
+            if isinstance(parts, str):
+                parts = [{"type": "text", "text": parts}]
+            for part in parts:
+                if part.get("type") == "image_url":
+                    image_tokens += STUB_IMAGE_TOKENS
+                else:
+                    prompt_chars += len(part.get("text", ""))
+        prompt_tokens = prompt_chars // 4 + image_tokens
+        completion_tokens = len(content) // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m ecovision.stub_server",
+                                     description="Local OpenAI-compatible chat.completions stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Base response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Uniform ± jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status for injected failures")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with injected failures")
+    parser.add_argument("--token-latency", type=float, default=0.0,
+                        help="Extra seconds per completion token for non-streamed responses")
+    parser.add_argument("--response", help="JSON file returned as the analysis result")
+    args = parser.parse_args(argv)
+
+    response = None
+    if args.response:
+        with open(args.response, encoding="utf-8") as f:
+            response = json.load(f)
+    server = StubServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                        args.error_status, args.retry_after, response, token_latency=args.token_latency)
+    print(f"Stub OpenAI endpoint listening on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Prompt template registry: one prompt, response schema and token ceiling per analysis type.
+
+Comprehensive analysis keeps the full prompt and schema. The narrower modes
+ask only for the fields they need, so the model writes less JSON and answers
+sooner; the fields they leave out are filled with neutral defaults when the
+response is parsed.
+"""
+
+from dataclasses import dataclass
+
+from .prompts import ANALYSIS_PROMPT, BIODIVERSITY_PROMPT, WASTE_PROMPT
+from .schema import ANALYSIS_RESPONSE_FORMAT, response_format, subset_schema
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    mode: str
+    label: str
+    prompt: str
+    response_format: dict
+    max_tokens: int
+    subset: bool = False
+
+
+TEMPLATES = {
+    "comprehensive": PromptTemplate(
+        mode="comprehensive",
+        label="🔍 Comprehensive Analysis",
+        prompt=ANALYSIS_PROMPT,
+        response_format=ANALYSIS_RESPONSE_FORMAT,
+        max_tokens=1500,
+    ),
+    "waste_detection": PromptTemplate(
+        mode="waste_detection",
+        label="♻️ Waste & Recycling",
+        prompt=WASTE_PROMPT,
+        response_format=response_format("waste_analysis", subset_schema(
+            ["name", "type", "confidence", "environmental_impact", "sustainability_score", "recommended_action"],
+            ["environmental_health_score", "key_concerns", "recommendations"])),
+        max_tokens=700,
+        subset=True,
+    ),
+    "biodiversity": PromptTemplate(
+        mode="biodiversity",
+        label="🦋 Biodiversity Assessment",
+        prompt=BIODIVERSITY_PROMPT,
+        response_format=response_format("biodiversity_analysis", subset_schema(
+            ["name", "type", "confidence", "environmental_impact", "sustainability_score", "description"],
+            ["environmental_health_score", "biodiversity_level", "key_concerns", "positive_aspects",
+             "recommendations"])),
+        max_tokens=900,
+        subset=True,
+    ),
+}
+
+ANALYSIS_MODES = list(TEMPLATES)
+
+
+def get_template(mode, templates=TEMPLATES):
+    """Template for an analysis type; unknown types fall back to comprehensive"""
+    return templates.get(mode, templates["comprehensive"])
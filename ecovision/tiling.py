@@ -0,0 +1,156 @@
+"""Merging tile analyses of large aerial and drone images into one result.
+
+A single request squeezes the whole image into the model's 2048×768 budget,
+so small waste items and saplings in an orthomosaic disappear.
+EcoVisionAI.analyze_tiled splits the image into overlapping tiles at the
+model's native resolution and analyzes them on a worker pool. merge_tiles
+then builds one result shaped like analyze_image_with_ai's.
+
+The model reports no coordinates, so an object's location is the box of the
+tile it was seen in. A detection with the same name in an overlapping tile is
+taken to be the same object seen across a seam, and the two are merged. The
+merged object keeps the most confident detection, plus two added fields:
+"location", the union of the tiles' boxes, and "tile_count".
+"""
+
+from collections import Counter
+
+from . import config
+from .imaging import tile_grid
+
+OVERALL_LISTS = ("key_concerns", "positive_aspects", "recommendations")
+MAX_LIST_ITEMS = 8
+MAX_SUMMARIES = 3
+
+
+def fit_tile_size(size, tile_size=config.TILED_TILE_SIZE, overlap=config.TILED_OVERLAP,
+                  max_tiles=config.TILED_MAX_TILES):
+    """Smallest tile size from `tile_size` up whose grid over `size` has at most `max_tiles` tiles"""
+    while len(tile_grid(size, tile_size, overlap)) > max(1, max_tiles):
+        tile_size = int(tile_size * 1.25) + 1
+    return tile_size
+
+
+def tile_status(item):
+    """"ok", "skipped" (turned away by the local pre-screen) or "failed" for a tile's BatchResult"""
+    if not item.error:
+        return "ok"
+    if ((item.result or {}).get("local_metrics") or {}).get("verdict") == "rejected":
+        return "skipped"
+    return "failed"
+
+
+def tile_row(item):
+    """Per-tile report entry: box, outcome, latency and objects found"""
+    return {
+        "box": list(item.name),
+        "status": tile_status(item),
+        "latency_s": round(item.latency, 3),
+        "objects": len((item.result or {}).get("objects_detected", [])) if not item.error else 0,
+        "error": item.error,
+    }
+
+
+def _overlaps(a, b):
+    return min(a[2], b[2]) > max(a[0], b[0]) and min(a[3], b[3]) > max(a[1], b[1])
+
+
+def _union(a, b):
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _confidence(obj):
+    try:
+        return float(obj.get("confidence") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def merge_objects(items):
+    """objects_detected across tiles, with same-named detections from overlapping tiles merged"""
+    merged = []
+    by_name = {}
+    for item in items:
+        box = item.name
+        merged_here = set()
+        for obj in item.result.get("objects_detected", []):
+            name = " ".join(str(obj.get("name", "")).lower().split())
+            # Only the first tile's box anchors a match, so a name seen everywhere is not chained into one object
+            candidates = (i for i in by_name.get(name, []) if i not in merged_here)
+            match = next((i for i in candidates if _overlaps(merged[i]["anchor"], box)), None)
+            if match is None:
+                match = len(merged)
+                merged.append({"anchor": box, "location": box, "tile_count": 0, "object": obj})
+                by_name.setdefault(name, []).append(match)
+            entry = merged[match]
+            entry["location"] = _union(entry["location"], box)
+            entry["tile_count"] += 1
+            if _confidence(obj) > _confidence(entry["object"]):
+                entry["object"] = obj
+            merged_here.add(match)
+    return [{**entry["object"], "location": list(entry["location"]), "tile_count": entry["tile_count"]}
+            for entry in merged]
+
+
+def _unique(values):
+    seen = set()
+    unique = []
+    for value in values:
+        key = " ".join(str(value).lower().split())
+        if key not in seen:
+            seen.add(key)
+            unique.append(value)
+    return unique
+
+
+def merge_overall(results):
+    """Mean health score, most common biodiversity level and de-duplicated lists across tiles"""
+    overalls = [result["overall_analysis"] for result in results if isinstance(result.get("overall_analysis"), dict)]
+    if not overalls:
+        return None
+    merged = {}
+    scores = [overall["environmental_health_score"] for overall in overalls
+              if isinstance(overall.get("environmental_health_score"), (int, float))]
+    if scores:
+        merged["environmental_health_score"] = round(sum(scores) / len(scores), 1)
+    levels = [overall["biodiversity_level"] for overall in overalls if overall.get("biodiversity_level")]
+    if levels:
+        merged["biodiversity_level"] = Counter(levels).most_common(1)[0][0]
+    for name in OVERALL_LISTS:
+        if any(name in overall for overall in overalls):
+            merged[name] = _unique(value for overall in overalls for value in overall.get(name, []))[:MAX_LIST_ITEMS]
+    return merged
+
+
+def merge_tiles(items, wall_seconds, **settings):
+    """One analyze_image_with_ai-shaped result from the tiles' BatchResults (named by box).
+
+    The "tiling" entry holds the settings, per-tile rows, the wall time and
+    the sum of tile latencies, i.e. what analyzing them one by one would take.
+    """
+    items = sorted(items, key=lambda item: (item.name[1], item.name[0]))
+    sequential_seconds = sum(item.latency for item in items)
+    tiling = {
+        "tiles": len(items),
+        **settings,
+        "wall_seconds": round(wall_seconds, 3),
+        "sequential_seconds": round(sequential_seconds, 3),
+        "speedup": round(sequential_seconds / wall_seconds, 2) if wall_seconds > 0 else None,
+        "per_tile": [tile_row(item) for item in items],
+    }
+    analyzed = [item for item in items if tile_status(item) == "ok"]
+    if not analyzed:
+        error = next((item.error for item in items if item.error), "no tiles")
+        return {"error": f"Tiled analysis failed: {error}", "summary": "No tile could be analyzed", "tiling": tiling}
+
+    results = [item.result for item in analyzed]
+    ranked = sorted(results, key=lambda result: len(result.get("objects_detected", [])), reverse=True)
+    merged = {
+        "summary": " ".join(_unique(result["summary"] for result in ranked if result.get("summary"))[:MAX_SUMMARIES]),
+        "objects_detected": merge_objects(analyzed),
+    }
+    overall = merge_overall(results)
+    if overall is not None:
+        merged["overall_analysis"] = overall
+    merged["tiling"] = tiling
+    return merged
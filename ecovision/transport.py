@@ -0,0 +1,208 @@
+"""Retry, backoff and circuit breaking around OpenAI calls.
+
+Every request goes through one process-wide Transport, so all sessions and
+batch workers share one view of upstream health. Transient failures (429,
+5xx, timeouts, dropped connections) are retried with full-jitter exponential
+backoff, and a Retry-After header from the server takes precedence. After
+repeated failures the circuit opens and calls fail fast until a trial request
+succeeds. A per-call deadline bounds the total time including retries.
+"""
+
+import email.utils
+import random
+import threading
+import time
+
+import openai
+
+from . import config
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+    def __init__(self, retry_in):
+        if retry_in > 0:
+            message = f"OpenAI is currently failing; not retrying for another {retry_in:.0f}s"
+        else:
+            message = "OpenAI is recovering; waiting on a trial request"
+        super().__init__(message)
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed → open after `failure_threshold` consecutive failures → half-open after `reset_timeout`.
+
+    Half-open lets one trial call through. Success closes the circuit and
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+                 reset_timeout=config.BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        with self._lock:
+            if self.state == "open":
+                elapsed = self.clock() - self.opened_at
+                if elapsed < self.reset_timeout:
+                    raise CircuitOpenError(self.reset_timeout - elapsed)
+                self.state = "half_open"
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    raise CircuitOpenError(0)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """End a call that says nothing about upstream health; a half-open circuit lets the next call try"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = self.clock()
+
+    def retry_in(self):
+        """Seconds until an open circuit lets a trial call through (0 when not open)"""
+        with self._lock:
+            if self.state != "open":
+                return 0.0
+            return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in RETRYABLE_STATUS
+
+
+def retry_after_seconds(error):
+    """Server-requested wait from retry-after-ms / Retry-After headers, or None"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        retry_after = headers.get("retry-after")
+        if retry_after is None:
+            return None
+        try:
+            return float(retry_after)
+        except ValueError:
+            return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Transport:
+    """Runs API calls with retries, jittered backoff, a circuit breaker and a deadline.
+
+    A call is attempted at most 1 + `max_retries` times.
+
+    Counters (`calls`, `retries`, `failures`, `short_circuited`) feed the
+    debug sidebar.
+    """
+
+    def __init__(self, breaker=None, max_retries=config.RETRY_MAX_RETRIES, base_delay=config.RETRY_BASE_DELAY,
+                 max_delay=config.RETRY_MAX_DELAY, deadline=config.REQUEST_DEADLINE_SECONDS,
+                 sleep=time.sleep, clock=time.monotonic, rng=None):
+        self.breaker = breaker if breaker is not None else CircuitBreaker(clock=clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.sleep = sleep
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def backoff(self, attempt, error=None):
+        """Delay before retry number `attempt` (0-based): Retry-After if given, else full jitter"""
+        retry_after = retry_after_seconds(error) if error is not None else None
+        if retry_after is not None:
+            return retry_after
+        return self.rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn, *args, **kwargs):
+        """Call fn(*args, **kwargs), retrying transient OpenAI errors"""
+        self._count("calls")
+        give_up_at = self.clock() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self._count("short_circuited")
+                raise
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # The request was bad, not the upstream; it neither opens nor closes the circuit
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+                self._count("failures")
+                delay = self.backoff(attempt, e)
+                if attempt >= self.max_retries or self.clock() + delay >= give_up_at:
+                    raise
+                attempt += 1
+                self._count("retries")
+                self.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "short_circuited": self.short_circuited,
+                "circuit": self.breaker.state,
+                "retry_in": self.breaker.retry_in(),
+            }
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def default_transport():
+    """Process-wide transport, so the circuit breaker sees every session's calls"""
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = Transport()
+        return _default_transport
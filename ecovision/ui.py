@@ -0,0 +1,472 @@
+"""Streamlit glue shared by the EcoVision AI front-ends.
+
+Everything that touches `st` lives here or in the app scripts; the rest of the
+package stays importable without Streamlit.
+"""
+
+import copy
+import os
+import time
+from datetime import datetime
+
+import streamlit as st
+
+from . import config
+from .batch import RateLimiter, list_images, run_batch
+from .conversation import build_context
+from .engine import StreamedAnswer
+from .governor import default_governor
+from .imaging import ImageTooLargeError
+from .jobs import default_job_queue
+from .lazy import lazy_import
+from .logs import plain
+from .scoring import DETAILED, analysis_metrics
+from .session import conversation_state, debug_events, encoded_image_store, session_memory, upload_key
+
+pd = lazy_import("pandas")
+
+
+def streamlit_reporter(event, message):
+    """Keep engine events for the debug panel; only errors are rendered in the page"""
+    debug_events(st.session_state).append((event, message))
+    if event == "encode_error":
+        st.error(message)
+
+
+def errors_only_reporter(event, message):
+    """Render only engine errors, for the chat-style front-end"""
+    if event == "encode_error":
+        st.error(message)
+
+
+def ingest_upload(uploaded_file):
+    """The session's compact copy of an upload or camera capture, decoded once per file; None if unreadable"""
+    try:
+        return encoded_image_store(st.session_state).ingest(upload_key(uploaded_file), uploaded_file)
+    except ImageTooLargeError as e:
+        st.error(f"❌ Image too large: {e}")
+    except Exception as e:
+        st.error(f"❌ Could not read image: {e}")
+    return None
+
+
+def encode_upload(uploaded_file, image=None):
+    """Encode an uploaded image once per session and reuse it across reruns and questions.
+
+    Without `image`, the upload's ingested working copy is encoded.
+    """
+    try:
+        return encoded_image_store(st.session_state).get(upload_key(uploaded_file), image).base64
+    except Exception as e:
+        st.error(f"❌ Error encoding image: {e}")
+        return None
+
+
+def submit_analysis(eco_ai, image, analysis_mode, key="analysis", tiled=False):
+    """Queue an analysis (tiled if asked) on the background pool; only the job id goes into st.session_state"""
+    image.load()  # read the pixels now, the upload buffer may be gone when the worker starts
+
+    def run(job):
+        # Same cache, transport and stats, but progress goes to the job log: st calls are not allowed off the script thread
+        engine = copy.copy(eco_ai)
+        engine.reporter = job.log
+        if tiled:
+            return engine.analyze_tiled(image, analysis_mode)
+        return engine.analyze_image_with_ai(image, analysis_mode)
+
+    previous = st.session_state.get(f"{key}_job")
+    if previous:
+        default_job_queue().cancel(previous)
+    st.session_state.pop("current_analysis", None)
+    debug_events(st.session_state).clear()
+    label = f"{analysis_mode} (tiled)" if tiled else analysis_mode
+    st.session_state[f"{key}_job"] = default_job_queue().submit(run, label=label).id
+
+
+def analysis_pending(key="analysis"):
+    return f"{key}_job" in st.session_state
+
+
+def poll_analysis(key="analysis"):
+    """Show a running analysis job and move its result into current_analysis when it finishes.
+
+    Polls in a fragment so only that block reruns; the full page reruns once,
+    when the result arrives. The fragment is rendered only while a job is
+    pending: a run without it stops the timer, so idle sessions never poll.
+    """
+    if analysis_pending(key):
+        _poll_analysis_fragment(key)
+
+
+@st.fragment(run_every=config.JOB_POLL_SECONDS)
+def _poll_analysis_fragment(key):
+    job_id = st.session_state.get(f"{key}_job")
+    if job_id is None:
+        # Finished or cancelled since the last full run, which will stop this timer
+        st.rerun()
+    queue = default_job_queue()
+    job = queue.get(job_id)
+    if job is None or job.done:
+        del st.session_state[f"{key}_job"]
+        if job is not None:
+            debug_events(st.session_state).extend(job.events)
+        if job is not None and job.status == "done":
+            st.session_state.current_analysis = job.result
+            st.session_state.analysis_count += 1
+        elif job is not None and job.status == "failed":
+            st.session_state.current_analysis = {"error": f"AI analysis failed: {job.error}",
+                                                 "summary": "Analysis failed"}
+        st.rerun()
+
+    state = "⏳ Queued" if job.status == "queued" else "🤖 AI is analyzing the environment..."
+    progress = [message for event, message in job.events if event != "raw_response"]
+    st.info(f"{state} ({job.elapsed:.0f}s)" + (f" • {plain(progress[-1])}" if progress else ""))
+    if st.button("✖️ Cancel Analysis", key=f"{key}_cancel"):
+        queue.cancel(job_id)
+        del st.session_state[f"{key}_job"]
+        st.rerun()
+
+
+def stream_chat_answer(eco_ai, question, base64_image):
+    """Render an answer into an AI chat bubble as tokens arrive; returns the StreamedAnswer.
+
+    The question must already be the last entry of st.session_state.chat_history;
+    earlier exchanges about the same image go along as token-budgeted context.
+    """
+    history = st.session_state.chat_history[:-1]
+    conversation = conversation_state(st.session_state)
+    conversation.follow(encoded_image_store(st.session_state).key, history)
+    context, usage = build_context(eco_ai, conversation, history)
+
+    answer = StreamedAnswer()
+    st.markdown('<div class="ai-message"><div class="message-header">🤖 EcoVision AI • typing...</div></div>',
+                unsafe_allow_html=True)
+    st.write_stream(eco_ai.stream_answer(None, question, base64_image=base64_image, answer=answer, context=context))
+
+    usage.prompt_tokens = answer.prompt_tokens
+    usage.cached_tokens = answer.cached_tokens
+    usage.completion_tokens = answer.completion_tokens
+    conversation.usage.append(usage)
+    return answer
+
+
+def answer_timing(message):
+    """Header suffix with the latency recorded for a chat message, if any"""
+    if message.get("time_to_first_token") is None:
+        return ""
+    return f" • ⚡ {message['time_to_first_token']:.2f}s first token, {message['total_latency']:.2f}s total"
+
+
+def answer_tokens(message):
+    """Header suffix with the prompt tokens a chat answer cost, if the API reported them"""
+    if message.get("prompt_tokens") is None:
+        return ""
+    return f" • 🧾 {message['prompt_tokens']:,} prompt tokens ({message.get('cached_tokens') or 0:,} cached)"
+
+
+def debug_toggle():
+    """Sidebar switch for the debug panel, defaulting to config.DEBUG_PANEL"""
+    return st.toggle("🔧 Show debug panel", value=config.DEBUG_PANEL, key="debug_panel",
+                     help="Engine events and the raw analysis, rendered once below the results")
+
+
+def render_debug_panel(analysis=None):
+    """The session's engine events and the analysis JSON in one collapsed expander, if enabled"""
+    if not st.session_state.get("debug_panel", config.DEBUG_PANEL):
+        return
+    with st.expander("🔧 Debug Panel"):
+        events = debug_events(st.session_state)
+        st.code("\n".join(f"[{event}] {plain(message)}" for event, message in events) or "No engine events yet",
+                language=None)
+        if analysis is not None:
+            st.json(analysis, expanded=False)
+
+
+def render_usage(ledger):
+    """Session and server-wide API usage for the sidebar, with CSV and Prometheus downloads"""
+    session = ledger.totals()
+    server = ledger.parent.totals() if ledger.parent is not None else session
+    st.info(f"API Usage: {session['calls']} calls • {session['prompt_tokens']:,} in / "
+            f"{session['completion_tokens']:,} out tokens • ~${session['cost']:.4f} this session "
+            f"(~${server['cost']:.2f} server-wide)")
+    if session["calls"]:
+        st.caption(f"Per call: encode {session['avg_encode_seconds'] * 1000:.0f}ms • "
+                   f"network {session['avg_network_seconds']:.2f}s • parse {session['avg_parse_seconds'] * 1000:.1f}ms • "
+                   f"{session['image_bytes'] / session['calls'] / 1024:.0f} KB image"
+                   + (f" • {session['errors']} failed" if session["errors"] else ""))
+    with st.expander("📊 Export Usage"):
+        st.download_button("⬇️ Session Calls (CSV)", ledger.to_csv(), file_name="ecovision_usage.csv",
+                           mime="text/csv")
+        st.download_button("⬇️ Server Totals (Prometheus)", (ledger.parent or ledger).to_prometheus(),
+                           file_name="ecovision_usage.prom", mime="text/plain")
+
+
+def govern_session():
+    """End of a script run: measure this session's state and evict under memory pressure"""
+    default_governor().govern(st.session_state)
+
+
+def render_memory():
+    """Session-state memory of this session and the whole server, as of the last run, for the debug sidebar"""
+    memory = session_memory(st.session_state)
+    stats = default_governor().stats()
+    mb = 1024 * 1024
+    st.info(f"Session Memory: {memory.bytes / mb:.1f} MB this session • {stats['bytes'] / mb:.0f} MB across "
+            f"{stats['sessions']} sessions (limit {stats['process_max_bytes'] / mb:.0f} MB)")
+    largest = sorted(memory.by_key.items(), key=lambda item: item[1], reverse=True)[:3]
+    evicted = ", ".join(f"{count} {kind.replace('_', ' ')}" for kind, count in stats["evictions"].items())
+    st.caption("Largest: " + " • ".join(f"{key} {size / 1024:.0f} KB" for key, size in largest)
+               + (f" • Evicted server-wide: {evicted}" if evicted else ""))
+
+
+def render_engine_stats(eco_ai):
+    """Cache, coalescing, job, parse, pre-screen and upstream counters for the debug sidebar"""
+    cache_stats = eco_ai.cache.stats()
+    st.info(f"Analysis Cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses • "
+            f"{cache_stats['entries']} entries ({cache_stats['bytes_stored'] / 1024:.1f} KB stored)")
+    near_duplicate_stats = eco_ai.near_duplicates.stats()
+    if near_duplicate_stats["hits"]:
+        st.info(f"Near-Duplicates: {near_duplicate_stats['hits']} analyses reused • "
+                f"{near_duplicate_stats['entries']} images indexed")
+    flight_stats = eco_ai.singleflight.stats()
+    if flight_stats["coalesced"]:
+        st.info(f"Coalesced Requests: {flight_stats['coalesced']} of {flight_stats['calls']} shared an in-flight call")
+    job_stats = default_job_queue().stats()
+    if job_stats["queued"] + job_stats["running"]:
+        st.info(f"Background Jobs: {job_stats['running']} running • {job_stats['queued']} queued")
+
+    # Structured-output parse outcomes
+    parse_stats = eco_ai.parse_stats.snapshot()
+    if parse_stats["parsed"] + parse_stats["repaired"] + parse_stats["failed"]:
+        st.info(f"Response Parsing: {parse_stats['success_rate']:.0%} usable • "
+                f"{parse_stats['repaired']} repaired • {parse_stats['failed']} failed")
+
+    # API calls and image tokens the local pre-screen avoided
+    prescreen_stats = eco_ai.prescreen_stats.snapshot()
+    if prescreen_stats["screened"]:
+        st.info(f"Pre-screen: {prescreen_stats['api_calls_saved']} API calls saved • "
+                f"{prescreen_stats['low_detail']} low detail (~{prescreen_stats['image_tokens_saved']:,} "
+                f"image tokens saved)")
+
+    # Upstream health as seen by the shared transport
+    transport_stats = eco_ai.transport.stats()
+    if transport_stats["circuit"] == "closed":
+        st.info(f"Upstream: ✅ Healthy • {transport_stats['retries']} retries")
+    else:
+        st.warning(f"Upstream: ⛔ Failing fast (circuit {transport_stats['circuit'].replace('_', '-')}, "
+                   f"retry in {transport_stats['retry_in']:.0f}s)")
+
+
+def render_archived_chat():
+    """Note above the chat when older messages were archived to free memory"""
+    archived = session_memory(st.session_state).archived_messages
+    if archived:
+        st.caption(f"🗄️ {archived} earlier messages were archived to free memory")
+
+
+def render_local_metrics(analysis):
+    """Pre-screen measurements attached to an analysis, in a collapsed expander"""
+    metrics = analysis.get("local_metrics")
+    if not metrics:
+        return
+    route = {"ok": "🔍 High detail", "low_detail": "🪶 Low detail", "rejected": "🚫 Not sent"}
+    with st.expander(f"🔬 Local Image Metrics • {route.get(metrics['verdict'], metrics['verdict'])}"):
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Sharpness", f"{metrics['sharpness']:.0f}", help="Laplacian variance at 512px")
+        col2.metric("Brightness", f"{metrics['brightness']:.0%}")
+        col3.metric("Vegetation", f"{metrics['vegetation_fraction']:.0%}", help="Pixels with excess green above 0.1")
+        col4.metric("Edge Density", f"{metrics['edge_density']:.1%}")
+        colors = ", ".join(f"{name} {fraction:.0%}" for name, fraction in metrics["dominant_colors"])
+        st.caption(f"Dominant colors: {colors}" + (f" • {metrics['reason']}" if metrics["reason"] else ""))
+
+
+def tiled_toggle(key="tiled_analysis"):
+    return st.toggle("🧩 Tiled analysis", key=key,
+                     help="For large aerial or drone images: analyze overlapping tiles concurrently and merge the "
+                          "objects found, so small items are not lost when the image is scaled down")
+
+
+def render_tiling(analysis):
+    """Per-tile latencies of a tiled analysis and its wall time vs. sequential, in a collapsed expander"""
+    tiling = analysis.get("tiling")
+    if not tiling:
+        return
+    speedup = f" ({tiling['speedup']:.1f}× faster)" if tiling.get("speedup") else ""
+    with st.expander(f"🧩 Tiled Analysis • {tiling['tiles']} tiles • {tiling['wall_seconds']:.1f}s"
+                     f" vs. {tiling['sequential_seconds']:.1f}s sequential{speedup}"):
+        st.caption(f"Tiles of up to {tiling['tile_size']}px overlapping by {tiling['overlap']}px, "
+                   f"{tiling['max_workers']} at a time. Sequential time is the sum of the tile latencies.")
+        st.dataframe(pd.DataFrame(tiling["per_tile"]), use_container_width=True, hide_index=True)
+
+
+def render_batch_results(rows):
+    """Show batch results as a table with a CSV export"""
+    results_df = pd.DataFrame(rows)
+    st.dataframe(results_df, use_container_width=True)
+    st.download_button(
+        label="📥 Download Batch Results as CSV",
+        data=results_df.to_csv(index=False),
+        file_name=f"ecovision_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv"
+    )
+
+
+def batch_row(item):
+    """One results-table row for a BatchResult"""
+    result = item.result or {}
+    overall = result.get("overall_analysis", {})
+    metrics = analysis_metrics(result, DETAILED) if "objects_detected" in result else None
+    return {
+        "image": item.name,
+        "status": f"❌ {item.error}" if item.error else "✅ Done",
+        "objects": len(result.get("objects_detected", [])),
+        "health_score": overall.get("environmental_health_score"),
+        "biodiversity": overall.get("biodiversity_level"),
+        "co2_kg_day": round(metrics.co2_impact, 1) if metrics else None,
+        "detail": (result.get("local_metrics") or {}).get("verdict"),
+        "latency_s": round(item.latency, 2),
+        "summary": result.get("summary", "")
+    }
+
+
+def run_batch_analysis(eco_ai, sources, analysis_mode, max_workers, requests_per_minute, tokens_per_minute):
+    """Analyze many images concurrently, streaming rows into the results table as they complete"""
+    limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+    progress = st.progress(0.0, text=f"📦 Analyzing {len(sources)} images...")
+    table = st.empty()
+    rows = []
+    completed = run_batch(
+        sources,
+        lambda image: eco_ai.analyze_image_with_ai(image, analysis_mode, verbose=False, limiter=limiter),
+        max_workers=max_workers
+    )
+    for done, item in enumerate(completed, start=1):
+        rows.append(batch_row(item))
+        progress.progress(done / len(sources), text=f"📦 Analyzed {done} of {len(sources)} images")
+        table.dataframe(pd.DataFrame(rows), use_container_width=True)
+
+    table.empty()
+    st.session_state.batch_results = rows
+    st.session_state.analysis_count += sum(1 for row in rows if not row["status"].startswith("❌"))
+    render_batch_results(rows)
+
+
+def batch_inputs(key_prefix):
+    """Multi-file uploader plus optional server-side folder; returns (name, source) pairs"""
+    batch_files = st.file_uploader(
+        "Choose images...",
+        type=['png', 'jpg', 'jpeg'],
+        accept_multiple_files=True,
+        help="Upload any number of images for batch analysis",
+        key=f"{key_prefix}_batch_files"
+    )
+    batch_folder = st.text_input(
+        "...or analyze a server-side folder",
+        placeholder="sample_images",
+        key=f"{key_prefix}_batch_folder"
+    )
+    sources = [(f.name, f) for f in batch_files or []]
+    if batch_folder.strip():
+        if os.path.isdir(batch_folder.strip()):
+            sources += [(path, path) for path in list_images(batch_folder.strip())]
+        else:
+            st.warning(f"Folder not found: {batch_folder}")
+    if sources:
+        st.caption(f"📦 {len(sources)} images queued")
+    return sources
+
+
+def batch_settings():
+    """Concurrency and rate-limit controls; returns (max_workers, rpm, tpm)"""
+    max_workers = st.number_input("Concurrent requests", min_value=1, max_value=32,
+                                  value=config.BATCH_MAX_WORKERS)
+    requests_per_minute = st.number_input("Requests per minute", min_value=1, max_value=100000,
+                                          value=config.BATCH_REQUESTS_PER_MINUTE)
+    tokens_per_minute = st.number_input("Tokens per minute", min_value=1000, max_value=100000000,
+                                        value=config.BATCH_TOKENS_PER_MINUTE, step=1000)
+    return int(max_workers), int(requests_per_minute), int(tokens_per_minute)
+
+
+HISTORY_PERIODS = {
+    "Any time": None,
+    "Last 24 hours": 24 * 3600,
+    "Last 7 days": 7 * 24 * 3600,
+    "Last 30 days": 30 * 24 * 3600,
+}
+
+
+def history_filters(history, key_prefix):
+    """Mode, object and period filters; returns keyword arguments for HistoryStore.page/count"""
+    col_mode, col_object, col_period = st.columns(3)
+    with col_mode:
+        mode = st.selectbox("Analysis Type", ["All"] + history.modes(), key=f"{key_prefix}_history_mode")
+    with col_object:
+        object_name = st.text_input("Detected object", placeholder="e.g. tree, plastic",
+                                    key=f"{key_prefix}_history_object")
+    with col_period:
+        period = st.selectbox("Period", list(HISTORY_PERIODS), key=f"{key_prefix}_history_period")
+    seconds = HISTORY_PERIODS[period]
+    return {
+        "mode": None if mode == "All" else mode,
+        "object_name": object_name.strip() or None,
+        "since": time.time() - seconds if seconds else None,
+    }
+
+
+def history_row(row):
+    """One history-table row for a stored analysis summary"""
+    tokens = (row["prompt_tokens"] or 0) + (row["completion_tokens"] or 0)
+    return {
+        "id": row["id"],
+        "time": datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M"),
+        "mode": row["mode"],
+        "objects": row["object_count"],
+        "co2_kg_day": row["co2_impact"],
+        "health": row["health_score"],
+        "biodiversity_%": None if row["biodiversity"] is None else round(row["biodiversity"], 1),
+        "latency_s": None if row["latency"] is None else round(row["latency"], 2),
+        "tokens": tokens or None,
+        "cached": bool(row["cached"]),
+        "summary": row["summary"],
+    }
+
+
+def render_history(history, key_prefix, page_size=25):
+    """Filterable history table paged by id, one page in memory at a time; returns the selected record"""
+    filters = history_filters(history, key_prefix)
+
+    # Page start cursors; a filter change starts over from the newest record
+    pages_key, filters_key = f"{key_prefix}_history_pages", f"{key_prefix}_history_filter_state"
+    filter_state = (filters["mode"], filters["object_name"], st.session_state[f"{key_prefix}_history_period"])
+    if st.session_state.get(filters_key) != filter_state:
+        st.session_state[filters_key] = filter_state
+        st.session_state[pages_key] = [None]
+    pages = st.session_state[pages_key]
+
+    rows, next_before_id = history.page(**filters, before_id=pages[-1], limit=page_size)
+    st.caption(f"🗂️ {history.count(**filters)} matching analyses • page {len(pages)}")
+    if not rows:
+        st.info("No stored analyses match these filters yet.")
+        return None
+    st.dataframe(pd.DataFrame([history_row(row) for row in rows]), use_container_width=True, hide_index=True)
+
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if len(pages) > 1 and st.button("⬅️ Newer", key=f"{key_prefix}_history_newer"):
+            pages.pop()
+            st.rerun()
+    with col_next:
+        if next_before_id is not None and st.button("Older ➡️", key=f"{key_prefix}_history_older"):
+            pages.append(next_before_id)
+            st.rerun()
+
+    selected_id = st.selectbox(
+        "View analysis",
+        [row["id"] for row in rows],
+        format_func=lambda analysis_id: f"#{analysis_id}",
+        key=f"{key_prefix}_history_selected"
+    )
+    record = history.get(selected_id)
+    with st.expander(f"🔍 Analysis #{selected_id}"):
+        st.json(record["result"])
+    return record
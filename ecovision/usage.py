@@ -0,0 +1,148 @@
+"""Per-call accounting of OpenAI usage: tokens, image bytes, stage timings and estimated cost.
+
+The engine records one CallRecord per API call into a UsageLedger. A session's
+ledger forwards every record to the process-wide one, so the Streamlit
+sidebar can show both scopes. Ledgers keep running totals and a bounded
+window of recent calls, which can be exported as CSV or as Prometheus text.
+"""
+
+import csv
+import io
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, fields
+
+from . import config
+
+# Per-call numbers summed into the totals and exported as Prometheus counters
+COUNTERS = ("prompt_tokens", "cached_tokens", "completion_tokens", "image_bytes", "encode_seconds",
+            "network_seconds", "parse_seconds", "cost")
+
+
+def usage_counts(usage):
+    """(prompt, cached, completion) token counts from an API usage object; zeros if it is missing"""
+    if usage is None:
+        return 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = (getattr(details, "cached_tokens", None) or 0) if details is not None else 0
+    return usage.prompt_tokens or 0, cached, usage.completion_tokens or 0
+
+
+def format_value(value):
+    return f"{value:.6f}" if isinstance(value, float) else str(value)
+
+
+def estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens, prices=None):
+    """Estimated USD cost of one call from config.MODEL_PRICES; 0.0 for unknown models"""
+    prices = prices if prices is not None else config.MODEL_PRICES
+    price = prices.get(model)
+    if price is None:
+        # Dated snapshots ("gpt-4o-2024-08-06") are billed like their base model
+        price = next((prices[name] for name in sorted(prices, key=len, reverse=True) if model.startswith(name)), None)
+    if price is None:
+        return 0.0
+    input_price, cached_price, output_price = price
+    return ((prompt_tokens - cached_tokens) * input_price + cached_tokens * cached_price
+            + completion_tokens * output_price) / 1e6
+
+
+@dataclass
+class CallRecord:
+    """One API call: what it sent, what it cost and where the time went"""
+    kind: str
+    model: str
+    ok: bool = True
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    image_bytes: int = 0
+    encode_seconds: float = 0.0
+    network_seconds: float = 0.0
+    parse_seconds: float = 0.0
+    cost: float = 0.0
+    timestamp: float = 0.0
+
+    @classmethod
+    def from_usage(cls, kind, model, usage=None, **timings):
+        prompt, cached, completion = usage_counts(usage)
+        return cls(kind=kind, model=model, prompt_tokens=prompt, cached_tokens=cached, completion_tokens=completion,
+                   cost=estimate_cost(model, prompt, cached, completion), timestamp=time.time(), **timings)
+
+
+class UsageLedger:
+    """Thread-safe totals and recent CallRecords, optionally forwarded to a parent ledger"""
+
+    def __init__(self, parent=None, max_records=config.USAGE_MAX_RECORDS):
+        self.parent = parent
+        self.started = time.time()
+        self._records = deque(maxlen=max_records)
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, call):
+        with self._lock:
+            self._records.append(call)
+            key = (call.kind, call.model, "ok" if call.ok else "error")
+            totals = self._totals.setdefault(key, dict.fromkeys(("calls",) + COUNTERS, 0))
+            totals["calls"] += 1
+            for name in COUNTERS:
+                totals[name] += getattr(call, name)
+        if self.parent is not None:
+            self.parent.record(call)
+
+    def totals(self):
+        """Sums over every recorded call, with per-call averages of the stage timings"""
+        with self._lock:
+            groups = [(key, dict(group)) for key, group in self._totals.items()]
+        summary = {name: sum(group[name] for _, group in groups) for name in ("calls",) + COUNTERS}
+        summary["errors"] = sum(group["calls"] for key, group in groups if key[2] == "error")
+        calls = summary["calls"] or 1
+        for stage in ("encode", "network", "parse"):
+            summary[f"avg_{stage}_seconds"] = summary[f"{stage}_seconds"] / calls
+        return summary
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def to_csv(self):
+        """Recent calls as CSV, oldest first"""
+        out = io.StringIO()
+        writer = csv.DictWriter(out, fieldnames=[field.name for field in fields(CallRecord)])
+        writer.writeheader()
+        for call in self.records():
+            writer.writerow(asdict(call))
+        return out.getvalue()
+
+    def to_prometheus(self, prefix="ecovision"):
+        """Running totals in the Prometheus text exposition format"""
+        with self._lock:
+            groups = sorted(self._totals.items())
+        names = {"calls": "requests", "cost": "cost_usd"}
+        lines = []
+        for name in ("calls",) + COUNTERS:
+            metric = f"{prefix}_{names.get(name, name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for (kind, model, status), totals in groups:
+                lines.append(f'{metric}{{kind="{kind}",model="{model}",status="{status}"}} {format_value(totals[name])}')
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._totals = {}
+            self.started = time.time()
+
+
+_default_usage = None
+_default_usage_lock = threading.Lock()
+
+
+def default_usage():
+    """Process-wide ledger shared by every session"""
+    global _default_usage
+    with _default_usage_lock:
+        if _default_usage is None:
+            _default_usage = UsageLedger()
+        return _default_usage
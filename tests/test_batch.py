@@ -0,0 +1,72 @@
+"""Batch analysis spends rate-limiter budget only on images that are sent to the model."""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ecovision.batch import RateLimiter, run_batch
+from ecovision.cache import AnalysisCache
+from ecovision.client import build_client
+from ecovision.engine import EcoVisionAI, estimate_request_tokens
+from ecovision.history import HistoryStore
+from ecovision.neardup import NearDuplicateIndex
+from ecovision.singleflight import SingleFlight
+from ecovision.stub_server import StubServer
+from ecovision.transport import Transport
+from ecovision.usage import UsageLedger
+
+
+class CountingLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(requests_per_minute=0, tokens_per_minute=0)
+        self.acquired = []
+
+    def acquire(self, tokens=0):
+        self.acquired.append(tokens)
+        super().acquire(tokens)
+
+
+@pytest.fixture(scope="module")
+def stub():
+    with StubServer(seed=0) as server:
+        yield server
+
+
+@pytest.fixture
+def eco_ai(stub):
+    return EcoVisionAI(client=build_client("stub", stub.url), cache=AnalysisCache(":memory:"),
+                       history=HistoryStore(":memory:"), transport=Transport(max_retries=0),
+                       singleflight=SingleFlight(), near_duplicates=NearDuplicateIndex(":memory:"),
+                       usage=UsageLedger())
+
+
+def photo(seed, size=(640, 480)):
+    """Sharp random texture the pre-screen sends at high detail"""
+    pixels = np.random.default_rng(seed).integers(0, 256, (size[1] // 8, size[0] // 8, 3), dtype=np.uint8)
+    return Image.fromarray(pixels).resize(size, Image.NEAREST)
+
+
+def analyze_all(eco_ai, images, limiter):
+    items = [(name, image) for name, image in images.items()]
+    completed = run_batch(items, lambda image: eco_ai.analyze_image_with_ai(image, verbose=False, limiter=limiter),
+                          max_workers=1, load=lambda image: image)
+    return {item.name: item for item in completed}
+
+
+def test_only_sent_requests_spend_the_budget(stub, eco_ai):
+    stub.reset_counters()
+    limiter = CountingLimiter()
+    first = analyze_all(eco_ai, {"forest": photo(1)}, limiter)
+    assert first["forest"].error is None
+
+    results = analyze_all(eco_ai, {
+        "forest again": photo(1),  # exact cache hit
+        "forest reframed": photo(1).resize((600, 450)),  # near-duplicate reuse
+        "dark": Image.new("RGB", (640, 480), (2, 2, 2)),  # rejected by the pre-screen
+        "beach": photo(2),  # a new image: sent
+    }, limiter)
+
+    assert results["dark"].error and "pre-screen" in results["dark"].result["summary"]
+    assert "near_duplicate" in results["forest reframed"].result
+    assert stub.requests == 2
+    assert limiter.acquired == [estimate_request_tokens(photo(1))] * 2
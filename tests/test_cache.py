@@ -0,0 +1,88 @@
+"""AnalysisCache keys, persistence across instances, expiry and eviction."""
+
+import hashlib
+import io
+import json
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ecovision.cache import AnalysisCache, make_cache_key, prompt_fingerprint
+from ecovision.imaging import image_digest
+
+RESULT = {"summary": "A forest", "objects_detected": [{"name": "Tree", "environmental_impact": "positive"}]}
+
+
+def photo(seed=0):
+    return Image.fromarray(np.random.default_rng(seed).integers(0, 256, (48, 64, 3), dtype=np.uint8))
+
+
+def test_key_is_stable_and_covers_every_input():
+    key = make_cache_key("abc", "comprehensive", prompt_fingerprint("prompt"), "gpt-4o")
+    # A plain SHA-256 of the joined inputs: the same in every process and every release
+    expected = hashlib.sha256("\x1f".join(["abc", "comprehensive", prompt_fingerprint("prompt"),
+                                           "gpt-4o"]).encode("utf-8")).hexdigest()
+    assert key == expected
+    assert prompt_fingerprint("prompt") == hashlib.sha256(b"prompt").hexdigest()[:12]
+    variants = {
+        make_cache_key("abd", "comprehensive", prompt_fingerprint("prompt"), "gpt-4o"),
+        make_cache_key("abc", "waste", prompt_fingerprint("prompt"), "gpt-4o"),
+        make_cache_key("abc", "comprehensive", prompt_fingerprint("prompt v2"), "gpt-4o"),
+        make_cache_key("abc", "comprehensive", prompt_fingerprint("prompt"), "gpt-4o-mini"),
+    }
+    assert key not in variants and len(variants) == 4
+
+
+def test_image_digest_depends_on_pixels_not_the_file():
+    image = photo()
+    resaved = io.BytesIO()
+    image.save(resaved, format="PNG", optimize=True)
+    reopened = Image.open(io.BytesIO(resaved.getvalue()))
+    assert image_digest(reopened) == image_digest(image)
+    assert image_digest(image.convert("RGBA")) == image_digest(image)
+    assert image_digest(photo(1)) != image_digest(image)
+
+
+def test_put_and_get_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    key = make_cache_key(image_digest(photo()), "comprehensive", prompt_fingerprint("prompt"), "gpt-4o")
+    AnalysisCache(path).put(key, RESULT)
+
+    reopened = AnalysisCache(path)
+    assert reopened.get(key) == RESULT
+    assert reopened.get("missing") is None
+    assert reopened.stats()["hits"] == 1 and reopened.stats()["misses"] == 1
+    assert reopened.stats()["entries"] == 1
+
+
+def test_uncounted_lookups_stay_out_of_the_stats():
+    cache = AnalysisCache(":memory:")
+    cache.put("key", RESULT)
+    assert cache.get("key", count=False) == RESULT
+    assert cache.get("missing", count=False) is None
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_expired_entries_miss(monkeypatch):
+    cache = AnalysisCache(":memory:", ttl_seconds=60)
+    cache.put("key", RESULT)
+    now = time.time()
+    monkeypatch.setattr("ecovision.cache.time.time", lambda: now + 61)
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("limit", ["max_entries", "max_bytes"])
+def test_least_recently_used_entries_are_evicted(monkeypatch, limit):
+    clock = iter(range(1000))
+    monkeypatch.setattr("ecovision.cache.time.time", lambda: float(next(clock)))
+    size = len(json.dumps(RESULT))
+    cache = AnalysisCache(":memory:", ttl_seconds=0, **{limit: 2 if limit == "max_entries" else 2 * size})
+    cache.put("a", RESULT)
+    cache.put("b", RESULT)
+    cache.get("a")
+    cache.put("c", RESULT)
+    assert cache.get("b") is None
+    assert cache.get("a") == RESULT and cache.get("c") == RESULT
@@ -0,0 +1,119 @@
+"""MemoryGovernor accounting and eviction, and spilling session images to disk and back."""
+
+import io
+import json
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ecovision.governor import MemoryGovernor, estimate_bytes
+from ecovision.session import conversation_state, encoded_image_store, objects_view
+
+MB = 1024 * 1024
+
+
+def upload(seed=0, size=(1600, 1200)):
+    """JPEG bytes of a smooth random texture, roughly as compressible as a photo"""
+    pixels = (np.random.default_rng(seed).random((48, 64, 3)) * 255).astype("uint8")
+    buffered = io.BytesIO()
+    Image.fromarray(pixels).resize(size, Image.BICUBIC).save(buffered, format="JPEG", quality=90)
+    return io.BytesIO(buffered.getvalue())
+
+
+def session(seed=0, turns=0):
+    """Session state the way the apps leave it: an ingested upload, its payload, an objects view and chat turns"""
+    state = {}
+    store = encoded_image_store(state)
+    store.ingest("upload", upload(seed))
+    store.get("upload")
+    objects = [{"name": f"object {i}", "category": "plant", "confidence": 0.9} for i in range(10)]
+    objects_view(state, objects)
+    history = state["chat_history"] = []
+    for turn in range(turns):
+        history.append({"type": "user", "content": f"Question {turn}?", "timestamp": "10:00"})
+        history.append({"type": "ai", "content": "a" * 2000, "timestamp": "10:00", "time_to_first_token": 0.3})
+    return state
+
+
+def test_estimate_bytes_counts_shared_values_once():
+    payload = "x" * 100_000
+    assert estimate_bytes({"a": payload, "b": payload}) < estimate_bytes({"a": payload, "b": "y" * 100_000})
+    assert estimate_bytes([b"z" * 50_000]) >= 50_000
+
+
+def test_session_within_budget_is_left_alone(tmp_path):
+    governor = MemoryGovernor(64 * MB, 512 * MB, spill_dir=str(tmp_path))
+    state = session(turns=4)
+    memory = governor.govern(state)
+    assert memory.bytes > 0 and memory.bytes == sum(memory.by_key.values())
+    assert "objects_view" in state and len(state["chat_history"]) == 8
+    assert not memory.evictions
+
+
+def test_over_budget_evicts_views_then_chat_then_image(tmp_path):
+    state = session(turns=30)
+    store = encoded_image_store(state)
+    conversation = conversation_state(state)
+    conversation.follow("upload", [])
+    conversation.summarized_until = 50  # the first 25 turns are in the summary
+    preview, payload = store.ingested.preview, store.prepared.base64
+
+    governor = MemoryGovernor(64 * 1024, 512 * MB, keep_messages=4, spill_dir=str(tmp_path))
+    memory = governor.govern(state)
+
+    assert "objects_view" not in state
+    # Only turns the model no longer sees are archived, oldest first
+    assert len(state["chat_history"]) == 10 and memory.archived_messages == 50
+    assert (conversation.start, conversation.summarized_until) == (0, 0)
+    with open(os.path.join(memory.folder, "chat.jsonl"), encoding="utf-8") as f:
+        archived = [json.loads(line) for line in f]
+    assert archived[0]["content"] == "Question 0?" and len(archived) == 50
+    # The working copy is spilled; the preview and payload stay for this session's own run
+    assert store.ingested.data is None and os.path.exists(store.ingested.path)
+    assert store.ingested.preview == preview and store.prepared.base64 == payload
+    assert store.ingested.image().size == store.ingested.size
+    assert memory.evictions == {"views": 1, "chat_messages": 50, "images": 1}
+
+
+def test_process_pressure_spills_idle_sessions_first(tmp_path):
+    governor = MemoryGovernor(64 * MB, 1, spill_dir=str(tmp_path))
+    idle, active = session(seed=1), session(seed=2)
+    governor.govern(idle)
+    idle_store = encoded_image_store(idle)
+    preview = idle_store.ingested.preview
+
+    governor.govern(active)
+    # The idle session loses its preview and payload too; the running one keeps both
+    assert idle_store.ingested.data is None and idle_store.ingested.preview is None
+    assert idle_store.prepared is None
+    assert encoded_image_store(active).ingested.preview is not None
+    assert governor.stats()["evictions"]["images"] >= 1
+
+    # The display path reads the preview back even if the spill lands mid-run
+    assert idle_store.ingested.load_preview() == preview
+    assert idle_store.ingest("upload", upload(1)) is idle_store.ingested
+    assert idle_store.get("upload").base64
+    assert idle_store.encodes == 2 and idle_store.ingests == 1
+
+
+def test_without_spill_dir_chat_is_dropped_and_images_stay(tmp_path):
+    governor = MemoryGovernor(1, 512 * MB, keep_messages=4, spill_dir="")
+    state = session(turns=10)
+    conversation_state(state).follow("other image", state["chat_history"])  # the whole chat is an older thread
+    memory = governor.govern(state)
+    assert len(state["chat_history"]) == 4
+    assert memory.folder is None
+    assert encoded_image_store(state).ingested.data is not None
+
+
+@pytest.mark.parametrize("idle", [False, True])
+def test_clearing_the_store_removes_spill_files(tmp_path, idle):
+    state = session()
+    store = encoded_image_store(state)
+    path = str(tmp_path / "image.jpg")
+    assert store.spill(path, idle=idle) > 0
+    assert os.path.exists(path) and os.path.exists(path + ".preview") == idle
+    store.clear()
+    assert not os.path.exists(path) and not os.path.exists(path + ".preview")
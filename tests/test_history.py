@@ -0,0 +1,81 @@
+"""HistoryStore: recording, keyset paging and filters."""
+
+import pytest
+
+from ecovision.history import HistoryStore, object_terms
+from ecovision.scoring import score_metrics
+
+MODES = ("comprehensive", "waste")
+NAMES = ("Oak tree", "Plastic bottle", "Solar panel", "Stream")
+
+
+def analysis(i):
+    return {"summary": f"Scene {i}",
+            "objects_detected": [{"name": NAMES[i % len(NAMES)], "type": "living", "environmental_impact": "positive"}]}
+
+
+@pytest.fixture
+def history():
+    store = HistoryStore(":memory:")
+    for i in range(53):
+        result = analysis(i)
+        store.record(f"hash{i}", MODES[i % 2], "gpt-4o", result, score_metrics(result), latency=1.0,
+                     created_at=1000.0 + i)
+    return store
+
+
+def all_pages(history, limit, **filters):
+    pages, before_id = [], None
+    while True:
+        rows, before_id = history.page(before_id=before_id, limit=limit, **filters)
+        pages.append(rows)
+        if before_id is None:
+            return pages
+
+
+def test_pages_cover_every_row_once_newest_first(history):
+    pages = all_pages(history, 10)
+    assert [len(rows) for rows in pages] == [10, 10, 10, 10, 10, 3]
+    ids = [row["id"] for rows in pages for row in rows]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 53
+    assert pages[0][0]["summary"] == "Scene 52"
+    assert "result" not in pages[0][0]
+
+
+def test_exact_multiple_of_the_page_size_ends_without_an_empty_page(history):
+    rows, before_id = history.page(limit=53)
+    assert len(rows) == 53 and before_id is None
+    assert [len(rows) for rows in all_pages(history, 53, mode="comprehensive")] == [27]
+
+
+def test_filters_apply_to_pages_and_counts(history):
+    assert history.count() == 53
+    assert history.count(mode="waste") == 26
+    rows = [row for rows in all_pages(history, 5, mode="waste") for row in rows]
+    assert len(rows) == 26 and {row["mode"] for row in rows} == {"waste"}
+
+    # Object search prefix-matches the words of object names
+    assert history.count(object_name="plast") == history.count(object_name="Plastic bottle") == 13
+    assert history.count(object_name="bottle oak") == 0
+    assert history.count(since=1050.0) == 3
+    assert history.count(since=1010.0, until=1020.0) == 10
+    assert history.count(mode="comprehensive", object_name="tree", until=1010.0) == 3
+
+
+def test_get_returns_the_full_result(history):
+    rows, _ = history.page(limit=1)
+    record = history.get(rows[0]["id"])
+    assert record["result"] == analysis(52)
+    assert record["object_count"] == 1 and record["co2_impact"] == score_metrics(analysis(52)).co2_impact
+    assert history.get(10_000) is None
+
+
+def test_modes_and_clear(history):
+    assert history.modes() == sorted(MODES)
+    history.clear()
+    assert history.count() == 0 and history.page() == ([], None)
+
+
+def test_object_terms():
+    assert object_terms({"objects_detected": [{"name": "Old-growth Oak"}, {"name": "oak"}, {}]}) == {
+        "old", "growth", "oak"}
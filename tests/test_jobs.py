@@ -0,0 +1,76 @@
+"""JobQueue: results, failures, cancellation and pruning of finished jobs."""
+
+import threading
+import time
+
+import pytest
+
+from ecovision.jobs import Job, JobQueue
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_workers=1, retention_seconds=0)
+    yield queue
+    queue.shutdown(wait=False)
+
+
+def wait_done(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.done and time.time() < deadline:
+        time.sleep(0.005)
+    return job
+
+
+def test_result_and_failure(queue):
+    ok = wait_done(queue.submit(lambda job: {"summary": "ok"}))
+    failed = wait_done(queue.submit(lambda job: 1 / 0))
+    assert (ok.status, ok.result) == ("done", {"summary": "ok"})
+    assert failed.status == "failed" and failed.error.startswith("ZeroDivisionError")
+    assert ok.finished_at is not None and failed.finished_at is not None
+
+
+def test_cancel_before_the_job_runs_is_pruned(queue):
+    release = threading.Event()
+    ran = []
+    blocker = queue.submit(lambda job: release.wait(5))
+    queued = queue.submit(ran.append)
+    assert queued.status == "queued"
+
+    assert queue.cancel(queued.id)
+    assert queued.status == "cancelled" and queued.finished_at is not None
+    release.set()
+    wait_done(blocker)
+
+    time.sleep(0.01)
+    queue.submit(lambda job: None)  # submitting prunes jobs past their retention
+    assert queue.get(queued.id) is None
+    assert queue.get(blocker.id) is None
+    assert not ran
+
+
+def test_cancelled_job_picked_up_by_a_worker_is_stamped_finished(queue):
+    # The pool can start a job whose cancel() came too late to cancel its future
+    job = Job()
+    job.status = "cancelled"
+    queue._run(job, lambda job: pytest.fail("a cancelled job must not run"))
+    assert job.finished_at is not None
+
+
+def test_cancel_running_job_discards_its_result(queue):
+    started, release = threading.Event(), threading.Event()
+
+    def run(job):
+        started.set()
+        release.wait(5)
+        return {"summary": "late"}
+
+    job = queue.submit(run)
+    started.wait(5)
+    assert queue.cancel(job.id)
+    release.set()
+    deadline = time.time() + 5
+    while job.finished_at is None and time.time() < deadline:
+        time.sleep(0.005)
+    assert job.status == "cancelled" and job.result is None
+    assert not queue.cancel(job.id)
@@ -0,0 +1,96 @@
+"""NearDuplicateIndex: Hamming-distance matching within a scope, persistence and bounds."""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ecovision.imaging import perceptual_hash
+from ecovision.neardup import NearDuplicateIndex, popcount64
+
+BASE = 0x0123_4567_89AB_CDEF
+
+
+def flip(phash, bits):
+    """phash with the given bit positions flipped"""
+    for bit in bits:
+        phash ^= 1 << bit
+    return phash
+
+
+def test_popcount_matches_python():
+    values = np.random.default_rng(0).integers(0, 2 ** 63, 1000, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    assert popcount64(values).tolist() == [bin(int(value)).count("1") for value in values]
+
+
+def test_threshold_is_inclusive():
+    index = NearDuplicateIndex(":memory:")
+    index.add(BASE, "scope", "key")
+    assert index.nearest(flip(BASE, [0, 13, 40, 63]), "scope", 4) == ("key", 4)
+    assert index.nearest(flip(BASE, [0, 13, 40, 63, 7]), "scope", 4) is None
+    assert index.nearest(BASE, "scope", 0) == ("key", 0)
+    assert index.stats()["lookups"] == 3 and index.stats()["hits"] == 2
+
+
+def test_nearest_picks_the_closest_in_scope():
+    index = NearDuplicateIndex(":memory:")
+    index.add(flip(BASE, [1, 2, 3]), "scope", "three")
+    index.add(flip(BASE, [5]), "scope", "one")
+    index.add(BASE, "other scope", "exact elsewhere")
+    assert index.nearest(BASE, "scope", 8) == ("one", 1)
+    assert index.nearest(BASE, "other scope", 8) == ("exact elsewhere", 0)
+    assert index.nearest(BASE, "unknown scope", 64) is None
+
+
+def test_high_bit_hashes_survive_the_signed_sqlite_column(tmp_path):
+    path = str(tmp_path / "near.sqlite3")
+    high = 0xFFFF_0000_FFFF_0000
+    index = NearDuplicateIndex(path)
+    index.add(high, "scope", "high")
+    index.add(BASE, "scope", "base")
+
+    reopened = NearDuplicateIndex(path)
+    assert len(reopened) == 2
+    assert reopened.nearest(flip(high, [63]), "scope", 2) == ("high", 1)
+    assert reopened.nearest(BASE, "scope", 0) == ("base", 0)
+
+
+def test_discard_and_clear_persist(tmp_path):
+    path = str(tmp_path / "near.sqlite3")
+    index = NearDuplicateIndex(path)
+    index.add(BASE, "scope", "gone")
+    index.add(flip(BASE, [9]), "scope", "kept")
+    index.discard("gone")
+    assert index.nearest(BASE, "scope", 8) == ("kept", 1)
+    assert NearDuplicateIndex(path).stats()["entries"] == 1
+    index.clear()
+    assert len(index) == 0 and NearDuplicateIndex(path).stats()["entries"] == 0
+
+
+def test_oldest_entries_are_dropped_past_the_cap():
+    index = NearDuplicateIndex(":memory:", max_entries=10)
+    for i in range(11):
+        index.add(BASE + (i << 20), "scope", f"key{i}")
+    # Past the cap, the oldest tenth plus the overflow go at once
+    assert len(index) == 9
+    assert index.nearest(BASE, "scope", 0) is None
+    assert index.nearest(BASE + (10 << 20), "scope", 0) == ("key10", 0)
+
+
+@pytest.mark.parametrize("edit", ["recompress", "resize"])
+def test_perceptual_hash_of_a_lightly_edited_photo_is_near(edit):
+    pixels = (np.random.default_rng(3).random((24, 32, 3)) * 255).astype("uint8")
+    photo = Image.fromarray(pixels).resize((640, 480), Image.BICUBIC)
+    if edit == "recompress":
+        buffered = io.BytesIO()
+        photo.save(buffered, format="JPEG", quality=40)
+        edited = Image.open(io.BytesIO(buffered.getvalue()))
+    else:
+        edited = photo.resize((600, 450))
+    other = Image.fromarray((np.random.default_rng(4).random((24, 32, 3)) * 255).astype("uint8")).resize((640, 480))
+
+    index = NearDuplicateIndex(":memory:")
+    index.add(perceptual_hash(photo), "scope", "photo")
+    assert index.nearest(perceptual_hash(edited), "scope", 8)[0] == "photo"
+    assert index.nearest(perceptual_hash(other), "scope", 8) is None
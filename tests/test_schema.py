@@ -0,0 +1,110 @@
+"""parse_analysis and repair_json on complete, fenced, prose-wrapped and truncated model output."""
+
+import json
+import types
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from ecovision.cache import AnalysisCache
+from ecovision.engine import EcoVisionAI
+from ecovision.history import HistoryStore
+from ecovision.neardup import NearDuplicateIndex
+from ecovision.schema import AnalysisValidationError, parse_analysis, repair_json, strip_fences
+from ecovision.singleflight import SingleFlight
+from ecovision.transport import Transport
+from ecovision.usage import UsageLedger
+
+OBJECT = {"name": "Mature oak", "type": "living", "confidence": 0.92, "environmental_impact": "positive",
+          "sustainability_score": 9, "description": "A large oak", "recommended_action": "Protect it"}
+ANALYSIS = {
+    "summary": "An oak woodland with a stream",
+    "objects_detected": [OBJECT, {**OBJECT, "name": "Stream", "type": "natural"}],
+    "overall_analysis": {"environmental_health_score": 8, "biodiversity_level": "high", "key_concerns": [],
+                         "positive_aspects": ["Old trees"], "recommendations": ["Keep it as it is"]},
+}
+TEXT = json.dumps(ANALYSIS, indent=2)
+
+
+def test_complete_json_parses():
+    result, outcome = parse_analysis(TEXT)
+    assert outcome == "parsed"
+    assert result == ANALYSIS
+
+
+@pytest.mark.parametrize("wrapped", [f"```json\n{TEXT}\n```", f"```\n{TEXT}\n```", f"  {TEXT}\n"])
+def test_fenced_json_parses(wrapped):
+    assert strip_fences(wrapped) == TEXT
+    assert parse_analysis(wrapped) == (ANALYSIS, "parsed")
+
+
+def test_prose_around_json_is_repaired():
+    result, outcome = parse_analysis(f"Here is the analysis you asked for:\n{TEXT}\nLet me know if you need more.")
+    assert outcome == "repaired"
+    assert result == ANALYSIS
+
+
+def test_truncated_output_keeps_the_complete_objects():
+    # Cut off inside the second object's description, as with a max_tokens stop
+    cut = TEXT.index('"description"', TEXT.index('"Stream"'))
+    result, outcome = parse_analysis(TEXT[:cut + 20])
+    assert outcome == "repaired"
+    assert result["summary"] == ANALYSIS["summary"]
+    assert [obj["name"] for obj in result["objects_detected"]] == ["Mature oak", "Stream"]
+    assert result["objects_detected"][0] == OBJECT
+    # Fields the cut-off object and overall_analysis never got are neutral defaults, not inventions
+    assert result["objects_detected"][1]["recommended_action"] == ""
+    assert result["overall_analysis"]["environmental_health_score"] == 0
+    assert result["overall_analysis"]["biodiversity_level"] == "unknown"
+
+
+def test_object_cut_before_its_name_is_dropped():
+    cut = TEXT.index('"name": "Stream"')
+    result, _ = parse_analysis(TEXT[:cut])
+    assert [obj["name"] for obj in result["objects_detected"]] == ["Mature oak"]
+
+
+def test_repair_json_handles_strings_with_brackets_and_escapes():
+    text = '{"summary": "Trees {tall} and \\"old\\" [2]", "objects_detected": [{"name": "a"}, {"na'
+    assert repair_json(text) == {"summary": 'Trees {tall} and "old" [2]', "objects_detected": [{"name": "a"}]}
+    assert repair_json('{"a": [1, 2,') == {"a": [1, 2]}
+    assert repair_json("no json here") is None
+
+
+@pytest.mark.parametrize("text", ["I cannot analyze this image.", "", '{"unrelated": true}', "[1, 2, 3]"])
+def test_unusable_output_raises(text):
+    with pytest.raises(AnalysisValidationError):
+        parse_analysis(text)
+
+
+def test_invalid_impact_is_rejected_unless_repairing():
+    bad = {**ANALYSIS, "objects_detected": [{**OBJECT, "environmental_impact": "great"}]}
+    result, outcome = parse_analysis(json.dumps(bad))
+    # Strict validation fails, and the repaired parse falls back to neutral
+    assert outcome == "repaired"
+    assert result["objects_detected"][0]["environmental_impact"] == "neutral"
+
+
+def fake_client(text):
+    """Client whose chat.completions.create always returns `text`"""
+    def create(**kwargs):
+        message = types.SimpleNamespace(content=text)
+        usage = types.SimpleNamespace(prompt_tokens=1000, completion_tokens=50, prompt_tokens_details=None)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+    return types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+
+
+def test_unparseable_response_is_an_error_not_a_made_up_result():
+    eco_ai = EcoVisionAI(client=fake_client("Sorry, I can't describe this image."),
+                         cache=AnalysisCache(":memory:"), history=HistoryStore(":memory:"),
+                         transport=Transport(max_retries=0), singleflight=SingleFlight(),
+                         near_duplicates=NearDuplicateIndex(":memory:"), usage=UsageLedger(), prescreen=False)
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (96, 128, 3), dtype=np.uint8))
+    result = eco_ai.analyze_image_with_ai(image, verbose=False)
+
+    assert "error" in result
+    assert result["raw_analysis"] == "Sorry, I can't describe this image."
+    assert "objects_detected" not in result and "metrics" not in result
+    assert eco_ai.parse_stats.snapshot()["failed"] == 1
+    assert eco_ai.cache.stats()["entries"] == 0
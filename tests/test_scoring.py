@@ -0,0 +1,39 @@
+"""ecovision.scoring against the apps' original scoring loops, on recorded analyses in both profiles."""
+
+import json
+import math
+import os
+
+import pytest
+
+from ecovision.scoring import BASIC, DETAILED, score_analysis, score_frame
+
+from legacy_scoring import basic_scores, detailed_scores
+
+LEGACY = {DETAILED: detailed_scores, BASIC: basic_scores}
+
+with open(os.path.join(os.path.dirname(__file__), "data", "recorded_analyses.json"), encoding="utf-8") as f:
+    ANALYSES = json.load(f)
+
+
+@pytest.mark.parametrize("profile", [DETAILED, BASIC])
+def test_score_analysis_matches_legacy(profile):
+    for analysis in ANALYSES:
+        assert score_analysis(analysis, profile) == LEGACY[profile](analysis), analysis
+
+
+@pytest.mark.parametrize("profile", [DETAILED, BASIC])
+def test_score_frame_matches_legacy(profile):
+    rows = score_frame(ANALYSES, profile).to_dict("records")
+    assert len(rows) == len(ANALYSES)
+    for analysis, row in zip(ANALYSES, rows):
+        expected = LEGACY[profile](analysis)
+        del expected["co2_details"]
+        if expected["biodiversity"] is None:
+            assert math.isnan(row.pop("biodiversity")), analysis
+            del expected["biodiversity"]
+        assert {key: row[key] for key in expected} == expected, analysis
+
+
+def test_score_frame_empty():
+    assert score_frame([], DETAILED).empty
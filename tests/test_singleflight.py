@@ -0,0 +1,93 @@
+"""SingleFlight: concurrent calls with one key share the leader's result or exception."""
+
+import threading
+import time
+
+import pytest
+
+from ecovision.singleflight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers):
+    """Start `callers` threads on flight.do(key, fn) while the leader is held inside fn"""
+    outcomes = [None] * callers
+
+    def call(i):
+        try:
+            outcomes[i] = ("result", *flight.do(key, fn))
+        except Exception as e:
+            outcomes[i] = ("error", e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def wait_for_waiters(flight, count, timeout=5):
+    deadline = time.time() + timeout
+    while flight.stats()["coalesced"] < count and time.time() < deadline:
+        time.sleep(0.005)
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release, calls = threading.Event(), []
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return {"summary": "shared"}
+
+    threads, outcomes = run_concurrently(flight, "key", work, 5)
+    wait_for_waiters(flight, 4)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert all(outcome[:2] == ("result", {"summary": "shared"}) for outcome in outcomes)
+    assert sorted(outcome[2] for outcome in outcomes) == [False, True, True, True, True]
+    assert flight.stats() == {"calls": 5, "coalesced": 4, "in_flight": 0}
+
+
+def test_leader_failure_reaches_every_waiter_and_clears_the_key():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(5)
+        raise TimeoutError("upstream timed out")
+
+    threads, outcomes = run_concurrently(flight, "key", fail, 3)
+    wait_for_waiters(flight, 2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert [outcome[0] for outcome in outcomes] == ["error"] * 3
+    assert all(isinstance(outcome[1], TimeoutError) for outcome in outcomes)
+    # The failure is not cached: the next call runs again
+    assert flight.do("key", lambda: "retried") == ("retried", False)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == (1, False)
+    assert flight.do("b", lambda: 2) == (2, False)
+    # Sequential calls with the same key each run: only in-flight work is shared
+    assert flight.do("a", lambda: 3) == (3, False)
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_begin_and_finish_for_streamed_work():
+    flight = SingleFlight()
+    call, is_leader = flight.begin("key")
+    waiter, waiter_leads = flight.begin("key")
+    assert is_leader and not waiter_leads and waiter is call
+
+    flight.finish("key", call, error=RuntimeError("the answer stream was abandoned"))
+    with pytest.raises(RuntimeError):
+        waiter.wait()
+    assert flight.begin("key")[1]
@@ -0,0 +1,131 @@
+"""EcoVisionAI.stream_answer against the stub server: streamed text, timings, usage and coalescing."""
+
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+from ecovision.cache import AnalysisCache
+from ecovision.client import build_client
+from ecovision.engine import EcoVisionAI, StreamedAnswer
+from ecovision.history import HistoryStore
+from ecovision.neardup import NearDuplicateIndex
+from ecovision.singleflight import SingleFlight
+from ecovision.stub_server import CANNED_ANSWER, STUB_IMAGE_TOKENS, StubServer
+from ecovision.transport import Transport
+from ecovision.usage import UsageLedger
+
+LATENCY = 0.2
+CHUNK_INTERVAL = 0.02
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StubServer(latency=LATENCY, chunk_words=3, chunk_interval=CHUNK_INTERVAL, seed=0) as server:
+        yield server
+
+
+@pytest.fixture
+def stub(server):
+    server.reset_counters()
+    return server
+
+
+@pytest.fixture
+def eco_ai(stub):
+    return EcoVisionAI(client=build_client("stub", stub.url), cache=AnalysisCache(":memory:"),
+                       history=HistoryStore(":memory:"), transport=Transport(max_retries=0),
+                       singleflight=SingleFlight(), near_duplicates=NearDuplicateIndex(":memory:"),
+                       usage=UsageLedger())
+
+
+@pytest.fixture
+def image():
+    return Image.new("RGB", (64, 48), (40, 120, 60))
+
+
+def test_streams_the_answer_in_chunks(stub, eco_ai, image):
+    answer = StreamedAnswer()
+    pieces = list(eco_ai.stream_answer(image, "What do you see?", answer=answer))
+
+    assert "".join(pieces) == CANNED_ANSWER
+    assert answer.text == CANNED_ANSWER
+    assert len(pieces) == answer.chunks == -(-len(CANNED_ANSWER.split(" ")) // 3)
+    assert answer.error is None
+    assert not answer.coalesced
+    assert stub.requests == 1
+
+
+def test_records_time_to_first_token(stub, eco_ai, image):
+    answer = StreamedAnswer()
+    stream = eco_ai.stream_answer(image, "What do you see?", answer=answer)
+    started = time.perf_counter()
+    next(stream)
+    first_token = time.perf_counter() - started
+    list(stream)
+
+    assert LATENCY <= answer.time_to_first_token <= first_token
+    # The rest of the answer arrives one chunk interval at a time after the first token
+    assert answer.total_latency >= answer.time_to_first_token + (answer.chunks - 1) * CHUNK_INTERVAL
+
+
+def test_captures_usage(stub, eco_ai, image):
+    answer = StreamedAnswer()
+    list(eco_ai.stream_answer(image, "What do you see?", answer=answer))
+
+    assert answer.completion_tokens == len(CANNED_ANSWER) // 4
+    assert answer.prompt_tokens > STUB_IMAGE_TOKENS
+    assert answer.cached_tokens == 0
+    [record] = eco_ai.usage.records()
+    assert record.kind == "stream" and record.ok
+    assert (record.prompt_tokens, record.completion_tokens) == (answer.prompt_tokens, answer.completion_tokens)
+    assert record.image_bytes > 0
+
+
+def test_coalesces_concurrent_identical_questions(stub, eco_ai, image):
+    base64_image = eco_ai.encode_image(image)
+    leader, follower = StreamedAnswer(), StreamedAnswer()
+    leading = eco_ai.stream_answer(image, "What do you see?", base64_image, answer=leader)
+    first = next(leading)  # the leader's request is now in flight
+
+    follower_text = []
+    thread = threading.Thread(target=lambda: follower_text.extend(
+        eco_ai.stream_answer(image, "What do you see?", base64_image, answer=follower)))
+    thread.start()
+    while eco_ai.singleflight.stats()["coalesced"] == 0:
+        time.sleep(0.005)
+    leader_text = first + "".join(leading)
+    thread.join(5)
+
+    assert stub.requests == 1
+    assert leader_text == "".join(follower_text) == CANNED_ANSWER
+    assert follower.coalesced and not leader.coalesced
+    assert follower.chunks == 1
+    # Only the leader's call is billed
+    assert len(eco_ai.usage.records()) == 1
+    assert eco_ai.singleflight.stats()["in_flight"] == 0
+
+
+def test_different_questions_are_not_coalesced(stub, eco_ai, image):
+    base64_image = eco_ai.encode_image(image)
+    streams = [eco_ai.stream_answer(image, question, base64_image) for question in ("What trees?", "What waste?")]
+    firsts = [next(stream) for stream in streams]
+    texts = [first + "".join(stream) for first, stream in zip(firsts, streams)]
+
+    assert texts == [CANNED_ANSWER, CANNED_ANSWER]
+    assert stub.requests == 2
+    assert eco_ai.singleflight.stats()["coalesced"] == 0
+
+
+def test_upstream_error_ends_the_stream_with_a_message(stub, eco_ai, image):
+    stub.error_rate, stub.error_status = 1.0, 400
+    try:
+        answer = StreamedAnswer()
+        text = "".join(eco_ai.stream_answer(image, "What do you see?", answer=answer))
+    finally:
+        stub.error_rate, stub.error_status = 0.0, 500
+
+    assert answer.error
+    assert text.startswith("I encountered an error")
+    assert not eco_ai.usage.records()[0].ok
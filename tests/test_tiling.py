@@ -0,0 +1,85 @@
+"""merge_tiles: objects seen across tile seams are merged once, overall lists de-duplicated."""
+
+from ecovision.batch import BatchResult
+from ecovision.imaging import tile_grid
+from ecovision.tiling import fit_tile_size, merge_tiles, tile_status
+
+# A 2×2 grid of 1000px tiles overlapping by 200px
+TOP_LEFT, TOP_RIGHT = (0, 0, 1000, 1000), (800, 0, 1800, 1000)
+BOTTOM_LEFT, BOTTOM_RIGHT = (0, 800, 1000, 1800), (800, 800, 1800, 1800)
+FAR = (2000, 2000, 3000, 3000)
+
+
+def tile(box, *objects, latency=1.0, **overall):
+    result = {"summary": f"Tile at {box[0]},{box[1]}",
+              "objects_detected": [{"name": name, "confidence": confidence, "environmental_impact": "neutral"}
+                                   for name, confidence in objects],
+              "overall_analysis": {"environmental_health_score": 6, "biodiversity_level": "medium", **overall}}
+    return BatchResult(name=box, result=result, latency=latency)
+
+
+def names(merged):
+    return sorted(obj["name"] for obj in merged["objects_detected"])
+
+
+def test_same_name_in_overlapping_tiles_merges_into_one_object():
+    merged = merge_tiles([tile(TOP_LEFT, ("Plastic bottle", 0.6)), tile(TOP_RIGHT, ("plastic  Bottle", 0.9))],
+                         wall_seconds=1.0)
+    [bottle] = merged["objects_detected"]
+    # The most confident detection wins, located by the union of both tiles
+    assert bottle["name"] == "plastic  Bottle" and bottle["confidence"] == 0.9
+    assert bottle["location"] == [0, 0, 1800, 1000] and bottle["tile_count"] == 2
+
+
+def test_same_name_in_separate_tiles_stays_two_objects():
+    merged = merge_tiles([tile(TOP_LEFT, ("Oak", 0.8)), tile(FAR, ("Oak", 0.8))], wall_seconds=1.0)
+    assert names(merged) == ["Oak", "Oak"]
+    assert all(obj["tile_count"] == 1 for obj in merged["objects_detected"])
+
+
+def test_two_objects_with_one_name_in_a_tile_are_not_merged_with_each_other():
+    merged = merge_tiles([tile(TOP_LEFT, ("Tyre", 0.7), ("Tyre", 0.6)), tile(TOP_RIGHT, ("Tyre", 0.9))],
+                         wall_seconds=1.0)
+    assert [obj["tile_count"] for obj in merged["objects_detected"]] == [2, 1]
+
+
+def test_a_name_seen_in_every_tile_is_not_chained_into_one_object():
+    # Each tile overlaps its neighbours, but only the first tile's box anchors a match
+    items = [tile(box, ("Grass", 0.5)) for box in (TOP_LEFT, TOP_RIGHT, BOTTOM_LEFT, BOTTOM_RIGHT)]
+    merged = merge_tiles(items, wall_seconds=1.0)
+    assert sum(obj["tile_count"] for obj in merged["objects_detected"]) == 4
+    assert merged["objects_detected"][0]["tile_count"] == 4
+
+
+def test_overall_lists_and_summaries_are_deduplicated():
+    merged = merge_tiles([
+        tile(TOP_LEFT, ("Oak", 0.8), key_concerns=["Litter", "Erosion"], environmental_health_score=4),
+        tile(TOP_RIGHT, key_concerns=["litter ", "Runoff"], environmental_health_score=8),
+    ], wall_seconds=1.0)
+    overall = merged["overall_analysis"]
+    assert overall["key_concerns"] == ["Litter", "Erosion", "Runoff"]
+    assert overall["environmental_health_score"] == 6.0
+    assert overall["biodiversity_level"] == "medium"
+    # Summaries come from the tiles with the most objects first
+    assert merged["summary"] == "Tile at 0,0 Tile at 800,0"
+
+
+def test_failed_and_skipped_tiles_are_reported_not_merged():
+    skipped = BatchResult(name=FAR, result={"error": "x", "local_metrics": {"verdict": "rejected"}}, error="x")
+    failed = BatchResult(name=TOP_RIGHT, error="timed out", latency=30.0)
+    merged = merge_tiles([tile(TOP_LEFT, ("Oak", 0.8), latency=2.0), skipped, failed], wall_seconds=30.0,
+                         tile_size=1000, overlap=200)
+    assert names(merged) == ["Oak"]
+    assert [tile_status(item) for item in (skipped, failed)] == ["skipped", "failed"]
+    tiling = merged["tiling"]
+    assert tiling["tiles"] == 3 and tiling["tile_size"] == 1000
+    assert tiling["sequential_seconds"] == 32.0 and tiling["speedup"] == round(32 / 30, 2)
+    assert [row["status"] for row in tiling["per_tile"]] == ["ok", "failed", "skipped"]
+
+    assert "error" in merge_tiles([failed], wall_seconds=1.0)
+
+
+def test_fit_tile_size_grows_tiles_to_respect_the_cap():
+    assert fit_tile_size((1000, 1000), tile_size=1024, overlap=128, max_tiles=4) == 1024
+    size = fit_tile_size((8000, 6000), tile_size=1024, overlap=128, max_tiles=12)
+    assert size > 1024 and len(tile_grid((8000, 6000), size, 128)) <= 12
@@ -0,0 +1,142 @@
+"""Transport retries, Retry-After and the circuit breaker against failures injected by the stub server."""
+
+import openai
+import pytest
+
+from ecovision.client import build_client
+from ecovision.stub_server import StubServer
+from ecovision.transport import CircuitBreaker, CircuitOpenError, Transport
+
+MESSAGES = [{"role": "user", "content": "Analyze this image"}]
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StubServer(seed=0) as server:
+        yield server
+
+
+@pytest.fixture
+def stub(server):
+    """The shared stub server, failing every request with a plain 500 until a test says otherwise"""
+    server.error_rate, server.error_status, server.retry_after = 1.0, 500, None
+    server.reset_counters()
+    return server
+
+
+def make_transport(breaker=None, max_retries=3):
+    """Transport that records its backoff delays instead of sleeping"""
+    delays = []
+    transport = Transport(breaker=breaker or CircuitBreaker(failure_threshold=100), max_retries=max_retries,
+                          sleep=delays.append)
+    return transport, delays
+
+
+def create(stub):
+    client = build_client("stub", stub.url)
+    return lambda: client.chat.completions.create(model="stub", messages=MESSAGES)
+
+
+def test_retries_then_gives_up(stub):
+    transport, delays = make_transport(max_retries=2)
+    with pytest.raises(openai.InternalServerError):
+        transport.call(create(stub))
+    assert stub.requests == 3
+    assert len(delays) == 2
+    assert transport.stats()["retries"] == 2
+    assert transport.stats()["failures"] == 3
+
+
+def test_recovers_after_transient_errors(stub):
+    transport, delays = make_transport(max_retries=3)
+    request = create(stub)
+
+    def flaky():
+        if stub.requests == 2:
+            stub.error_rate = 0.0
+        return request()
+
+    assert transport.call(flaky).choices[0].message.content
+    assert stub.requests == 3
+    assert transport.breaker.failures == 0
+
+
+def test_rate_limit_honours_retry_after(stub):
+    stub.error_status = 429
+    stub.retry_after = 1.5
+    transport, delays = make_transport(max_retries=2)
+    with pytest.raises(openai.RateLimitError):
+        transport.call(create(stub))
+    assert stub.requests == 3
+    assert delays == [1.5, 1.5]
+
+
+def test_deadline_stops_retrying_when_retry_after_is_too_long(stub):
+    stub.error_status = 429
+    stub.retry_after = 60
+    transport, delays = make_transport(max_retries=5)
+    transport.deadline = 10
+    with pytest.raises(openai.RateLimitError):
+        transport.call(create(stub))
+    assert stub.requests == 1
+    assert delays == []
+
+
+def test_breaker_opens_and_fails_fast(stub):
+    transport, delays = make_transport(CircuitBreaker(failure_threshold=3, reset_timeout=60), max_retries=5)
+    request = create(stub)
+    with pytest.raises(CircuitOpenError):
+        transport.call(request)
+    assert stub.requests == 3
+    assert transport.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        transport.call(request)
+    assert stub.requests == 3
+    assert transport.stats()["short_circuited"] == 2
+
+
+def test_half_open_trial_closes_the_circuit(stub):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+    transport, delays = make_transport(breaker, max_retries=0)
+    request = create(stub)
+    for _ in range(2):
+        with pytest.raises(openai.InternalServerError):
+            transport.call(request)
+    assert breaker.state == "open"
+
+    now[0] = 31.0
+    stub.error_rate = 0.0
+    transport.call(request)
+    assert breaker.state == "closed"
+    assert stub.requests == 3
+
+
+def test_non_retryable_error_leaves_breaker_unchanged(stub):
+    stub.error_status = 400
+    breaker = CircuitBreaker(failure_threshold=5)
+    breaker.record_failure()
+    transport, delays = make_transport(breaker)
+    with pytest.raises(openai.BadRequestError):
+        transport.call(create(stub))
+    assert stub.requests == 1
+    assert delays == []
+    assert breaker.failures == 1
+    assert breaker.state == "closed"
+
+
+def test_non_retryable_error_releases_half_open_trial(stub):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+    breaker.record_failure()
+    now[0] = 31.0
+    stub.error_status = 400
+    transport, delays = make_transport(breaker)
+    with pytest.raises(openai.BadRequestError):
+        transport.call(create(stub))
+    assert breaker.state == "half_open"
+
+    stub.error_rate = 0.0
+    transport.call(create(stub))
+    assert breaker.state == "closed"